@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+
+def normalize_rows(vectors):
+    """
+    output: float32 copy of vectors with unit-length rows (cosine similarity becomes a dot product)
+    """
+    vectors = np.array(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def rows_hash(rows):
+    """
+    output: hash of a set of rows of the embedding matrix (independent of their order)
+    """
+    return hashlib.sha256(np.sort(np.asarray(rows, dtype=np.int64)).tobytes()).hexdigest()
+
+
+class IVFIndex:
+    """
+    Approximate nearest-neighbour index (inverted file) for cosine similarity over embedding vectors.
+
+    The normalized vectors are clustered by k-means into n_lists lists; a query is compared with the list centroids
+    first and then only with the vectors of its n_probe closest lists. n_probe trades recall for latency: n_probe =
+    n_lists is an exact (brute-force) search.
+
+    An index is a directory with
+        - centroids.npy: (n_lists, dim) unit-length centroids
+        - offsets.npy: start of every list in vectors.npy (n_lists + 1 entries)
+        - rows.npy: row (in the embedding matrix the index was built from) of every vector in vectors.npy
+        - vectors.npy: the normalized vectors ordered by list, read through np.memmap
+        - meta.json: rows, dim, n_lists, dtype, the data hash of the embedding store and the hash of the indexed rows
+          (see matches)
+    """
+
+    def __init__(self, path, centroids, offsets, rows, vectors, meta):
+        self.path = path
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+        self.vectors = vectors
+        self.meta = meta
+
+    @classmethod
+    def build(cls, path, embeddings, rows=None, n_lists=None, dtype='float32', block_size=65536, random_state=0,
+              data_hash=None):
+        """
+        input: directory of the index, (n, dim) embedding matrix (e.g. EmbeddingStore.embeddings), rows of the matrix to
+        index (default: all), number of lists (default: 4 * sqrt(rows)), dtype of the stored vectors, rows processed at
+        a time, seed of the k-means, hash of the data the embeddings were computed from (EmbeddingStore.meta)
+        output: the index, opened read-only
+        """
+        rows = np.arange(len(embeddings)) if rows is None else np.sort(np.asarray(rows))
+        n_lists = n_lists or max(int(4 * np.sqrt(len(rows))), 1)
+
+        # centroids from a sample of the vectors (k-means needs a few dozen points per list, not all of them)
+        rng = np.random.default_rng(random_state)
+        sample = np.sort(rng.choice(rows, size=min(len(rows), 64 * n_lists), replace=False))
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, n_init=3, batch_size=4096, random_state=random_state)
+        kmeans.fit(normalize_rows(embeddings[sample]))
+        centroids = normalize_rows(kmeans.cluster_centers_)
+
+        # list of every vector, assigned block by block
+        lists = np.empty(len(rows), dtype=np.int32)
+        for start in range(0, len(rows), block_size):
+            block = normalize_rows(embeddings[rows[start:start + block_size]])
+            lists[start:start + block_size] = np.argmax(block @ centroids.T, axis=1)
+        order = np.argsort(lists, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(lists, minlength=n_lists))]).astype(np.int64)
+
+        os.makedirs(path, exist_ok=True)
+        # meta.json is written last, an interrupted build leaves no index that open() accepts
+        if os.path.exists(os.path.join(path, 'meta.json')):
+            os.remove(os.path.join(path, 'meta.json'))
+        vectors = np.lib.format.open_memmap(os.path.join(path, 'vectors.npy'), mode='w+', dtype=dtype,
+                                            shape=(len(rows), embeddings.shape[1]))
+        for start in range(0, len(rows), block_size):
+            vectors[start:start + block_size] = normalize_rows(embeddings[rows[order[start:start + block_size]]])
+        vectors.flush()
+        del vectors
+        np.save(os.path.join(path, 'centroids.npy'), centroids)
+        np.save(os.path.join(path, 'offsets.npy'), offsets)
+        np.save(os.path.join(path, 'rows.npy'), rows[order])
+        with open(os.path.join(path, 'meta.json'), 'w') as outfile:
+            json.dump({'rows': len(rows), 'dim': int(embeddings.shape[1]), 'n_lists': n_lists,
+                       'dtype': np.dtype(dtype).name, 'data_hash': data_hash, 'rows_hash': rows_hash(rows)}, outfile)
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path):
+        """
+        input: directory of the index
+        output: index whose vectors are memory mapped
+        """
+        with open(os.path.join(path, 'meta.json'), 'r') as infile:
+            meta = json.load(infile)
+        return cls(path, np.load(os.path.join(path, 'centroids.npy')), np.load(os.path.join(path, 'offsets.npy')),
+                   np.load(os.path.join(path, 'rows.npy')), np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r'),
+                   meta)
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def matches(self, rows, data_hash=None):
+        """
+        output: True if the index was built from these rows of embeddings of the data with data_hash
+        """
+        return self.meta.get('rows_hash') == rows_hash(rows) and self.meta.get('data_hash') == data_hash
+
+    def search(self, queries, k=10, n_probe=8):
+        """
+        input: (q, dim) query vectors, number of neighbours, number of lists searched per query
+        output: (q, k) cosine similarities and (q, k) rows of the neighbours, best first; missing neighbours (fewer
+        than k vectors in the probed lists) have similarity -inf and row -1
+        """
+        queries = normalize_rows(queries)
+        n_probe = min(n_probe, self.meta['n_lists'])
+        probes = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        positions = np.full((len(queries), k), -1, dtype=np.int64)
+        # list by list, with all queries that probe the list in one matrix product
+        query_order = np.argsort(probes, axis=None, kind='stable')
+        probed_lists = probes.ravel()[query_order]
+        bounds = np.flatnonzero(np.diff(probed_lists)) + 1
+        for list_id, group in zip(probed_lists[np.concatenate([[0], bounds]).astype(np.int64)],
+                                  np.split(query_order // n_probe, bounds)):
+            start, end = self.offsets[list_id], self.offsets[list_id + 1]
+            if start == end:
+                continue
+            list_scores = queries[group] @ np.asarray(self.vectors[start:end], dtype=np.float32).T
+            merged_scores = np.concatenate([scores[group], list_scores], axis=1)
+            merged_positions = np.concatenate([positions[group], np.broadcast_to(np.arange(start, end),
+                                                                                 list_scores.shape)], axis=1)
+            best = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k] if merged_scores.shape[1] > k else \
+                np.argsort(-merged_scores, axis=1)
+            scores[group] = np.take_along_axis(merged_scores, best, axis=1)
+            positions[group] = np.take_along_axis(merged_positions, best, axis=1)
+
+        best = np.argsort(-scores, axis=1, kind='stable')
+        scores = np.take_along_axis(scores, best, axis=1)
+        positions = np.take_along_axis(positions, best, axis=1)
+        return scores, np.where(positions >= 0, self.rows[np.maximum(positions, 0)], -1)
+
+
+class KNNClassifier:
+    """
+    k-nearest-neighbour classifier over an IVFIndex: every neighbour votes for its label with its cosine similarity.
+    """
+
+    def __init__(self, index, labels, k=10, n_probe=8, batch_size=1024):
+        """
+        input: index, labels of the rows of the embedding matrix the index was built from, number of neighbours,
+        lists searched per query, queries searched at a time
+        """
+        self.index = index
+        self.classes_, self.label_ids = np.unique(np.asarray(labels), return_inverse=True)
+        self.k = k
+        self.n_probe = n_probe
+        self.batch_size = batch_size
+
+    def predict_proba(self, X):
+        """
+        output: (len(X), n_classes) similarity-weighted vote shares
+        """
+        votes = np.zeros((len(X), len(self.classes_)), dtype=np.float32)
+        for start in range(0, len(X), self.batch_size):
+            scores, rows = self.index.search(X[start:start + self.batch_size], self.k, self.n_probe)
+            found = rows >= 0
+            query = np.broadcast_to(np.arange(start, start + len(rows))[:, None], rows.shape)
+            np.add.at(votes, (query[found], self.label_ids[rows[found]]), np.maximum(scores[found], 0) + 1e-6)
+        return votes / np.maximum(votes.sum(axis=1, keepdims=True), 1e-12)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,68 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
+
+from embedding_engine import EmbeddingEngine, BACKENDS
+
+
+def cosine_similarity_rows(a, b):
+    """
+    output: cosine similarity of every row of a with the same row of b
+    """
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def downstream_f1(X, y, train_index, test_index):
+    """
+    output: weighted F1 of logistic regression (as in scincl-classification-sklearn.py) on the given split
+    """
+    logreg = LogisticRegression(solver='lbfgs', random_state=0, max_iter=1000)
+    logreg.fit(X[train_index], y[train_index])
+    return f1_score(y[test_index], logreg.predict(X[test_index]), average='weighted')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compares the EmbeddingEngine backends with the fp32 model: '
+                                                 'throughput, cosine similarity of the vectors and downstream F1.')
+    parser.add_argument('--data', default='/netscratch/abu/forc_I_dataset.csv', help='dataset (title, abstract, label)')
+    parser.add_argument('--rows', type=int, default=2000, help='number of rows used for the comparison')
+    parser.add_argument('--backends', nargs='*', default=BACKENDS[1:], choices=BACKENDS[1:])
+    parser.add_argument('--threads', type=int, help='CPU threads (default: all cores)')
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.data).sample(frac=1, random_state=0).head(args.rows)
+    y = data['label'].factorize()[0]
+    train_index, test_index = train_test_split(np.arange(len(data)), test_size=0.2, random_state=0)
+
+    results = []
+    reference = None
+    for backend in ['torch'] + args.backends:
+        engine = EmbeddingEngine('malteos/scincl', num_threads=args.threads, backend=backend)
+        texts = engine.texts(data)
+        # warm-up (graph optimization, memory allocation) is not part of the measurement
+        engine.encode(texts[:8])
+        start = time.perf_counter()
+        X = engine.encode(texts)
+        seconds = time.perf_counter() - start
+
+        if reference is None:
+            reference = X
+        similarity = cosine_similarity_rows(X, reference)
+        results.append({'backend': backend,
+                        'rows/s': len(texts) / seconds,
+                        'mean cosine': similarity.mean(),
+                        'min cosine': similarity.min(),
+                        'f1': downstream_f1(X, y, train_index, test_index)})
+        print(f"{backend}: {len(texts) / seconds:.1f} rows/s")
+
+    results = pd.DataFrame(results)
+    results['speedup'] = results['rows/s'] / results['rows/s'].iloc[0]
+    results['f1 delta'] = results['f1'] - results['f1'].iloc[0]
+    print(results.to_string(index=False, float_format=lambda value: f'{value:.4f}'))
@@ -1,15 +1,117 @@
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
 import pandas as pd
+from scipy import sparse
+
+import sklearn
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+# largest dense feature matrix (in GB) that to_dense creates
+MAX_DENSE_GB = 4.0
+
+# parameters of the TfidfVectorizer of get_features
+TFIDF_PARAMS = {'sublinear_tf': True,
+                'min_df': 5,
+                'norm': 'l2',
+                'encoding': 'latin-1',
+                'ngram_range': (1, 2),
+                'stop_words': 'english'}
+
+# fitted vectorizers and feature matrices of get_features; bump FEATURE_CACHE_VERSION when the preprocessing changes
+FEATURE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feature_cache')
+FEATURE_CACHE_VERSION = 1
+
+
+def dense_size_gb(X):
+    # memory of X as dense array
+    return X.shape[0] * X.shape[1] * X.dtype.itemsize / 1024 ** 3
+
+
+def to_dense(X, max_dense_gb=MAX_DENSE_GB):
+    # densifies a sparse feature matrix, refuses if the dense array would exceed max_dense_gb
+    if not sparse.issparse(X):
+        return np.asarray(X)
+    size_gb = dense_size_gb(X)
+    if size_gb > max_dense_gb:
+        raise MemoryError(f"Dense feature matrix of shape {X.shape} would need {size_gb:.3g} GB "
+                          f"(limit {max_dense_gb} GB), use the sparse matrix instead")
+    return X.toarray()
+
+
+def documents_hash(documents):
+    # order sensitive hash of the documents, computed from per-row hashes
+    return hashlib.sha256(pd.util.hash_pandas_object(documents, index=False).to_numpy().tobytes()).hexdigest()
+
+
+class FeatureCache:
+    # persisted TF-IDF vectorizer and feature matrix (.npz) of one parameter set; the entry is valid for the data
+    # whose documents_hash is stored in meta.json
 
-from sklearn.feature_extraction.text import TfidfVectorizer
+    def __init__(self, params, cache_dir=FEATURE_CACHE_DIR):
+        key = json.dumps({'params': params, 'version': FEATURE_CACHE_VERSION, 'sklearn': sklearn.__version__},
+                         sort_keys=True, default=str)
+        self.path = os.path.join(cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest()[:16])
+        self.meta_path = os.path.join(self.path, 'meta.json')
+        self.features_path = os.path.join(self.path, 'features.npz')
+        self.vectorizer_path = os.path.join(self.path, 'vectorizer.joblib')
+        self.meta = {}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r') as infile:
+                self.meta = json.load(infile)
+
+    def lookup(self, documents):
+        # 'hit' if the cached matrix belongs to documents, 'append' if documents only has rows appended to the
+        # cached data, 'miss' otherwise
+        rows = self.meta.get('rows')
+        if rows is None or rows > len(documents):
+            return 'miss'
+        if documents_hash(documents.iloc[:rows]) != self.meta['data_hash']:
+            return 'miss'
+        return 'hit' if rows == len(documents) else 'append'
+
+    def load_features(self):
+        return sparse.load_npz(self.features_path).tocsr()
+
+    def load_vectorizer(self):
+        return joblib.load(self.vectorizer_path)
+
+    def save(self, vectorizer, X, documents, fitted_rows):
+        # meta.json is removed first and written last, so an interrupted save leaves no valid entry
+        os.makedirs(self.path, exist_ok=True)
+        if os.path.exists(self.meta_path):
+            os.remove(self.meta_path)
+        # the stop word set is only needed for fitting and makes the pickle large
+        if hasattr(vectorizer, 'stop_words_'):
+            delattr(vectorizer, 'stop_words_')
+        joblib.dump(vectorizer, self.vectorizer_path)
+        # uncompressed, so loading is a plain read
+        sparse.save_npz(self.features_path, X, compressed=False)
+        self.meta = {'rows': len(documents), 'fitted_rows': fitted_rows, 'data_hash': documents_hash(documents),
+                     'shape': list(X.shape)}
+        with open(self.meta_path, 'w') as outfile:
+            json.dump(self.meta, outfile)
 
 
 class data_provider:
     def __init__(self, PATH="merged_data_fuzzywuzzy_dedup.csv",
-                 features=['title', 'abstract', 'label']):
-        self.data = pd.read_csv(PATH)
-        print(self.data.head())
+                 features=['title', 'abstract', 'label'], max_dense_gb=MAX_DENSE_GB, stream=False):
+        # stream=True does not load the dataset, only the chunked feature mode (get_hashed_features) is available
+        self.PATH = PATH
         self.features = features
-        self.baseline_data = self.data[self.features]
+        self.max_dense_gb = max_dense_gb
+        if not stream:
+            self.data = pd.read_csv(PATH)
+            print(self.data.head())
+            self.baseline_data = self.data[self.features]
+
+        # state of the streamed feature mode, computed by the first pass over the data
+        self.hashing_idf = None
+        self.label_to_id = None
 
     def convert_labels_to_ids(self):
         self.baseline_data['label_id'] = self.baseline_data['label'].factorize()[0]
@@ -26,16 +128,91 @@ class data_provider:
         self.baseline_data['title'] = [title.lower() for title in self.baseline_data['title']]
         self.baseline_data['abstract'] = [abstract.lower() for abstract in self.baseline_data['abstract']]
 
-    def get_features(self):
-        tfidf = TfidfVectorizer(sublinear_tf=True,
-                                min_df=5,
-                                norm='l2',
-                                encoding='latin-1',
-                                ngram_range=(1, 2),
-                                stop_words='english')
+    def get_features(self, dense=False, cache_dir=FEATURE_CACHE_DIR, append=True):
+        # returns a CSR matrix, which sklearn's splitting and linear models accept as is;
+        # dense=True densifies it (only below max_dense_gb, see to_dense)
+        # the fitted vectorizer and the matrix are cached in cache_dir (cache_dir=None disables the cache); if rows
+        # were only appended to the cached data and append=True, just the new rows are transformed with the cached
+        # vectorizer (its vocabulary and idf stay those of the cached data)
         self.preprocess_text()
-        return tfidf.fit_transform(self.baseline_data.title + self.baseline_data.abstract).toarray()
+        documents = (self.baseline_data.title + self.baseline_data.abstract).reset_index(drop=True)
+        cache = FeatureCache(TFIDF_PARAMS, cache_dir) if cache_dir else None
+        status = cache.lookup(documents) if cache else 'miss'
+        if status != 'miss' and not append and (status == 'append' or cache.meta['fitted_rows'] != cache.meta['rows']):
+            status = 'miss'
+
+        if status == 'hit':
+            X = cache.load_features()
+            print(f"Loaded cached TF-IDF features from {cache.path}")
+        elif status == 'append':
+            tfidf = cache.load_vectorizer()
+            rows = cache.meta['rows']
+            X = sparse.vstack([cache.load_features(), tfidf.transform(documents.iloc[rows:])]).tocsr()
+            cache.save(tfidf, X, documents, cache.meta['fitted_rows'])
+            print(f"Transformed {len(documents) - rows} appended rows with the cached TF-IDF vectorizer")
+        else:
+            tfidf = TfidfVectorizer(**TFIDF_PARAMS)
+            X = tfidf.fit_transform(documents).tocsr()
+            if cache:
+                cache.save(tfidf, X, documents, len(documents))
+        print(f"TF-IDF features: {X.shape}, {X.nnz} non-zeros, "
+              f"{(X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 1024 ** 2:.1f} MB sparse "
+              f"({dense_size_gb(X):.3g} GB dense)")
+        return to_dense(X, self.max_dense_gb) if dense else X
 
     def get_labels(self):
         self.convert_labels_to_ids()
         return self.baseline_data.label_id
+
+    def read_chunks(self, chunksize=10000):
+        # streams the dataset in chunks, preprocessed like preprocess_text
+        for chunk in pd.read_csv(self.PATH, usecols=self.features, chunksize=chunksize):
+            chunk['abstract'] = chunk['abstract'].fillna('').astype(str).str.lower()
+            chunk['title'] = chunk['title'].astype(str).str.lower()
+            yield chunk
+
+    def hashing_vectorizer(self, n_features=2 ** 20):
+        # stateless counterpart of the TfidfVectorizer of get_features (raw counts, reweighted in get_hashed_features)
+        return HashingVectorizer(n_features=n_features,
+                                 encoding='latin-1',
+                                 ngram_range=(1, 2),
+                                 stop_words='english',
+                                 alternate_sign=False,
+                                 norm=None)
+
+    def fit_hashing_idf(self, chunksize=10000, n_features=2 ** 20, min_df=5):
+        # first pass: document frequencies of the hashed features and the label ids (in order of appearance,
+        # like convert_labels_to_ids); memory is O(n_features), not O(dataset)
+        vectorizer = self.hashing_vectorizer(n_features)
+        document_frequency = np.zeros(n_features, dtype=np.int64)
+        n_documents = 0
+        self.label_to_id = {}
+        for chunk in self.read_chunks(chunksize):
+            X = vectorizer.transform(chunk.title + chunk.abstract)
+            document_frequency += np.bincount(X.indices, minlength=n_features)
+            n_documents += X.shape[0]
+            for label in chunk['label']:
+                self.label_to_id.setdefault(label, len(self.label_to_id))
+
+        # smooth idf as in TfidfVectorizer, features below min_df are dropped (idf 0)
+        self.hashing_idf = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+        self.hashing_idf[document_frequency < min_df] = 0
+        print(f"Hashed features: {n_documents} documents, {(document_frequency >= min_df).sum()} features "
+              f"with df >= {min_df}")
+        return self.hashing_idf
+
+    def get_hashed_features(self, chunksize=10000, n_features=2 ** 20, min_df=5):
+        # streamed feature mode: yields (X, y) per chunk, X a CSR block with sublinear tf, idf weighting and l2 norm
+        # like get_features; the idf is fitted by a first pass over the data (fit_hashing_idf) if not done yet
+        if self.hashing_idf is None or len(self.hashing_idf) != n_features:
+            self.fit_hashing_idf(chunksize, n_features, min_df)
+
+        vectorizer = self.hashing_vectorizer(n_features)
+        idf = sparse.diags(self.hashing_idf)
+        for chunk in self.read_chunks(chunksize):
+            X = vectorizer.transform(chunk.title + chunk.abstract)
+            X.data = np.log(X.data) + 1
+            X = normalize(X @ idf, norm='l2', copy=False).tocsr()
+            X.eliminate_zeros()
+            y = chunk['label'].map(self.label_to_id).to_numpy()
+            yield X, y
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import unicodedata
+
+import numpy as np
+
+
+def normalize_text(text):
+    """
+    input: title [SEP] abstract text
+    output: the text in unicode NFC with runs of whitespace collapsed to one space (changes that do not change the
+    tokens, so they should not cause a cache miss)
+    """
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def text_key(text, model_name):
+    """
+    output: cache key of a text for a model (hex digest)
+    """
+    return hashlib.sha256((model_name + '\n' + normalize_text(text)).encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Append-only cache of embeddings keyed by a hash of the normalized text and the model identifier.
+
+    A cache is a directory with
+        - vectors.bin: raw (n, dim) float32 matrix, appended to and read through np.memmap
+        - keys.txt: the key of every row of vectors.bin, one per line
+        - meta.json: model and dim
+
+    Vectors are appended before their keys, so after a crash a row without key is ignored (and overwritten by the
+    next append).
+    """
+
+    def __init__(self, path, model_name, dim):
+        """
+        input: directory of the cache, model identifier, dimension of the vectors
+        """
+        self.path = path
+        self.model_name = model_name
+        self.dim = dim
+        self.vectors_path = os.path.join(path, 'vectors.bin')
+        self.keys_path = os.path.join(path, 'keys.txt')
+        self.row_bytes = dim * np.dtype(np.float32).itemsize
+
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as infile:
+                meta = json.load(infile)
+            if meta != {'model': model_name, 'dim': dim}:
+                raise ValueError(f"Embedding cache in {path} belongs to {meta}, not to {model_name} ({dim})")
+        else:
+            with open(meta_path, 'w') as outfile:
+                json.dump({'model': model_name, 'dim': dim}, outfile)
+
+        # the valid prefix of keys.txt (a crash can leave a partial last line) that has vectors
+        self.keys = []
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, 'r') as infile:
+                for line in infile:
+                    if not line.endswith('\n') or len(line) != 65:
+                        break
+                    self.keys.append(line[:64])
+        vector_rows = os.path.getsize(self.vectors_path) // self.row_bytes if os.path.exists(self.vectors_path) else 0
+        self.keys = self.keys[:vector_rows]
+        if os.path.exists(self.keys_path) and os.path.getsize(self.keys_path) != len(self.keys) * 65:
+            with open(self.keys_path, 'w') as outfile:
+                outfile.writelines(key + '\n' for key in self.keys)
+        self.index = {key: row for row, key in enumerate(self.keys)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def vectors(self):
+        """
+        output: memory-mapped (len(self), dim) matrix of the cached vectors
+        """
+        if not self.keys:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(len(self.keys), self.dim))
+
+    def add(self, keys, vectors):
+        """
+        input: keys and (len(keys), dim) array of their vectors
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with open(self.vectors_path, 'ab') as outfile:
+            # drop a partial row or rows without key left by a crash
+            outfile.truncate(len(self.keys) * self.row_bytes)
+            outfile.write(vectors.tobytes())
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        with open(self.keys_path, 'a') as outfile:
+            outfile.writelines(key + '\n' for key in keys)
+        for key in keys:
+            self.index[key] = len(self.keys)
+            self.keys.append(key)
+
+    def encode(self, texts, encoder):
+        """
+        input: texts, function that embeds a list of texts ((n, dim) array)
+        output: (len(texts), dim) float32 array in the order of texts; only the texts missing in the cache are
+        passed to encoder, their vectors are added to the cache
+        """
+        keys = [text_key(text, self.model_name) for text in texts]
+        missing = {}
+        for position, key in enumerate(keys):
+            if key not in self.index and key not in missing:
+                missing[key] = position
+        if missing:
+            self.add(list(missing), encoder([texts[position] for position in missing.values()]))
+
+        print(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses")
+        rows = np.array([self.index[key] for key in keys], dtype=np.int64)
+        return np.asarray(self.vectors()[rows]) if len(rows) else np.empty((0, self.dim), dtype=np.float32)
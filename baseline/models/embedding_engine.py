@@ -0,0 +1,170 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import torch
+from transformers import AutoTokenizer, AutoModel
+
+BACKENDS = ['torch', 'int8', 'onnx', 'onnx-int8']
+# exported ONNX graphs of the onnx backends
+ONNX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'onnx')
+
+
+def plan_batches(lengths, max_tokens=16384, max_batch_size=256):
+    """
+    input: token length of every text, token budget per batch (padded tokens: rows * longest row), maximum rows per
+    batch
+    output: list of index arrays, one per batch; the texts are sorted by length, so every batch holds texts of
+    similar length and little padding, and short texts are packed into larger batches than long ones
+    """
+    lengths = np.asarray(lengths)
+    order = np.argsort(lengths, kind='stable')
+    batches = []
+    start = 0
+    while start < len(order):
+        end = start + 1
+        # lengths grow within the sorted order, so the last row of a batch is its longest
+        while end < len(order) and end - start < max_batch_size and \
+                (end - start + 1) * lengths[order[end]] <= max_tokens:
+            end += 1
+        batches.append(order[start:end])
+        start = end
+    return batches
+
+
+class EmbeddingEngine:
+    """
+    Computes SciNCL embeddings ([CLS] token of the last hidden state) of title [SEP] abstract texts.
+
+    Instead of padding every batch of rows (in dataset order) to the longest text, the texts are tokenized once without
+    padding, batched by token budget in order of their length (see plan_batches) and padded per batch only; the model
+    runs under torch.inference_mode (no autograd graph). The embeddings are returned in the order of the input.
+
+    Backends for CPU nodes:
+        - torch: fp32 model
+        - int8: the Linear layers dynamically quantized to int8 (torch.quantization.quantize_dynamic)
+        - onnx: the model exported to ONNX and run with onnxruntime (all graph optimizations)
+        - onnx-int8: the ONNX graph with dynamically quantized int8 weights
+    The quantized backends change the vectors slightly; compare-backends.py checks cosine similarity and downstream
+    F1 against fp32.
+    """
+
+    def __init__(self, model_name='malteos/scincl', max_length=512, max_tokens=16384, max_batch_size=256,
+                 num_threads=None, backend='torch', onnx_dir=ONNX_DIR):
+        """
+        input: model identifier, maximum tokens per text, token budget and maximum rows per batch, number of CPU
+        threads (default: all cores), backend (see BACKENDS), directory of the exported ONNX graphs
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend}, use one of {BACKENDS}")
+        self.model_name = model_name
+        self.max_length = max_length
+        self.max_tokens = max_tokens
+        self.max_batch_size = max_batch_size
+        self.backend = backend
+        self.num_threads = num_threads or os.cpu_count()
+
+        torch.set_num_threads(self.num_threads)
+        try:
+            # inter-op parallelism does not help a single forward pass; can only be set before the first one
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(model_name)
+        self.model.eval()
+
+        self.session = None
+        if backend == 'int8':
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif backend.startswith('onnx'):
+            self.session = self._onnx_session(onnx_dir)
+
+    @property
+    def model_id(self):
+        """ identifier of model and backend, e.g. for cache keys (the backends produce different vectors) """
+        return self.model_name if self.backend == 'torch' else f'{self.model_name}:{self.backend}'
+
+    @property
+    def dim(self):
+        return self.model.config.hidden_size
+
+    def texts(self, data):
+        """
+        input: pd.DataFrame with title and abstract
+        output: list of title [SEP] abstract texts (missing abstracts as empty strings)
+        """
+        abstracts = ["" if pd.isna(abstract) else abstract for abstract in data['abstract']]
+        return [title + self.tokenizer.sep_token + abstract for title, abstract in zip(data['title'], abstracts)]
+
+    def encode(self, texts):
+        """
+        input: list of texts
+        output: (len(texts), dim) float32 array of embeddings in the order of texts
+        """
+        encoded = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        lengths = [len(input_ids) for input_ids in encoded['input_ids']]
+        embeddings = np.empty((len(texts), self.dim), dtype=np.float32)
+
+        with torch.inference_mode():
+            for batch in plan_batches(lengths, self.max_tokens, self.max_batch_size):
+                features = self.tokenizer.pad({key: [encoded[key][i] for i in batch] for key in encoded.keys()},
+                                              return_tensors='pt')
+                embeddings[batch] = self._forward(features)
+
+        return embeddings
+
+    def encode_frame(self, data):
+        """
+        input: pd.DataFrame with title and abstract
+        output: (len(data), dim) float32 array of embeddings in the order of data
+        """
+        return self.encode(self.texts(data))
+
+    def _forward(self, features):
+        """
+        input: padded batch (tensors)
+        output: (n, dim) array of the [CLS] vectors
+        """
+        if self.session is None:
+            return self.model(**features).last_hidden_state[:, 0, :].float().numpy()
+
+        input_names = {model_input.name for model_input in self.session.get_inputs()}
+        inputs = {name: tensor.numpy().astype(np.int64) for name, tensor in features.items() if name in input_names}
+        return self.session.run(['last_hidden_state'], inputs)[0][:, 0, :]
+
+    def _onnx_session(self, onnx_dir):
+        """
+        Exports the model to ONNX (once per model) and opens an onnxruntime session of the backend.
+        """
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("The onnx backends need onnxruntime (pip install onnx onnxruntime)")
+
+        path = os.path.join(onnx_dir, self.model_name.replace('/', '__') + '.onnx')
+        if not os.path.exists(path):
+            os.makedirs(onnx_dir, exist_ok=True)
+            features = self.tokenizer(['title' + self.tokenizer.sep_token + 'abstract'], return_tensors='pt')
+            # in the order of the arguments of forward(), which the exported graph inputs follow
+            input_names = [name for name in ['input_ids', 'attention_mask', 'token_type_ids'] if name in features]
+            dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+            dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+            torch.onnx.export(self.model, ({name: features[name] for name in input_names},), path,
+                              input_names=input_names,
+                              output_names=['last_hidden_state'], dynamic_axes=dynamic_axes, opset_version=14)
+
+        if self.backend == 'onnx-int8':
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantized_path = path[:-len('.onnx')] + '-int8.onnx'
+            if not os.path.exists(quantized_path):
+                quantize_dynamic(path, quantized_path, weight_type=QuantType.QInt8)
+            path = quantized_path
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = self.num_threads
+        options.inter_op_num_threads = 1
+        return onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
@@ -0,0 +1,257 @@
+"""
+Sharded, resumable SciNCL embedding job.
+
+The dataset is split into shards of --shard-size rows. Shards are encoded by --workers processes with
+--threads-per-worker torch threads each; every finished shard is written atomically to shards/shard_{i}.npy and
+recorded in the manifest (job.json + shards/shard_{i}.json). A restart only runs the shards without record, and
+several machines can share the output directory by running disjoint --shards ranges. The texts are written once to
+texts/ (see write_texts), the workers only receive shard bounds and read their rows from there. Once all shards are finished,
+they are assembled into one EmbeddingStore (see embedding_store.py).
+
+    python embedding_job.py --data forc_I_dataset.csv --output embeddings --workers 4 --threads-per-worker 2
+    python embedding_job.py --data forc_I_dataset.csv --output embeddings --shards 0:30     # machine 1
+    python embedding_job.py --data forc_I_dataset.csv --output embeddings --shards 30:60    # machine 2
+    python embedding_job.py --data forc_I_dataset.csv --output embeddings --assemble
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from embedding_store import EmbeddingStore
+
+# engine and text directory of a worker process, set once by _init_worker
+_engine = None
+_text_dir = None
+
+
+def data_hash(data):
+    """
+    output: hash of the title and abstract columns (identifies the encoded data in the manifest)
+    """
+    return hashlib.sha256(pd.util.hash_pandas_object(data[['title', 'abstract']]).to_numpy().tobytes()).hexdigest()
+
+
+def write_texts(data, text_dir):
+    """
+    Writes title and abstract of every row as one utf-8 buffer (texts.npy) and the (rows, 3) offsets of title,
+    abstract and end of every row (offsets.npy), so any range of rows can be read from a memory map (see read_texts).
+    input: pd.DataFrame with title and abstract, output directory
+    """
+    parts = []
+    offsets = np.zeros((len(data), 3), dtype=np.int64)
+    position = 0
+    for row, (title, abstract) in enumerate(zip(data['title'], data['abstract'])):
+        for column, value in enumerate([title, abstract]):
+            encoded = b'' if pd.isna(value) else str(value).encode('utf-8')
+            offsets[row, column] = position
+            parts.append(encoded)
+            position += len(encoded)
+        offsets[row, 2] = position
+
+    # several machines may write the same texts at once, the first rename wins
+    tmp_dir = f'{text_dir}.{socket.gethostname()}.{os.getpid()}.tmp'
+    os.makedirs(tmp_dir, exist_ok=True)
+    np.save(os.path.join(tmp_dir, 'texts.npy'), np.frombuffer(b''.join(parts), dtype=np.uint8))
+    np.save(os.path.join(tmp_dir, 'offsets.npy'), offsets)
+    try:
+        os.rename(tmp_dir, text_dir)
+    except OSError:
+        if not os.path.isdir(text_dir):
+            raise
+        shutil.rmtree(tmp_dir)
+
+
+def read_texts(text_dir, start, end):
+    """
+    input: directory written by write_texts, first and last (exclusive) row
+    output: pd.DataFrame with title and abstract of the rows (missing values as empty strings)
+    """
+    texts = np.load(os.path.join(text_dir, 'texts.npy'), mmap_mode='r')
+    offsets = np.load(os.path.join(text_dir, 'offsets.npy'), mmap_mode='r')[start:end]
+    if len(offsets) == 0:
+        return pd.DataFrame({'title': [], 'abstract': []})
+    base = offsets[0, 0]
+    buffer = texts[base:offsets[-1, 2]].tobytes()
+    columns = [[buffer[row[column] - base:row[column + 1] - base].decode('utf-8') for row in offsets]
+               for column in range(2)]
+    return pd.DataFrame({'title': columns[0], 'abstract': columns[1]}, index=pd.RangeIndex(start, end))
+
+
+class EmbeddingJob:
+    """
+    Manifest and shard files of an embedding job in an output directory.
+    """
+
+    def __init__(self, output_dir, data, shard_size=1000, model_name='malteos/scincl', backend='torch'):
+        """
+        input: output directory, pd.DataFrame with title and abstract, rows per shard, model identifier and backend
+        of the EmbeddingEngine
+        """
+        self.output_dir = output_dir
+        self.shard_dir = os.path.join(output_dir, 'shards')
+        self.text_dir = os.path.join(output_dir, 'texts')
+        self.data = data
+        self.job = {'rows': len(data), 'shard_size': shard_size, 'model': model_name, 'backend': backend,
+                    'data_hash': data_hash(data)}
+
+        job_path = os.path.join(output_dir, 'job.json')
+        if os.path.exists(job_path):
+            with open(job_path, 'r') as infile:
+                existing = json.load(infile)
+            if existing != self.job:
+                raise ValueError(f"{output_dir} belongs to another job ({existing}), use a new output directory")
+        else:
+            os.makedirs(self.shard_dir, exist_ok=True)
+            _write_json(self.job, job_path)
+
+    @property
+    def n_shards(self):
+        return -(-self.job['rows'] // self.job['shard_size'])
+
+    def shard_rows(self, shard):
+        """
+        output: first and last (exclusive) row of a shard
+        """
+        start = shard * self.job['shard_size']
+        return start, min(start + self.job['shard_size'], self.job['rows'])
+
+    def shard_path(self, shard, extension):
+        return os.path.join(self.shard_dir, f'shard_{shard:05d}.{extension}')
+
+    def finished(self):
+        """
+        output: the manifest records of the finished shards {shard: record}
+        """
+        records = {}
+        for shard in range(self.n_shards):
+            if os.path.exists(self.shard_path(shard, 'json')):
+                with open(self.shard_path(shard, 'json'), 'r') as infile:
+                    records[shard] = json.load(infile)
+        return records
+
+    def pending(self, shards=None):
+        """
+        input: range of shards handled by this machine (default: all)
+        output: shards of the range that are not finished
+        """
+        finished = self.finished()
+        return [shard for shard in (shards if shards is not None else range(self.n_shards)) if shard not in finished]
+
+    def run(self, shards=None, workers=1, threads_per_worker=1):
+        """
+        Encodes the pending shards of the range with a pool of worker processes.
+        """
+        pending = self.pending(shards)
+        print(f"{len(pending)} shards to encode with {workers} workers x {threads_per_worker} threads")
+        if not pending:
+            return
+
+        # the texts belong to the data of job.json, so texts written by an earlier run (or machine) are reused
+        if not os.path.exists(self.text_dir):
+            write_texts(self.data, self.text_dir)
+        tasks = [(shard,) + self.shard_rows(shard) for shard in pending]
+        # spawn, so workers do not inherit the torch thread pools of the parent
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(workers, initializer=_init_worker,
+                          initargs=(self.job['model'], self.job['backend'], threads_per_worker,
+                                    self.text_dir)) as pool:
+            for shard, vectors, seconds in pool.imap_unordered(_encode_shard, tasks):
+                self._finish_shard(shard, vectors, seconds)
+                print(f"Finished shard {shard} ({len(vectors)} rows, {len(vectors) / seconds:.1f} rows/s)")
+
+    def assemble(self, store_dir=None):
+        """
+        input: directory of the EmbeddingStore (default: output_dir/store)
+        output: EmbeddingStore with the vectors of all shards in dataset order
+        """
+        missing = self.pending()
+        if missing:
+            raise RuntimeError(f"{len(missing)} shards are not finished yet, e.g. {missing[:5]}")
+
+        first = np.load(self.shard_path(0, 'npy'), mmap_mode='r')
+        model_id = self.job['model'] if self.job['backend'] == 'torch' else f"{self.job['model']}:{self.job['backend']}"
+        store = EmbeddingStore.create(store_dir or os.path.join(self.output_dir, 'store'), self.data.index,
+                                      first.shape[1], model=model_id, data_hash=self.job['data_hash'])
+        for shard in range(self.n_shards):
+            store.write(self.shard_rows(shard)[0], np.load(self.shard_path(shard, 'npy'), mmap_mode='r'))
+        store.flush()
+        return store
+
+    def _finish_shard(self, shard, vectors, seconds):
+        # the vectors first (atomic rename), then the manifest record, so a record always has its vectors
+        tmp_path = self.shard_path(shard, 'tmp.npy')
+        np.save(tmp_path, vectors)
+        os.replace(tmp_path, self.shard_path(shard, 'npy'))
+        start, end = self.shard_rows(shard)
+        _write_json({'start': start, 'end': end, 'seconds': round(seconds, 3), 'host': socket.gethostname(),
+                     'finished_at': datetime.now().isoformat(timespec='seconds')}, self.shard_path(shard, 'json'))
+
+
+def _init_worker(model_name, backend, threads, text_dir):
+    global _engine, _text_dir
+    from embedding_engine import EmbeddingEngine
+    _engine = EmbeddingEngine(model_name, num_threads=threads, backend=backend)
+    _text_dir = text_dir
+
+
+def _encode_shard(task):
+    shard, first, last = task
+    start = time.perf_counter()
+    vectors = _engine.encode_frame(read_texts(_text_dir, first, last))
+    return shard, vectors, time.perf_counter() - start
+
+
+def _write_json(data, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as outfile:
+        json.dump(data, outfile)
+    os.replace(tmp_path, path)
+
+
+def parse_shard_range(value):
+    """
+    input: 'start:end' (end exclusive, either may be empty)
+    output: (start, end) with None for an open end
+    """
+    start, _, end = value.partition(':')
+    return int(start) if start else None, int(end) if end else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Sharded, resumable SciNCL embedding job.')
+    parser.add_argument('--data', default='/netscratch/abu/forc_I_dataset.csv', help='dataset (title, abstract)')
+    parser.add_argument('--output', default='/netscratch/abu/FoRC-embeddings/SciNCL/forc_I_embedding_job',
+                        help='output directory (manifest, shards and assembled store)')
+    parser.add_argument('--shard-size', type=int, default=1000, help='rows per shard')
+    parser.add_argument('--shards', default=':', help='range of shards run on this machine, e.g. 0:30')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes')
+    parser.add_argument('--threads-per-worker', type=int,
+                        help='torch threads per worker process (default: the cores divided among the workers)')
+    parser.add_argument('--model', default='malteos/scincl')
+    parser.add_argument('--backend', default='torch', help='backend of the EmbeddingEngine')
+    parser.add_argument('--assemble', action='store_true', help='only assemble the finished shards into a store')
+    args = parser.parse_args()
+
+    merged_df = pd.read_csv(args.data)
+    job = EmbeddingJob(args.output, merged_df[['title', 'abstract']], args.shard_size, args.model, args.backend)
+
+    if not args.assemble:
+        start, end = parse_shard_range(args.shards)
+        threads = args.threads_per_worker or max((os.cpu_count() or 1) // args.workers, 1)
+        job.run(range(start or 0, min(end if end is not None else job.n_shards, job.n_shards)), args.workers, threads)
+
+    pending = job.pending()
+    if pending:
+        print(f"{job.n_shards - len(pending)} of {job.n_shards} shards finished, assemble once all are done")
+    else:
+        store = job.assemble()
+        print(f"Assembled {len(store)} embeddings into {store.path}")
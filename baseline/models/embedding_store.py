@@ -0,0 +1,109 @@
+import json
+import os
+
+import numpy as np
+
+
+class EmbeddingStore:
+    """
+    Contiguous on-disk store of embedding vectors with an ID index.
+
+    A store is a directory with
+        - embeddings.npy: (rows, dim) float32 or float16 matrix, written in place and read through np.memmap
+        - ids.npy: the ID of every row (same order as embeddings.npy)
+        - meta.json: rows, dim, dtype, model and the number of rows written so far
+
+    The matrix is preallocated by create() and filled batch by batch with write(); meta.json records the progress, so
+    an interrupted encoding run can continue where it stopped (see rows_written). open() maps the matrix read-only,
+    so classifiers can use it without loading or copying it.
+    """
+
+    def __init__(self, path, embeddings, ids, meta):
+        self.path = path
+        self.embeddings = embeddings
+        self.ids = ids
+        self.meta = meta
+        self._index = None
+
+    @classmethod
+    def create(cls, path, ids, dim, dtype='float32', model=None, data_hash=None):
+        """
+        input: directory of the store, IDs of all rows, dimension and dtype of the vectors, model identifier, hash of
+        the encoded data
+        output: writable store; an existing store with the same IDs, dim, dtype, model and data hash is continued
+        """
+        ids = np.asarray([str(row_id) for row_id in ids])
+        meta = {'rows': len(ids), 'dim': int(dim), 'dtype': np.dtype(dtype).name, 'model': model,
+                'data_hash': data_hash, 'rows_written': 0}
+
+        if os.path.exists(os.path.join(path, 'meta.json')):
+            store = cls.open(path, mode='r+')
+            same_layout = all(store.meta.get(key) == meta[key] for key in ['rows', 'dim', 'dtype', 'model',
+                                                                             'data_hash'])
+            if same_layout and np.array_equal(store.ids, ids):
+                return store
+
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'ids.npy'), ids)
+        embeddings = np.lib.format.open_memmap(os.path.join(path, 'embeddings.npy'), mode='w+',
+                                               dtype=meta['dtype'], shape=(meta['rows'], meta['dim']))
+        store = cls(path, embeddings, ids, meta)
+        store._save_meta()
+        return store
+
+    @classmethod
+    def open(cls, path, mode='r'):
+        """
+        input: directory of the store, 'r' (read-only) or 'r+' (to continue writing)
+        output: store whose embeddings are memory mapped
+        """
+        with open(os.path.join(path, 'meta.json'), 'r') as infile:
+            meta = json.load(infile)
+        embeddings = np.load(os.path.join(path, 'embeddings.npy'), mmap_mode=mode)
+        ids = np.load(os.path.join(path, 'ids.npy'))
+        return cls(path, embeddings, ids, meta)
+
+    @property
+    def rows_written(self):
+        return self.meta['rows_written']
+
+    @property
+    def complete(self):
+        return self.meta['rows_written'] == self.meta['rows']
+
+    def write(self, start, vectors):
+        """
+        input: first row of the batch, (n, dim) array of the batch
+        Writes the batch in place; batches are expected in row order, rows_written is the end of the last batch.
+        """
+        vectors = np.asarray(vectors)
+        self.embeddings[start:start + len(vectors)] = vectors.astype(self.embeddings.dtype, copy=False)
+        self.meta['rows_written'] = max(self.meta['rows_written'], start + len(vectors))
+
+    def flush(self):
+        """ writes the mapped pages and the progress to disk """
+        self.embeddings.flush()
+        self._save_meta()
+
+    def index_of(self, row_id):
+        """
+        output: row of the ID
+        """
+        if self._index is None:
+            self._index = {row_id: row for row, row_id in enumerate(self.ids)}
+        return self._index[str(row_id)]
+
+    def get(self, row_ids):
+        """
+        output: (len(row_ids), dim) array of the vectors of the IDs
+        """
+        return self.embeddings[[self.index_of(row_id) for row_id in row_ids]]
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def _save_meta(self):
+        tmp_path = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp_path, 'w') as outfile:
+            json.dump(self.meta, outfile)
+        os.replace(tmp_path, os.path.join(self.path, 'meta.json'))
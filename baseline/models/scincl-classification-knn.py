@@ -0,0 +1,101 @@
+import argparse
+import os
+import time
+
+import torch
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score
+
+from embedding_store import EmbeddingStore
+from ann_index import IVFIndex, KNNClassifier, normalize_rows
+
+
+def exact_neighbours(embeddings, rows, queries, k, block_size=65536):
+    """
+    output: (q, k) rows of the embeddings with the highest cosine similarity to each query (brute force over the
+    given rows, block by block, for recall)
+    """
+    queries = normalize_rows(queries)
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start:start + block_size]
+        scores = np.concatenate([best_scores, queries @ normalize_rows(embeddings[block_rows]).T], axis=1)
+        candidates = np.concatenate([best_rows, np.broadcast_to(block_rows, (len(queries), len(block_rows)))], axis=1)
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k] if scores.shape[1] > k else np.argsort(-scores, axis=1)
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        best_rows = np.take_along_axis(candidates, best, axis=1)
+    return best_rows
+
+
+def recall_at_k(found, exact):
+    """
+    output: share of the exact k nearest neighbours that were found
+    """
+    return np.mean([len(np.intersect1d(a, b)) / len(b) for a, b in zip(found, exact)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='kNN field classification over an IVF index of the SciNCL embeddings, '
+                                                 'benchmarked against the logistic-regression baseline.')
+    parser.add_argument('--store', default="/netscratch/abu/FoRC-embeddings/SciNCL/forc_I_embeddings_store",
+                        help='directory of the embedding store (see scincl-embeddings.py)')
+    parser.add_argument('--labels', default="/netscratch/abu/forc-baseline-experiments/labels_forc_I_dataset.pt")
+    parser.add_argument('--index', default="/netscratch/abu/FoRC-embeddings/SciNCL/forc_I_ivf_index",
+                        help='directory of the IVF index (built from the training rows if missing)')
+    parser.add_argument('--n-lists', type=int, help='lists of the index (default: 4 * sqrt(training rows))')
+    parser.add_argument('-k', type=int, default=10, help='neighbours per query')
+    parser.add_argument('--n-probe', type=int, nargs='*', default=[1, 4, 8, 16, 32], help='lists searched per query')
+    parser.add_argument('--recall-queries', type=int, default=1000, help='test rows used to measure recall@k')
+    parser.add_argument('--skip-logreg', action='store_true', help='do not train the logistic-regression baseline')
+    args = parser.parse_args()
+
+    store = EmbeddingStore.open(args.store)
+    assert store.complete, f"Embedding store is incomplete ({store.rows_written} of {len(store)} rows)"
+    y = np.asarray(torch.load(args.labels))
+
+    # Same split as scincl-classification-sklearn.py; the index holds the training rows only
+    train_index, test_index = train_test_split(np.arange(len(store)), test_size=0.2, random_state=0)
+    X_test, y_test = np.asarray(store.embeddings[np.sort(test_index)]), y[np.sort(test_index)]
+
+    # an existing index is only used if it was built from the training rows of the same embeddings
+    index = IVFIndex.open(args.index) if os.path.exists(os.path.join(args.index, 'meta.json')) else None
+    if index is None or not index.matches(train_index, store.meta.get('data_hash')):
+        start = time.perf_counter()
+        index = IVFIndex.build(args.index, store.embeddings, rows=train_index, n_lists=args.n_lists,
+                               data_hash=store.meta.get('data_hash'))
+        print(f"Built index of {len(index)} vectors ({index.meta['n_lists']} lists) in "
+              f"{time.perf_counter() - start:.1f}s")
+
+    # recall@k against brute-force search on a sample of the test rows
+    queries = X_test[:args.recall_queries]
+    exact = exact_neighbours(store.embeddings, np.sort(train_index), queries, args.k)
+
+    results = []
+    for n_probe in args.n_probe:
+        knn = KNNClassifier(index, y, k=args.k, n_probe=n_probe)
+        start = time.perf_counter()
+        y_pred_test = knn.predict(X_test)
+        seconds = time.perf_counter() - start
+        results.append({'model': f'knn (n_probe={n_probe})',
+                        'recall@k': recall_at_k(index.search(queries, args.k, n_probe)[1], exact),
+                        'queries/s': len(X_test) / seconds,
+                        'accuracy': accuracy_score(y_test, y_pred_test),
+                        'f1': f1_score(y_test, y_pred_test, average='weighted')})
+        print(f"n_probe={n_probe}: {len(X_test) / seconds:.0f} queries/s")
+
+    if not args.skip_logreg:
+        # exactly the model of scincl-classification-sklearn.py (configuration and order of the training rows)
+        logreg = LogisticRegression(solver='lbfgs', multi_class='multinomial', random_state=0)
+        logreg.fit(store.embeddings[train_index], y[train_index])
+        start = time.perf_counter()
+        y_pred_test = logreg.predict(X_test)
+        seconds = time.perf_counter() - start
+        results.append({'model': 'logistic regression', 'recall@k': np.nan, 'queries/s': len(X_test) / seconds,
+                        'accuracy': accuracy_score(y_test, y_pred_test),
+                        'f1': f1_score(y_test, y_pred_test, average='weighted')})
+
+    print(pd.DataFrame(results).to_string(index=False, float_format=lambda value: f'{value:.4f}'))
@@ -3,30 +3,16 @@ import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
-from scipy.sparse import hstack
-from scipy import sparse
 
-# Set the path to the directory where the embeddings are saved
-embedding_dir = "/netscratch/abu/FoRC-embeddings/SciNCL/forc_I_embeddings_20230315/"
+from embedding_store import EmbeddingStore
 
-# Get features (embeddings)
-embeddings = []
-for i in range(1980):
-    embedding_file = embedding_dir + f"embeddings_{i}.pt"
-    embedding = torch.load(embedding_file)
-    embeddings.append(embedding)
+# Set the path to the directory of the embedding store (see scincl-embeddings.py)
+embedding_dir = "/netscratch/abu/FoRC-embeddings/SciNCL/forc_I_embeddings_store"
 
-embeddings_tensor = torch.cat(embeddings, dim=0)
-
-embeddings = []
-
-embeddings_list = embeddings_tensor.tolist()
-
-# transform to sparse
-embeddings_sparse = sparse.csr_matrix(embeddings_list)
-
-X = hstack([embeddings_sparse])
-X_arr = X.toarray()
+# Get features (embeddings): memory-mapped float32 matrix, nothing is loaded or copied here
+store = EmbeddingStore.open(embedding_dir)
+assert store.complete, f"Embedding store is incomplete ({store.rows_written} of {len(store)} rows)"
+X_arr = store.embeddings
 
 # Get labels 
 
@@ -0,0 +1,90 @@
+import argparse
+
+import torch
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
+
+from embedding_store import EmbeddingStore
+from softmax_sgd import SoftmaxSGDClassifier
+
+
+def blocks(n_rows, block_size):
+    """
+    output: (start, end) of the contiguous row blocks the embeddings are streamed in
+    """
+    return [(start, min(start + block_size, n_rows)) for start in range(0, n_rows, block_size)]
+
+
+def train_rows(embeddings, y, is_test, start, end):
+    """
+    output: embeddings (read from disk) and labels of the training rows of a block
+    """
+    keep = ~is_test[start:end]
+    return np.asarray(embeddings[start:end])[keep], y[start:end][keep]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Out-of-core SciNCL baseline: multinomial logistic regression trained '
+                                                 'with mini-batch SGD on embedding blocks streamed from the store.')
+    parser.add_argument('--store', default="/netscratch/abu/FoRC-embeddings/SciNCL/forc_I_embeddings_store",
+                        help='directory of the embedding store (see scincl-embeddings.py)')
+    parser.add_argument('--labels', default="/netscratch/abu/forc-baseline-experiments/labels_forc_I_dataset.pt")
+    parser.add_argument('--block-size', type=int, default=65536, help='rows read from disk at a time')
+    parser.add_argument('--batch-size', type=int, default=256, help='rows per SGD step')
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--learning-rate', type=float, default=1e-3)
+    parser.add_argument('--alpha', type=float, default=1e-4, help='L2 penalty')
+    args = parser.parse_args()
+
+    # Get features (embeddings): memory-mapped, only one block is in memory at a time
+    store = EmbeddingStore.open(args.store)
+    assert store.complete, f"Embedding store is incomplete ({store.rows_written} of {len(store)} rows)"
+    embeddings = store.embeddings
+    y = np.asarray(torch.load(args.labels))
+
+    # Same split as scincl-classification-sklearn.py, kept as a row mask instead of copies of the embeddings
+    _, test_index = train_test_split(np.arange(len(store)), test_size=0.2, random_state=0)
+    is_test = np.zeros(len(store), dtype=bool)
+    is_test[test_index] = True
+    row_blocks = blocks(len(store), args.block_size)
+    print('Train rows: ', len(store) - len(test_index))
+    print('Test rows: ', len(test_index))
+
+    # Standardization statistics of the training rows (first pass)
+    scaler = StandardScaler()
+    for start, end in row_blocks:
+        scaler.partial_fit(train_rows(embeddings, y, is_test, start, end)[0])
+
+    # Train model: every epoch visits the blocks in random order and shuffles the mini-batches within a block
+    classes = np.unique(y)
+    model = SoftmaxSGDClassifier(learning_rate=args.learning_rate, alpha=args.alpha, batch_size=args.batch_size,
+                                 random_state=0)
+    rng = np.random.default_rng(0)
+    for epoch in range(args.epochs):
+        loss, rows = 0.0, 0
+        for block in rng.permutation(len(row_blocks)):
+            X_block, y_block = train_rows(embeddings, y, is_test, *row_blocks[block])
+            model.partial_fit(scaler.transform(X_block), y_block, classes=classes)
+            loss += model.loss_ * len(X_block)
+            rows += len(X_block)
+        print(f'Epoch {epoch + 1}: loss {loss / rows:.4f}')
+
+    # Evaluation, streamed block by block (only the labels are collected)
+    y_test, y_pred_test = [], []
+    for start, end in row_blocks:
+        keep = is_test[start:end]
+        if keep.any():
+            y_test.append(y[start:end][keep])
+            y_pred_test.append(model.predict(scaler.transform(np.asarray(embeddings[start:end])[keep])))
+    y_test, y_pred_test = np.concatenate(y_test), np.concatenate(y_pred_test)
+
+    print('Model accuracy score: {0:0.4f}'. format(accuracy_score(y_test, y_pred_test)))
+    print('Model precision score: {0:0.4f}'. format(precision_score(y_test, y_pred_test, average='weighted')))
+    print('Model recall score: {0:0.4f}'. format(recall_score(y_test, y_pred_test, average='weighted')))
+    print('Model f1 score: {0:0.4f}'. format(f1_score(y_test, y_pred_test, average='weighted')))
+
+    # Classification Report
+    class_report = classification_report(y_test, y_pred_test)
+    print('Classification Report:\n', class_report)
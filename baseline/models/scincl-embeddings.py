@@ -1,53 +1,58 @@
+import hashlib
 import os
 import pandas as pd
 
 import torch
-from transformers import AutoTokenizer, AutoModel
 
+from embedding_cache import EmbeddingCache
+from embedding_engine import EmbeddingEngine
+from embedding_store import EmbeddingStore
 
-def get_scincl_embeddings(data_batch, tokenizer, model):
-    """
-    input: data_batch as a pd.DataFrame
-    output: torch.Tensor containing the embeddings of the title and abtract of each row in the input
-    """
-    # # remove nan from abstracts
-    data_batch['abstract'] = ["" if pd.isna(abstract) else abstract for abstract in data_batch['abstract']]
-
-    # concatenate title and abstract with [SEP] token
-    data_batch['title_abstract'] = [row['title'] + tokenizer.sep_token + (row['abstract'] or '')
-                                    for index, row in data_batch.iterrows()]
-    title_abstract_list = data_batch['title_abstract'].values.tolist()
-    # preprocess the input
-    inputs = tokenizer(title_abstract_list,
-                       padding=True, truncation=True,
-                       return_tensors="pt",
-                       max_length=512)
-    # inference
-    result = model(**inputs)
+EMBEDDING_STORE_DIR = "/netscratch/abu/FoRC-embeddings/SciNCL/forc_I_embeddings_store"
+# embeddings of all texts encoded so far (across dataset versions), keyed by text and model
+EMBEDDING_CACHE_DIR = "/netscratch/abu/FoRC-embeddings/SciNCL/embedding_cache"
+# backend of the EmbeddingEngine (torch, int8, onnx, onnx-int8), see compare-backends.py for speed and accuracy
+BACKEND = 'torch'
+# rows per chunk handed to the EmbeddingEngine, which batches them by length and token budget;
+# the store is flushed after every chunk
+CHUNK_SIZE = 2048
 
-    # take the first token ([CLS] token) in the batch as the embedding
-    embeddings = result.last_hidden_state[:, 0, :]
 
-    return embeddings
+def convert_pt_embeddings(pt_dir, n_batches, ids, store_path):
+    """
+    input: directory of embeddings_{i}.pt files written by earlier versions of this script, number of files,
+    IDs of the rows, directory of the new EmbeddingStore
+    output: EmbeddingStore with the same vectors
+    """
+    store = None
+    start = 0
+    for batch in range(n_batches):
+        batch_embeddings = torch.load(os.path.join(pt_dir, f"embeddings_{batch}.pt")).detach().numpy()
+        if store is None:
+            store = EmbeddingStore.create(store_path, ids, batch_embeddings.shape[1], model='malteos/scincl')
+        store.write(start, batch_embeddings)
+        start += len(batch_embeddings)
+    store.flush()
+    return store
 
 
 if __name__ == "__main__":
     # load the model and the tokenizer
-    tokenizer = AutoTokenizer.from_pretrained('malteos/scincl')
-    model = AutoModel.from_pretrained('malteos/scincl')
+    engine = EmbeddingEngine('malteos/scincl', backend=BACKEND)
 
     # get the data
     merged_df = pd.read_csv('/netscratch/abu/forc_I_dataset.csv')
     baseline_data = merged_df[['title', 'abstract', 'label']]
 
-    if not os.path.exists("/netscratch/abu/FoRC-embeddings/SciNCL/forc_I_embeddings_20230315"):
-        os.makedirs("/netscratch/abu/FoRC-embeddings/SciNCL/forc_I_embeddings_20230315")
-
-    for batch in range(1980):
-        if batch == 1979:
-            sample_data = baseline_data[batch * 30:]
-        else:
-            sample_data = baseline_data[batch * 30:(batch + 1) * 30]
-        batch_embeddings = get_scincl_embeddings(sample_data, tokenizer, model)
-        print(f'Got embeddings for batch {batch}')
-        torch.save(batch_embeddings, f"/netscratch/abu/FoRC-embeddings/SciNCL/forc_I_embeddings_20230315/embeddings_{batch}.pt")
+    # one contiguous float32 matrix for all rows, continued if a previous run on the same data was interrupted
+    data_hash = hashlib.sha256(pd.util.hash_pandas_object(baseline_data[['title', 'abstract']]).to_numpy()
+                               .tobytes()).hexdigest()
+    store = EmbeddingStore.create(EMBEDDING_STORE_DIR, baseline_data.index, engine.dim, model=engine.model_id,
+                                  data_hash=data_hash)
+    # the model only runs on texts that are not in the cache yet (new or changed papers)
+    cache = EmbeddingCache(EMBEDDING_CACHE_DIR, engine.model_id, engine.dim)
+    for start in range(store.rows_written, len(baseline_data), CHUNK_SIZE):
+        texts = engine.texts(baseline_data[start:start + CHUNK_SIZE])
+        store.write(start, cache.encode(texts, engine.encode))
+        store.flush()
+        print(f'Got embeddings for rows {start} to {min(start + CHUNK_SIZE, len(baseline_data))}')
@@ -0,0 +1,95 @@
+import numpy as np
+
+
+class SoftmaxSGDClassifier:
+    """
+    Multinomial logistic regression (softmax + cross-entropy, L2 penalty) trained with mini-batch SGD and Adam updates.
+
+    sklearn's SGDClassifier(loss='log_loss') trains one binary model per class (one-vs-rest), not the multinomial model
+    of LogisticRegression(solver='lbfgs'); this estimator keeps the multinomial loss and, like sklearn's incremental
+    estimators, learns from one chunk of data at a time through partial_fit, so the training data never has to be in
+    memory at once.
+    """
+
+    def __init__(self, learning_rate=1e-3, alpha=1e-4, batch_size=256, random_state=0):
+        """
+        input: Adam step size, L2 penalty, rows per SGD step, seed of the mini-batch shuffling
+        """
+        self.learning_rate = learning_rate
+        self.alpha = alpha
+        self.batch_size = batch_size
+        self.random_state = random_state
+        self.classes_ = None
+
+    def partial_fit(self, X, y, classes=None):
+        """
+        input: (n, dim) chunk of features, its n labels, all labels (required on the first call)
+        Shuffles the chunk and takes one SGD step per mini-batch; loss_ is the mean loss over the chunk.
+        """
+        if self.classes_ is None:
+            if classes is None:
+                raise ValueError("classes must be passed on the first call to partial_fit")
+            self._initialize(np.unique(classes), X.shape[1])
+
+        X = np.asarray(X, dtype=np.float32)
+        targets = np.searchsorted(self.classes_, y)
+        if np.any(self.classes_[np.minimum(targets, len(self.classes_) - 1)] != y):
+            raise ValueError("y contains labels that are not in classes")
+
+        order = self._rng.permutation(len(X))
+        loss = 0.0
+        for start in range(0, len(X), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            loss += self._step(X[batch], targets[batch]) * len(batch)
+        self.loss_ = loss / max(len(X), 1)
+        return self
+
+    def decision_function(self, X):
+        return np.asarray(X, dtype=np.float32) @ self.coef_.T + self.intercept_
+
+    def predict_proba(self, X):
+        return _softmax(self.decision_function(X))
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.decision_function(X), axis=1)]
+
+    def _initialize(self, classes, dim):
+        self.classes_ = classes
+        self.coef_ = np.zeros((len(classes), dim), dtype=np.float32)
+        self.intercept_ = np.zeros(len(classes), dtype=np.float32)
+        self._moments = [np.zeros_like(self.coef_), np.zeros_like(self.coef_),
+                         np.zeros_like(self.intercept_), np.zeros_like(self.intercept_)]
+        self._t = 0
+        self._rng = np.random.default_rng(self.random_state)
+
+    def _step(self, X, targets):
+        """
+        One Adam step on a mini-batch; returns its mean cross-entropy.
+        """
+        probabilities = _softmax(X @ self.coef_.T + self.intercept_)
+        rows = np.arange(len(X))
+        loss = -np.log(np.maximum(probabilities[rows, targets], 1e-12)).mean()
+
+        # gradient of the mean cross-entropy w.r.t. the logits: probabilities - one-hot targets
+        probabilities[rows, targets] -= 1
+        probabilities /= len(X)
+        gradients = [probabilities.T @ X + self.alpha * self.coef_, probabilities.sum(axis=0)]
+
+        self._t += 1
+        beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+        step = self.learning_rate * np.sqrt(1 - beta2 ** self._t) / (1 - beta1 ** self._t)
+        for parameter, gradient, first, second in zip([self.coef_, self.intercept_], gradients,
+                                                      self._moments[0::2], self._moments[1::2]):
+            first *= beta1
+            first += (1 - beta1) * gradient
+            second *= beta2
+            second += (1 - beta2) * gradient ** 2
+            parameter -= step * first / (np.sqrt(second) + epsilon)
+        return loss
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    np.exp(logits, out=logits)
+    logits /= logits.sum(axis=1, keepdims=True)
+    return logits
@@ -0,0 +1,34 @@
+import sys
+
+from sklearn.model_selection import train_test_split
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
+
+from data import data_provider
+
+# Get features (sparse TF-IDF matrix, never densified) and labels
+data = data_provider(sys.argv[1] if len(sys.argv) > 1 else "merged_data_fuzzywuzzy_dedup.csv")
+X = data.get_features()
+y = data.get_labels()
+
+# Split data into train and test sets (train_test_split keeps the CSR format)
+X_train, X_test, y_train, y_test = train_test_split(X, y, test_size = 0.2, random_state = 0)
+print('X_train shape: ', X_train.shape)
+print('X_test shape: ', X_test.shape)
+print('y_train shape: ', y_train.shape)
+print('y_test shape: ', y_test.shape)
+
+# Train model
+logreg = LogisticRegression(solver='lbfgs', random_state=0, max_iter=1000)
+logreg.fit(X_train, y_train)
+
+# Evaluation
+y_pred_test = logreg.predict(X_test)
+print('Model accuracy score: {0:0.4f}'. format(accuracy_score(y_test, y_pred_test)))
+print('Model precision score: {0:0.4f}'. format(precision_score(y_test, y_pred_test, average='weighted')))
+print('Model recall score: {0:0.4f}'. format(recall_score(y_test, y_pred_test, average='weighted')))
+print('Model f1 score: {0:0.4f}'. format(f1_score(y_test, y_pred_test, average='weighted')))
+
+# Classification Report
+class_report = classification_report(y_test, y_pred_test)
+print('Classification Report:\n', class_report)
@@ -0,0 +1,316 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+import json
+import os
+import random
+
+import pandas as pd
+
+FILE_PATH = os.path.dirname(__file__)
+ARXIV_MAPPING_PATH = os.path.join(FILE_PATH, '../data_processing/data/mappings/arxiv_to_orkg_fields.json')
+
+ORKG = 'http://orkg.org/orkg/'
+RDFS_LABEL = 'http://www.w3.org/2000/01/rdf-schema#label'
+META_PREDICATES = {
+    'doi': ORKG + 'predicate/P26',
+    'author': ORKG + 'predicate/P27',
+    'publication month': ORKG + 'predicate/P28',
+    'publication year': ORKG + 'predicate/P29',
+    'title': RDFS_LABEL,
+    'publisher': ORKG + 'predicate/HAS_VENUE',
+    'url': ORKG + 'predicate/url'
+}
+RESEARCH_FIELD_PREDICATE = ORKG + 'predicate/P30'
+SUBFIELD_PREDICATE = ORKG + 'predicate/P36'
+CREATED_AT_START = datetime(2020, 1, 1, tzinfo=timezone(timedelta(hours=1)))
+
+WORDS = ['learning', 'neural', 'graph', 'quantum', 'protein', 'semantic', 'knowledge', 'network', 'model', 'data',
+         'analysis', 'scholarly', 'dynamics', 'optimization', 'language', 'retrieval', 'cell', 'climate', 'energy',
+         'structure', 'theory', 'system', 'method', 'field', 'evaluation', 'transformer', 'ontology', 'research']
+FIRST_NAMES = ['Anna', 'Jennifer', 'Sören', 'Markus', 'Raia', 'Maria', 'Jakob', 'Lena', 'Omar', 'Wei']
+LAST_NAMES = ['Müller', "D'Souza", 'Auer', 'Stocker', 'Abu Ahmad', 'Schmidt', 'Garcia', 'Chen', 'Kovacs', 'Smith']
+RESEARCH_FIELDS = ['Science', 'Computer Sciences', 'Artificial Intelligence', 'Physics', 'Chemistry',
+                   'Materials Science and Engineering', 'Quantum Physics', 'Databases/Information Systems',
+                   'Arts and Humanities', 'History', 'Philosophy', 'Machine Learning']
+
+
+def arxiv_categories() -> List[str]:
+    """ the arXiv categories of the arXiv -> ORKG mapping """
+    with open(ARXIV_MAPPING_PATH, 'r') as infile:
+        return list(json.load(infile).keys())
+
+
+def random_title(rng: random.Random, n_words: int = 8) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(n_words)).capitalize()
+
+
+def random_abstract(rng: random.Random, n_words: int = 120) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + '.'
+
+
+def random_author(rng: random.Random) -> str:
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+
+def random_doi(rng: random.Random) -> str:
+    return f'10.{rng.randint(1000, 9999)}/{rng.randint(10 ** 6, 10 ** 7 - 1)}'
+
+
+def generate_arxiv_snapshot(path: str, n_rows: int, seed: int = 42, doi_ratio: float = 0.6,
+                            multi_label_ratio: float = 0.3) -> List[str]:
+    """
+    Writes a synthetic arXiv snapshot (json lines in the format of the Kaggle arXiv dataset).
+
+    :param path: path of the .json file
+    :param n_rows: number of papers
+    :param seed: random seed
+    :param doi_ratio: share of papers with a doi
+    :param multi_label_ratio: share of papers with more than one category
+    :return: dois of the papers (None for papers without doi)
+    """
+    rng = random.Random(seed)
+    categories = arxiv_categories()
+    dois = []
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as outfile:
+        for i in range(n_rows):
+            doi = random_doi(rng) if rng.random() < doi_ratio else None
+            n_categories = rng.randint(2, 3) if rng.random() < multi_label_ratio else 1
+            record = {
+                'id': f'{rng.randint(1000, 2299)}.{i:05d}',
+                'submitter': random_author(rng),
+                'authors': ', '.join(random_author(rng) for _ in range(rng.randint(1, 4))),
+                'title': random_title(rng),
+                'comments': f'{rng.randint(4, 40)} pages',
+                'journal-ref': None,
+                'doi': doi,
+                'report-no': None,
+                'categories': ' '.join(rng.sample(categories, n_categories)),
+                'license': None,
+                'abstract': random_abstract(rng),
+                'versions': [{'version': 'v1', 'created': 'Mon, 2 Apr 2007 19:18:42 GMT'}],
+                'update_date': '2008-11-13',
+                'authors_parsed': [[rng.choice(LAST_NAMES), rng.choice(FIRST_NAMES), '']]
+            }
+            outfile.write(json.dumps(record) + '\n')
+            dois.append(doi)
+
+    return dois
+
+
+def generate_orkg_frame(n_rows: int, seed: int = 42, duplicate_ratio: float = 0.1,
+                        arxiv_dois: List[str] = ()) -> pd.DataFrame:
+    """
+    Builds a raw ORKG dataframe as returned by ORKGData._load_label_data, including the irregularities the cleaning
+    steps handle: html and extra spaces in titles, doi prefixes, duplicate papers, non-papers, multi-valued cells.
+
+    :param n_rows: number of papers
+    :param seed: random seed
+    :param duplicate_ratio: share of papers that are duplicates of other papers
+    :param arxiv_dois: dois that are (partly) reused, so that ORKG and arXiv papers overlap
+    :return: dataframe
+    """
+    rng = random.Random(seed)
+    arxiv_dois = [doi for doi in arxiv_dois if doi]
+    rows = []
+
+    for i in range(n_rows):
+        if rows and rng.random() < duplicate_ratio:
+            row = dict(rng.choice(rows))
+            row['abstract'] = '' if rng.random() < 0.5 else row['abstract']
+            rows.append(row)
+            continue
+
+        if arxiv_dois and rng.random() < 0.2:
+            doi = rng.choice(arxiv_dois)
+        else:
+            doi = random_doi(rng) if rng.random() < 0.7 else ''
+        title = random_title(rng)
+        if rng.random() < 0.1:
+            title = f'<i>{title}</i>  '
+        if rng.random() < 0.02:
+            title, doi = 'deleted', ''
+
+        authors = [random_author(rng) for _ in range(rng.randint(1, 4))]
+        rows.append({
+            'abstract': random_abstract(rng) if rng.random() < 0.5 else '',
+            'author': authors if len(authors) > 1 else authors[0],
+            'doi': 'https://doi.org/' + doi if doi and rng.random() < 0.3 else doi,
+            'url': f'https://example.org/paper/{i}' if rng.random() < 0.4 else '',
+            'publication month': str(rng.randint(1, 12)),
+            'publication year': str(rng.randint(1990, 2023)),
+            'title': title,
+            'publisher': rng.choice(['', 'ISWC', 'JCDL', 'TPDL', 'Nature']),
+            'crossref_field': '',
+            'semantic_field': '',
+            'label': rng.choice(RESEARCH_FIELDS)
+        })
+
+    # like the raw data, cells are strings or lists and missing values are empty strings
+    return pd.DataFrame(rows)
+
+
+def generate_orkg_dump(path: str, n_papers: int, seed: int = 42) -> Dict[str, str]:
+    """
+    Writes a synthetic ORKG RDF dump (N-Triples) with papers, their metadata, research fields and the research field
+    hierarchy.
+
+    :param path: path of the .nt file
+    :param n_papers: number of papers
+    :param seed: random seed
+    :return: predicates of the metadata (as used by ORKGData.meta_ids)
+    """
+    rng = random.Random(seed)
+    fields = {name: f'{ORKG}resource/RF{i}' for i, name in enumerate(RESEARCH_FIELDS)}
+
+    def literal(value: str) -> str:
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as outfile:
+        for name, uri in fields.items():
+            outfile.write(f'<{uri}> <{RDFS_LABEL}> {literal(name)} .\n')
+            if name != 'Science':
+                outfile.write(f'<{fields["Science"]}> <{SUBFIELD_PREDICATE}> <{uri}> .\n')
+
+        for i in range(n_papers):
+            paper = f'{ORKG}resource/R{i}'
+            outfile.write(f'<{paper}> <{RESEARCH_FIELD_PREDICATE}> <{fields[rng.choice(RESEARCH_FIELDS)]}> .\n')
+            outfile.write(f'<{paper}> <{RDFS_LABEL}> {literal(random_title(rng))} .\n')
+            outfile.write(f'<{paper}> <{META_PREDICATES["doi"]}> {literal(random_doi(rng))} .\n')
+            outfile.write(f'<{paper}> <{META_PREDICATES["publication year"]}> '
+                          f'{literal(str(rng.randint(1990, 2023)))} .\n')
+            for _ in range(rng.randint(1, 3)):
+                outfile.write(f'<{paper}> <{META_PREDICATES["author"]}> {literal(random_author(rng))} .\n')
+
+    return dict(META_PREDICATES)
+
+
+def generate_orkg_abstracts_csv(path: str, n_rows: int, seed: int = 42,
+                                orkg_df: pd.DataFrame = None) -> None:
+    """
+    Writes a synthetic ORKG Abstracts csv (doi, title, processed_abstract). If orkg_df is given, part of the papers
+    are taken from it, so that lookups by doi and title find matches.
+
+    :param path: path of the .csv file
+    :param n_rows: number of papers
+    :param seed: random seed
+    :param orkg_df: ORKG data the abstracts partly belong to
+    """
+    rng = random.Random(seed)
+    known = list(orkg_df[['doi', 'title']].itertuples(index=False, name=None)) if orkg_df is not None else []
+    rows = []
+
+    for _ in range(n_rows):
+        doi, title = rng.choice(known) if known and rng.random() < 0.5 else (random_doi(rng), random_title(rng))
+        rows.append({'doi': doi, 'title': title, 'processed_abstract': random_abstract(rng)})
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def crossref_payload(rng: random.Random, doi: str, title: str) -> Dict:
+    """ response of https://api.crossref.org/works/{doi} """
+    return {
+        'status': 'ok',
+        'message-type': 'work',
+        'message': {
+            'DOI': doi,
+            'title': [title],
+            'abstract': '<jats:p>' + random_abstract(rng) + '</jats:p>',
+            'publisher': rng.choice(['Springer', 'Elsevier', 'ACM', 'IEEE']),
+            'container-title': [rng.choice(['ISWC', 'JCDL', 'TPDL', 'Nature'])],
+            'subject': [rng.choice(RESEARCH_FIELDS)],
+            'URL': 'http://dx.doi.org/' + doi,
+            'author': [{'given': rng.choice(FIRST_NAMES), 'family': rng.choice(LAST_NAMES)}
+                       for _ in range(rng.randint(1, 4))]
+        }
+    }
+
+
+def semantic_payload(rng: random.Random, doi: str, title: str) -> Dict:
+    """ response of https://api.semanticscholar.org/v1/paper/{doi} """
+    return {
+        'doi': doi,
+        'title': title,
+        'abstract': random_abstract(rng),
+        'venue': rng.choice(['ISWC', 'JCDL', 'TPDL', '']),
+        'fieldsOfStudy': [rng.choice(RESEARCH_FIELDS)],
+        'url': 'https://www.semanticscholar.org/paper/' + doi.replace('/', ''),
+        'authors': [{'name': random_author(rng)} for _ in range(rng.randint(1, 4))]
+    }
+
+
+def openalex_payload(rng: random.Random, doi: str, title: str) -> Dict:
+    """ response of https://api.openalex.org/works/https://doi.org/{doi} """
+    words = random_abstract(rng).split(' ')
+    inverted_index = {}
+    for position, word in enumerate(words):
+        inverted_index.setdefault(word, []).append(position)
+    return {
+        'id': 'https://openalex.org/W' + str(rng.randint(10 ** 9, 10 ** 10)),
+        'doi': 'https://doi.org/' + doi,
+        'title': title,
+        'abstract_inverted_index': inverted_index
+    }
+
+
+def generate_api_payloads(path: str, n_papers: int, seed: int = 42) -> Dict[str, Dict[str, Dict]]:
+    """
+    Writes canned responses of Crossref, Semantic Scholar and OpenAlex for n_papers synthetic papers as one json file:
+    {source: {doi: response}}.
+
+    :param path: path of the .json file
+    :param n_papers: number of papers
+    :param seed: random seed
+    :return: the payloads
+    """
+    rng = random.Random(seed)
+    payloads = {'crossref': {}, 'semantic': {}, 'openalex': {}}
+
+    for _ in range(n_papers):
+        doi, title = random_doi(rng), random_title(rng)
+        payloads['crossref'][doi] = crossref_payload(rng, doi, title)
+        payloads['semantic'][doi] = semantic_payload(rng, doi, title)
+        payloads['openalex'][doi] = openalex_payload(rng, doi, title)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as outfile:
+        json.dump(payloads, outfile)
+
+    return payloads
+
+
+def generate_orkg_statements(n_papers: int, seed: int = 42) -> List[Dict]:
+    """
+    Builds synthetic ORKG statements in the format of the ORKG REST API: the research field (P30) and metadata
+    statements of n_papers papers and the research field hierarchy (P36).
+
+    :param n_papers: number of papers
+    :param seed: random seed
+    :return: statements, oldest first
+    """
+    rng = random.Random(seed)
+    fields = {name: {'id': f'RF{i}', 'label': name, '_class': 'resource'} for i, name in enumerate(RESEARCH_FIELDS)}
+    statements = []
+
+    def add(subject: Dict, predicate_id: str, obj: Dict) -> None:
+        statement_id = f'S{len(statements)}'
+        created_at = (CREATED_AT_START + timedelta(seconds=len(statements))).isoformat(timespec='microseconds')
+        statements.append({'id': statement_id, 'subject': subject, 'predicate': {'id': predicate_id, 'label': ''},
+                           'object': obj, 'created_at': created_at})
+
+    for name, field in fields.items():
+        if name != 'Science':
+            add(fields['Science'], 'P36', field)
+
+    for i in range(n_papers):
+        paper = {'id': f'R{i}', 'label': random_title(rng), '_class': 'resource'}
+        add(paper, 'P30', fields[rng.choice(RESEARCH_FIELDS)])
+        add(paper, 'P26', {'id': f'L{i}D', 'label': random_doi(rng), '_class': 'literal'})
+        add(paper, 'P29', {'id': f'L{i}Y', 'label': str(rng.randint(1990, 2023)), '_class': 'literal'})
+        for j in range(rng.randint(1, 3)):
+            add(paper, 'P27', {'id': f'L{i}A{j}', 'label': random_author(rng), '_class': 'literal'})
+
+    return statements
@@ -0,0 +1,277 @@
+"""
+Local HTTP server that stands in for Crossref, Semantic Scholar (S2AG), OpenAlex and the ORKG REST API.
+
+It serves recorded or synthetic responses for the endpoints used by APIData and ORKGPyModule under one prefix per
+API (http://host:port/crossref, /semantic, /openalex, /orkg) and can inject latency, rate limits (429 with
+Retry-After) and server errors. Point the pipeline to it with the environment variables of api_config:
+
+    python benchmarks/replay_server.py --papers 1000 --latency-ms 200 --error-rate 0.05 --rate-limit 50
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+
+FILE_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(FILE_PATH, '../data_processing'))
+
+from api_config import ENV_VARIABLES
+from generators import generate_api_payloads, generate_orkg_statements
+
+APIS = ['crossref', 'semantic', 'openalex', 'orkg']
+
+
+class FaultConfig:
+    """
+    Faults injected by the ReplayServer.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, latency_jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rate_limit: Optional[float] = None, retry_after: int = 1, seed: int = 42):
+        """
+        :param latency_ms: mean latency added to every response
+        :param latency_jitter_ms: maximum random deviation from latency_ms
+        :param error_rate: share of requests answered with a random 5xx error
+        :param rate_limit: allowed requests per second and API; requests above it get a 429 with Retry-After
+        :param retry_after: value of the Retry-After header (seconds)
+        :param seed: random seed of the injected latency and errors
+        """
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def latency(self) -> float:
+        with self.lock:
+            jitter = self.rng.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+        return max(self.latency_ms + jitter, 0.0) / 1000
+
+    def error(self) -> bool:
+        with self.lock:
+            return self.rng.random() < self.error_rate
+
+    def server_error(self) -> int:
+        with self.lock:
+            return self.rng.choice([500, 502, 503])
+
+
+class ReplayServer:
+    """
+    Replays API responses from a payload file (format of generators.generate_api_payloads: {source: {doi: response}})
+    and a list of ORKG statements (format of generators.generate_orkg_statements).
+    The number of requests and injected faults per API is kept in self.stats.
+    """
+
+    def __init__(self, payloads: Dict[str, Dict[str, Dict]], orkg_statements: List[Dict],
+                 faults: Optional[FaultConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        :param payloads: recorded responses of Crossref, Semantic Scholar and OpenAlex by doi
+        :param orkg_statements: ORKG statements
+        :param faults: injected faults (default: none)
+        :param host: host to bind
+        :param port: port to bind (0: a free port)
+        """
+        self.payloads = payloads
+        self.faults = faults or FaultConfig()
+        self.stats = {api: {'requests': 0, 'rate_limited': 0, 'errors': 0, 'not_found': 0} for api in APIS}
+        self._windows = {api: [] for api in APIS}
+        self._lock = threading.Lock()
+
+        self.orkg_statements = sorted(orkg_statements, key=lambda statement: statement['created_at'], reverse=True)
+        self.orkg_by_predicate = {}
+        self.orkg_by_subject = {}
+        for statement in orkg_statements:
+            self.orkg_by_predicate.setdefault(statement['predicate']['id'], []).append(statement)
+            self.orkg_by_subject.setdefault(statement['subject']['id'], []).append(statement)
+
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def env(self) -> Dict[str, str]:
+        """ environment variables that point api_config to this server """
+        return {ENV_VARIABLES[api]: f'{self.base_url}/{api}' for api in APIS}
+
+    def start(self) -> 'ReplayServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'ReplayServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def respond(self, api: str, path: str, query: Dict[str, List[str]]) -> (int, Dict, Dict[str, str]):
+        """
+        Computes the response of a request: status, json body and headers.
+        """
+        with self._lock:
+            self.stats[api]['requests'] += 1
+            if self._rate_limited(api):
+                self.stats[api]['rate_limited'] += 1
+                return 429, {'message': 'rate limit exceeded'}, {'Retry-After': str(self.faults.retry_after)}
+
+        time.sleep(self.faults.latency())
+        if self.faults.error():
+            with self._lock:
+                self.stats[api]['errors'] += 1
+            return self.faults.server_error(), {'message': 'injected error'}, {}
+
+        body = getattr(self, '_' + api)(path, query)
+        if body is None:
+            with self._lock:
+                self.stats[api]['not_found'] += 1
+            return 404, {'message': 'not found'}, {}
+        return 200, body, {}
+
+    def _rate_limited(self, api: str) -> bool:
+        """ sliding window of one second (called with the lock held) """
+        if self.faults.rate_limit is None:
+            return False
+        now = time.monotonic()
+        window = [timestamp for timestamp in self._windows[api] if now - timestamp < 1.0]
+        limited = len(window) >= self.faults.rate_limit
+        if not limited:
+            window.append(now)
+        self._windows[api] = window
+        return limited
+
+    def _crossref(self, path: str, query: Dict) -> Optional[Dict]:
+        # /works/{doi} or /works?query.bibliographic=...
+        if path.startswith('/works/'):
+            return self.payloads.get('crossref', {}).get(path[len('/works/'):])
+        if path.rstrip('/') == '/works':
+            title = query.get('query.bibliographic', [''])[0].lower()
+            items = [payload['message'] for payload in self.payloads.get('crossref', {}).values()
+                     if payload['message']['title'][0].lower() == title]
+            return {'status': 'ok', 'message-type': 'work-list', 'message': {'items': items[:5]}}
+        return None
+
+    def _semantic(self, path: str, query: Dict) -> Optional[Dict]:
+        # /v1/paper/{doi}
+        if path.startswith('/v1/paper/'):
+            return self.payloads.get('semantic', {}).get(path[len('/v1/paper/'):])
+        return None
+
+    def _openalex(self, path: str, query: Dict) -> Optional[Dict]:
+        # /works/{doi url}, pyalex is called with https://doi.org/{doi}
+        if path.startswith('/works/'):
+            doi = path[len('/works/'):]
+            for prefix in ['https://doi.org/', 'doi:']:
+                if doi.startswith(prefix):
+                    doi = doi[len(prefix):]
+            return self.payloads.get('openalex', {}).get(doi)
+        return None
+
+    def _orkg(self, path: str, query: Dict) -> Optional[Dict]:
+        path = path.rstrip('/')
+        if path == '/api/resources':
+            # used by the orkg client to check whether the backend supports pagination
+            return _page([], 0, 1)
+        if path.startswith('/api/statements/predicate/'):
+            statements = self.orkg_by_predicate.get(path.split('/')[-1], [])
+        elif path.startswith('/api/statements/subject/'):
+            statements = self.orkg_by_subject.get(path.split('/')[-1], [])
+        elif path == '/api/statements':
+            statements = self.orkg_statements
+        else:
+            return None
+
+        page = int(query.get('page', ['0'])[0])
+        size = int(query.get('size', ['20'])[0])
+        return _page(statements, page, size)
+
+
+def _page(content: List, page: int, size: int) -> Dict:
+    """ pageable response of the ORKG API """
+    return {
+        'content': content[page * size:(page + 1) * size],
+        'pageable': {'pageNumber': page, 'pageSize': size},
+        'totalElements': len(content),
+        'totalPages': max(math.ceil(len(content) / size), 1),
+    }
+
+
+def _make_handler(server: ReplayServer):
+
+    class ReplayHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            api, _, path = url.path.lstrip('/').partition('/')
+            if api not in APIS:
+                self._send(404, {'message': 'unknown api'}, {})
+                return
+            status, body, headers = server.respond(api, '/' + unquote(path), parse_qs(url.query))
+            self._send(status, body, headers)
+
+        def _send(self, status: int, body: Dict, headers: Dict[str, str]) -> None:
+            content = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayHandler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Local replay server for Crossref, S2AG, OpenAlex and ORKG.')
+    parser.add_argument('--payloads', help='recorded responses (json: {source: {doi: response}})')
+    parser.add_argument('--papers', type=int, default=1000, help='number of synthetic papers if no payloads given')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--latency-jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with 5xx')
+    parser.add_argument('--rate-limit', type=float, help='requests per second and API before 429s')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After header of 429 responses (s)')
+    args = parser.parse_args()
+
+    if args.payloads:
+        with open(args.payloads, 'r') as infile:
+            payloads = json.load(infile)
+    else:
+        payloads = generate_api_payloads(os.devnull, args.papers)
+
+    faults = FaultConfig(args.latency_ms, args.latency_jitter_ms, args.error_rate, args.rate_limit, args.retry_after)
+    server = ReplayServer(payloads, generate_orkg_statements(args.papers), faults, args.host, args.port)
+
+    for name, value in server.env().items():
+        print(f'export {name}={value}')
+    print(f"Serving on {server.base_url} (Ctrl+C to stop)...")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
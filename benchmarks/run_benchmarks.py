@@ -0,0 +1,328 @@
+"""
+Benchmarks of the data processing stages on synthetic data.
+
+Every benchmark is timed (best of --repeat runs) and reported as per-row cost (µs/row) and throughput (rows/s).
+The results are compared against a stored baseline (baseline.json, recorded at scale 10000); the script exits with
+status 1 if the per-row cost of a benchmark is more than --tolerance above its baseline, and with status 2 if there
+is no usable baseline (missing, unreadable, recorded at another scale or without a benchmark that ran) or if a
+benchmark was skipped (e.g. remove_non_english without the fasttext model lid.176.bin). A baseline is only saved
+if no benchmark was skipped.
+
+    python benchmarks/run_benchmarks.py --scale 10000
+    python benchmarks/run_benchmarks.py --scale 10000 --update-baseline
+"""
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+FILE_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(FILE_PATH, '..'))
+sys.path.insert(0, os.path.join(FILE_PATH, '../data_processing'))
+
+import pandas as pd
+
+from generators import generate_arxiv_snapshot, generate_orkg_frame, generate_orkg_dump, \
+    generate_orkg_abstracts_csv, generate_api_payloads, arxiv_categories, RESEARCH_FIELD_PREDICATE
+
+DEFAULT_BASELINE_PATH = os.path.join(FILE_PATH, 'baseline.json')
+
+
+class SyntheticData:
+    """
+    The synthetic inputs of all benchmarks for one scale, generated once into a temporary directory.
+    """
+
+    def __init__(self, scale: int, data_dir: str, seed: int = 42, api_latency_ms: float = 0.0):
+        self.scale = scale
+        self.api_latency_ms = api_latency_ms
+        self.arxiv_path = os.path.join(data_dir, 'arxiv-snapshot.json')
+        self.dump_path = os.path.join(data_dir, 'dump.nt')
+        self.abstracts_path = os.path.join(data_dir, 'orkg_papers.csv')
+        self.payloads_path = os.path.join(data_dir, 'api_payloads.json')
+
+        arxiv_dois = generate_arxiv_snapshot(self.arxiv_path, scale, seed)
+        self.arxiv_df = pd.read_json(self.arxiv_path, lines=True)
+        self.orkg_df = generate_orkg_frame(scale, seed, arxiv_dois=arxiv_dois)
+        self.meta_ids = generate_orkg_dump(self.dump_path, scale, seed)
+        generate_orkg_abstracts_csv(self.abstracts_path, scale, seed, self.orkg_df)
+        self.payloads = generate_api_payloads(self.payloads_path, scale, seed)
+
+
+@contextmanager
+def patched_environ(variables: Dict[str, str]):
+    """ sets environment variables and restores the previous environment on exit """
+    previous = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+# Every benchmark prepares its inputs (not timed) and returns the function to time and the number of rows it
+# processes. Imports are local, so a benchmark whose dependencies are missing is skipped (and fails the run at the end)
+# instead of aborting the other benchmarks.
+
+def bench_arxiv_load(data: SyntheticData) -> Tuple[Callable, int]:
+    from process_arxiv_data import load_arxiv_snapshot
+    return lambda: load_arxiv_snapshot(data.arxiv_path), data.scale
+
+
+def bench_orkg_clean(data: SyntheticData) -> Tuple[Callable, int]:
+    from orkg_data.clean_data import ORKGDataCleaner
+    return ORKGDataCleaner(data.orkg_df.copy()).run, len(data.orkg_df)
+
+
+def bench_remove_duplicates(data: SyntheticData) -> Tuple[Callable, int]:
+    from data_cleaning_utils import remove_duplicates
+    df = data.orkg_df.copy()
+    return lambda: remove_duplicates(df), len(df)
+
+
+def bench_remove_non_english(data: SyntheticData) -> Tuple[Callable, int]:
+    from data_cleaning_utils import remove_non_english
+    df = data.arxiv_df[['title', 'abstract']].copy()
+    return lambda: remove_non_english(df), len(df)
+
+
+def bench_arxiv_reduce(data: SyntheticData) -> Tuple[Callable, int]:
+    from reduce_arxiv_data import ArxivDataReduction
+    reduction = ArxivDataReduction(data.arxiv_df.copy(), arxiv_categories(), {}, {})
+    return lambda: reduction.get_reduced_data(data.scale // 10), data.scale
+
+
+def bench_arxiv_drop_dups(data: SyntheticData) -> Tuple[Callable, int]:
+    from process_arxiv_data import ArxivData
+    # skip __init__, which loads the snapshot and runs the ORKG pipeline
+    arxiv_data = ArxivData.__new__(ArxivData)
+    arxiv_data.arxiv_df = data.arxiv_df.copy()
+    arxiv_data.orkg_df = data.orkg_df.copy()
+    arxiv_data.orkg_df['abstract'] = arxiv_data.orkg_df['abstract'].replace('', None)
+    return arxiv_data._drop_orkg_dups, len(data.arxiv_df)
+
+
+def bench_arxiv_index_lookup(data: SyntheticData) -> Tuple[Callable, int]:
+    from arxiv_index import ArxivIndex
+    index = ArxivIndex(data.arxiv_path, os.path.join(os.path.dirname(data.arxiv_path), 'arxiv_index'))
+    dois = data.orkg_df['doi'][data.orkg_df['doi'] != '']
+    return lambda: index.get_many(dois, 'doi'), len(dois)
+
+
+def bench_data_validation(data: SyntheticData) -> Tuple[Callable, int]:
+    from additional_api_data.data_validation import DataValidation
+    validation = DataValidation(2)
+    pairs = []
+    for (doi, payload), row in zip(data.payloads['crossref'].items(), data.orkg_df.itertuples()):
+        message = payload['message']
+        authors = [person['given'] + ' ' + person['family'] for person in message['author']]
+        pairs.append((message['title'][0], row.title, authors, row.author, doi, row.doi))
+
+    def run():
+        return [validation.validate_data(*pair) for pair in pairs]
+
+    return run, len(pairs)
+
+
+def bench_orkg_abstract_lookup(data: SyntheticData) -> Tuple[Callable, int]:
+    from data_cleaning_utils import get_orkg_abstract_doi
+    orkg_papers = pd.read_csv(data.abstracts_path)
+    dois = list(data.orkg_df['doi'])
+    return lambda: [get_orkg_abstract_doi(doi, orkg_papers) for doi in dois], len(dois)
+
+
+def bench_api_enrichment(data: SyntheticData) -> Tuple[Callable, int]:
+    from orkg_data.get_abstracts import DataAbstracts
+    from replay_server import ReplayServer, FaultConfig
+
+    # papers whose canned responses are served by the replay server; at most 90, since the APIScheduler pauses
+    # Semantic Scholar requests for 5 minutes after 100 requests
+    rows = []
+    for doi, payload in list(data.payloads['crossref'].items())[:90]:
+        message = payload['message']
+        rows.append({'title': message['title'][0], 'doi': doi, 'abstract': None, 'url': '', 'publisher': '',
+                     'author': [person['given'] + ' ' + person['family'] for person in message['author']]})
+    df = pd.DataFrame(rows)
+
+    server = ReplayServer(data.payloads, [], FaultConfig(latency_ms=data.api_latency_ms)).start()
+    # a fresh journal per run, so repeats time the lookups and not a replay of the journal; every paper is looked up
+    # (no language push-down)
+    journal_dir = tempfile.TemporaryDirectory()
+
+    def run():
+        try:
+            with patched_environ(server.env()):
+                return DataAbstracts(df.copy(), journal_path=os.path.join(journal_dir.name, 'journal.jsonl'),
+                                     push_down=False)._get_abstracts_from_apis()
+        finally:
+            server.stop()
+            journal_dir.cleanup()
+
+    return run, len(df)
+
+
+def bench_rdf_parse(data: SyntheticData) -> Tuple[Callable, int]:
+    from data_processing.orkg_data.rdfDump import RDFDump
+
+    def run():
+        return RDFDump(parse=False).graph.parse(data.dump_path, format='nt')
+
+    return run, data.scale
+
+
+def bench_rdf_statements(data: SyntheticData) -> Tuple[Callable, int]:
+    from data_processing.orkg_data.rdfDump import RDFDump
+    strategy = RDFDump(parse=False)
+    strategy.graph.parse(data.dump_path, format='nt')
+
+    def run():
+        statements = strategy.get_statement_by_predicate(RESEARCH_FIELD_PREDICATE)
+        return strategy.get_statement_by_subject(statements['paper'], dict(data.meta_ids))
+
+    return run, data.scale
+
+
+BENCHMARKS = {
+    'arxiv_load': bench_arxiv_load,
+    'orkg_clean': bench_orkg_clean,
+    'remove_duplicates': bench_remove_duplicates,
+    'remove_non_english': bench_remove_non_english,
+    'arxiv_reduce': bench_arxiv_reduce,
+    'arxiv_drop_dups': bench_arxiv_drop_dups,
+    'arxiv_index_lookup': bench_arxiv_index_lookup,
+    'data_validation': bench_data_validation,
+    'orkg_abstract_lookup': bench_orkg_abstract_lookup,
+    'api_enrichment': bench_api_enrichment,
+    'rdf_parse': bench_rdf_parse,
+    'rdf_statements': bench_rdf_statements,
+}
+
+
+def run_benchmark(name: str, data: SyntheticData, repeat: int) -> Dict:
+    """
+    Runs a benchmark repeat times (with freshly prepared inputs) and reports the best run.
+
+    :return: {'seconds', 'rows', 'us_per_row', 'rows_per_sec'} or {'skipped': reason}
+    """
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        try:
+            func, rows = BENCHMARKS[name](data)
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        except (ImportError, OSError, ValueError) as e:
+            # missing optional dependencies or model files (e.g. the fasttext language model)
+            return {'skipped': f'{type(e).__name__}: {e}'}
+
+    seconds = min(timings)
+    return {
+        'seconds': round(seconds, 6),
+        'rows': rows,
+        'us_per_row': round(seconds / max(rows, 1) * 1e6, 3),
+        'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None
+    }
+
+
+def skipped_benchmarks(results: Dict) -> List[str]:
+    """ :return: benchmarks of the results that were skipped """
+    return [name for name, result in results.get('benchmarks', {}).items() if 'skipped' in result]
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> Dict[str, float]:
+    """
+    Compares the per-row cost of the results with the baseline (of the same scale).
+
+    :return: benchmarks with a regression and their relative slowdown
+    """
+    regressions = {}
+    for name, result in results['benchmarks'].items():
+        reference = baseline.get('benchmarks', {}).get(name)
+        if 'skipped' in result or not reference or 'skipped' in reference:
+            continue
+        slowdown = result['us_per_row'] / reference['us_per_row'] - 1
+        if slowdown > tolerance:
+            regressions[name] = slowdown
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks of the data processing stages on synthetic data.')
+    parser.add_argument('--scale', type=int, default=10000, help='number of synthetic papers per dataset')
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs per benchmark (best run counts)')
+    parser.add_argument('--only', nargs='*', choices=list(BENCHMARKS), help='benchmarks to run (default: all)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help='path of the baseline json')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown of the per-row cost')
+    parser.add_argument('--update-baseline', action='store_true', help='store the results as new baseline')
+    parser.add_argument('--output', help='path of a json file for the results')
+    parser.add_argument('--api-latency-ms', type=float, default=0.0,
+                        help='latency of the replay server in the api_enrichment benchmark')
+    args = parser.parse_args()
+
+    results = {'scale': args.scale, 'repeat': args.repeat, 'benchmarks': {}}
+    with tempfile.TemporaryDirectory() as data_dir:
+        print(f"Generating synthetic data (scale {args.scale})...")
+        data = SyntheticData(args.scale, data_dir, api_latency_ms=args.api_latency_ms)
+
+        print(f"{'benchmark':<24}{'seconds':>12}{'rows':>10}{'µs/row':>12}{'rows/s':>14}")
+        for name in args.only or BENCHMARKS:
+            result = run_benchmark(name, data, args.repeat)
+            results['benchmarks'][name] = result
+            if 'skipped' in result:
+                print(f"{name:<24}skipped ({result['skipped']})")
+            else:
+                print(f"{name:<24}{result['seconds']:>12.4f}{result['rows']:>10}{result['us_per_row']:>12.2f}"
+                      f"{result['rows_per_sec']:>14.0f}")
+
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            json.dump(results, outfile, indent=2)
+
+    skipped = skipped_benchmarks(results)
+    if skipped:
+        print(f"Skipped benchmarks are not measured: {', '.join(skipped)}.")
+        return 2
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as outfile:
+            json.dump(results, outfile, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, 'r') as infile:
+            baseline = json.load(infile)
+    except FileNotFoundError:
+        print(f"No baseline found at {args.baseline}, run with --update-baseline to create one.")
+        return 2
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Baseline {args.baseline} is unreadable ({e}).")
+        return 2
+    if baseline.get('scale') != args.scale:
+        print(f"Baseline was recorded at scale {baseline.get('scale')}, per-row costs are not comparable.")
+        return 2
+    missing = [name for name in results['benchmarks']
+               if name not in baseline.get('benchmarks', {}) or name in skipped_benchmarks(baseline)]
+    if missing:
+        print(f"Baseline has no results for {', '.join(missing)}, run with --update-baseline to record them.")
+        return 2
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name, slowdown in regressions.items():
+        print(f"REGRESSION {name}: per-row cost {slowdown:.0%} above baseline")
+    if not regressions:
+        print(f"No regressions (tolerance {args.tolerance:.0%}).")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
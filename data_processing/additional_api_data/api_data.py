@@ -1,9 +1,11 @@
 import pandas as pd
 from additional_api_data.doi_finder import DoiFinder
 from data_cleaning_utils import process_abstract_string
+from instrumentation import track_request, record_retry
+from api_config import api_url
 from fuzzywuzzy import fuzz
-from pyalex import Works
 from typing import List, Tuple, Dict
+import numpy as np
 import requests
 import urllib.parse
 import json
@@ -59,17 +61,18 @@ class APIData:
             Dict that holds api data
         """
         if doi:
-            crossref_url = 'https://api.crossref.org/works/' + str(doi)
+            crossref_url = api_url('crossref') + '/works/' + str(doi)
         else:
             url_encoded_title = urllib.parse.quote_plus(self.orkg_df.at[index, 'title'])
-            crossref_url = 'https://api.crossref.org/works?rows=5&query.bibliographic=' + url_encoded_title
+            crossref_url = api_url('crossref') + '/works?rows=5&query.bibliographic=' + url_encoded_title
 
         try:
-            response = requests.get(crossref_url)
+            response = track_request('crossref', requests.get, crossref_url)
 
         except ConnectionError:
+            record_retry('crossref')
             time.sleep(60)
-            response = requests.get(crossref_url)
+            response = track_request('crossref', requests.get, crossref_url)
 
         data_dict = {}
 
@@ -82,7 +85,7 @@ class APIData:
                 if not paper_found:
                     return {}
 
-            data_dict = self._process_api_data_crossref(message, index)
+            data_dict = self._process_api_data_crossref(index, message)
 
         return data_dict
 
@@ -109,63 +112,80 @@ class APIData:
             if not doi and 'author' in scraped_data and self.orkg_df.at[index, 'author']:
                 return self._process_scraped_data(index, scraped_data)
 
-        s2ag_url = 'https://api.semanticscholar.org/v1/paper/' + str(doi)
+        s2ag_url = api_url('semantic') + '/v1/paper/' + str(doi)
         self.api_scheduler.update()
 
         try:
-            response = requests.get(s2ag_url)
+            response = track_request('semantic', requests.get, s2ag_url)
 
         except ConnectionError:
+            record_retry('semantic')
             time.sleep(60)
-            response = requests.get(s2ag_url)
+            response = track_request('semantic', requests.get, s2ag_url)
 
         data_dict = {}
 
         if response.ok:
             content_dict_scholar = json.loads(response.content)
-            data_dict = self._process_api_data_s2ag(content_dict_scholar, index)
+            data_dict = self._process_api_data_s2ag(index, content_dict_scholar)
 
         return data_dict
 
     def get_openalex_data(self, doi: str) -> Dict:
         """
-        Provides dictionary of data collected from OpenAlex using the pyalex library.
+        Provides dictionary of data collected from the OpenAlex API.
 
         Parameters
         ----------
-        title: str
-            title of queried paper
-        index: int
-            index of paper in pandas dataframe
+        doi: str
+            doi url of queried paper (https://doi.org/...)
 
         Returns
         -------
         Dict
-            Dict that holds api data
+            Dict that holds api data (empty if the request failed, so the lookup is not journaled and sent again)
         """
 
         if pd.isnull(doi):
             return {}
 
+        openalex_url = api_url('openalex') + '/works/' + str(doi)
+
         try:
-            openalex_data = Works()[doi]
+            response = track_request('openalex', requests.get, openalex_url)
 
         except ConnectionError:
+            record_retry('openalex')
             time.sleep(60)
-            openalex_data = Works()[doi]
+            response = track_request('openalex', requests.get, openalex_url)
 
-        except HTTPError:
-            openalex_data = np.nan
-
-        data_dict = {'doi': doi}
+        data_dict = {}
 
-        if type(openalex_data) != float:
-            data_dict['abstract'] = openalex_data['abstract']
-        else:
-            data_dict['abstract'] = np.nan
+        if response.ok:
+            data_dict = {'doi': doi,
+                         'abstract': self._invert_abstract(json.loads(response.content).get('abstract_inverted_index'))}
 
         return data_dict
 
+    @staticmethod
+    def _invert_abstract(inverted_index: Dict[str, List[int]]):
+        """
+        Rebuilds the abstract text from the inverted index (word -> positions) that OpenAlex provides.
+
+        Parameters
+        ----------
+        inverted_index: Dict[str, List[int]]
+
+        Returns
+        -------
+        str (NaN if OpenAlex has no abstract)
+        """
+        if not inverted_index:
+            return np.nan
+
+        positions = [(position, word) for word, word_positions in inverted_index.items() for position in word_positions]
+        return ' '.join(word for _, word in sorted(positions))
+
     def _handle_crossref_title_api_data(self, index: int, message: Dict) -> Tuple[Dict, bool]:
         """
         Provides a dict with api data and a boolean value if apper was found.
@@ -197,7 +217,7 @@ class APIData:
                 break
 
         if api_doi:
-            response = requests.get('https://api.crossref.org/works/' + api_doi)
+            response = track_request('crossref', requests.get, api_url('crossref') + '/works/' + api_doi)
             if response.ok:
                 content_dict_crossref = json.loads(response.content)
                 message = content_dict_crossref['message']
@@ -232,11 +252,12 @@ class APIData:
         )
 
         data_dict = {}
+        abstract = ''
         if valid_data:
             abstract = process_abstract_string(message.get('abstract', ''))
 
         data_dict['abstract'] = abstract
-        data_dict['crossref_field'] = message.get('subject', []),
+        data_dict['field'] = message.get('subject', [])
         data_dict['publisher'] = message.get('container-title', '')
         data_dict['doi'] = message.get('DOI', '')
         data_dict['url'] = message.get('URL', '')
@@ -291,7 +312,7 @@ class APIData:
 
         data_dict = {}
         if valid_data and scraped_data:
-            data_dict['semantic_field'] = scraped_data.get('research field', '')
+            data_dict['field'] = scraped_data.get('research field', '')
             data_dict['publisher'] = scraped_data.get('publisher', '')
             data_dict['abstract'] = process_abstract_string(scraped_data.get('abstract', ''))
 
@@ -320,11 +341,12 @@ class APIData:
             self.orkg_df.at[index, 'author'], content_dict_scholar.get('doi', ''), self.orkg_df.at[index, 'doi']
         )
         data_dict = {}
+        abstract = ''
         if valid_data:
             abstract = process_abstract_string(content_dict_scholar.get('abstract', ''))
 
         data_dict['abstract'] = abstract
-        data_dict['semantic_field'] = content_dict_scholar.get('fieldsOfStudy', [])
+        data_dict['field'] = content_dict_scholar.get('fieldsOfStudy', [])
         data_dict['publisher'] = content_dict_scholar.get('venue', '')
         data_dict['doi'] = content_dict_scholar.get('doi', '')
         data_dict['url'] = content_dict_scholar.get('url', '')
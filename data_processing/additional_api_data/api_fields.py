@@ -0,0 +1,83 @@
+from typing import Dict, List
+import pandas as pd
+
+# Flat schema of the data collected from the APIs. Every entry becomes a typed column '{source}_{name}'.
+# 'field' holds all research fields reported by the API, in the order of the API, joined by FIELD_SEPARATOR.
+API_FIELDS = {
+    'crossref': ['abstract', 'field', 'publisher', 'doi', 'url'],
+    'semantic': ['abstract', 'field', 'publisher', 'doi', 'url'],
+    'openalex': ['abstract', 'doi'],
+}
+FIELD_SEPARATOR = '|'
+
+
+def api_columns(source: str) -> List[str]:
+    """
+    Provides the column names of an API source in the flat schema.
+
+    Parameters
+    ----------
+    source: str
+        key of API_FIELDS
+
+    Returns
+    -------
+    List[str]
+    """
+    return [f'{source}_{name}' for name in API_FIELDS[source]]
+
+
+def to_api_frame(records: List[Dict], source: str, index: pd.Index) -> pd.DataFrame:
+    """
+    Converts the dicts returned by APIData into typed string columns of the flat schema.
+    Empty dicts, empty strings and empty lists become <NA>; list values (e.g. research fields) are joined by
+    FIELD_SEPARATOR (see split_list_column).
+
+    Parameters
+    ----------
+    records: List[Dict]
+        one dict per paper, as returned by APIData
+    source: str
+        key of API_FIELDS
+    index: pd.Index
+        index of the papers
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    columns = {}
+    for name, column in zip(API_FIELDS[source], api_columns(source)):
+        values = [_scalar((record or {}).get(name) if isinstance(record, dict) else None) for record in records]
+        columns[column] = pd.array(values, dtype='string')
+
+    return pd.DataFrame(columns, index=index)
+
+
+def split_list_column(column: pd.Series) -> pd.DataFrame:
+    """
+    Splits a column of FIELD_SEPARATOR-joined values (e.g. '{source}_field') into one row per value.
+
+    Parameters
+    ----------
+    column: pd.Series
+        string column
+
+    Returns
+    -------
+    pd.DataFrame
+        columns 'position' (row position in column), 'rank' (position of the value in its cell) and 'value'
+    """
+    values = column.astype(object).where(column.notna(), None).str.split(FIELD_SEPARATOR, regex=False)
+    values = pd.Series(values.to_numpy(), index=pd.RangeIndex(len(column))).explode().dropna()
+    values = values[values != '']
+    return pd.DataFrame({'position': values.index, 'rank': values.groupby(level=0).cumcount().to_numpy(),
+                         'value': values.to_numpy()})
+
+
+def _scalar(value):
+    if isinstance(value, (list, tuple)):
+        value = FIELD_SEPARATOR.join(str(item) for item in value if item is not None and item != '')
+    if value is None or (isinstance(value, float) and pd.isna(value)) or value == '':
+        return None
+    return str(value)
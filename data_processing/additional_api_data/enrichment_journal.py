@@ -0,0 +1,117 @@
+from typing import Dict, Optional
+import hashlib
+import json
+import os
+
+FILE_PATH = os.path.dirname(__file__)
+JOURNAL_DIR = os.path.join(FILE_PATH, '../data/enrichment')
+DEFAULT_JOURNAL_PATH = os.path.join(JOURNAL_DIR, 'journal.jsonl')
+
+
+class EnrichmentJournal:
+    """
+    Append-only journal (json lines) of the results of API lookups, keyed by row key and source.
+
+    Every result is appended and flushed as soon as it arrives, so a crashed enrichment run loses at most the lookup
+    in flight. On start, the journal is replayed in one pass; lookups that are already in the journal are not sent
+    again. A line cut off by a crash is ignored. Delete the journal file to re-fetch everything.
+    The journal only bridges crashes of one enrichment run: it belongs to one ORKG snapshot (see journal_path) and is
+    discarded once the output of the run is checkpointed (see discard).
+    """
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH, fsync_every: int = 100):
+        """
+        :param path: path of the journal file
+        :param fsync_every: number of appended records after which the file is synced to disk
+        """
+        self.path = path
+        self.fsync_every = fsync_every
+        self.results = self._replay()
+        self._pending = 0
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if self._file.tell() > 0 and not self._ends_with_newline():
+            # terminate a line cut off by a crash, so the next record starts on its own line
+            self._file.write('\n')
+
+    def get(self, key: str, source: str) -> Optional[Dict]:
+        """
+        :return: journaled result of the lookup or None if the lookup was not done yet
+        """
+        return self.results.get((key, source))
+
+    def append(self, key: str, source: str, data: Dict) -> None:
+        """
+        Appends the result of a lookup to the journal.
+
+        :param key: row key (see row_key)
+        :param source: API (crossref, semantic, openalex)
+        :param data: result as returned by APIData
+        """
+        self._file.write(json.dumps({'key': key, 'source': source, 'data': data}, default=str) + '\n')
+        self._file.flush()
+        self.results[(key, source)] = data
+
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    @staticmethod
+    def discard(path: str) -> None:
+        """ Deletes the journal at path (if any) """
+        if os.path.exists(path):
+            os.remove(path)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def __enter__(self) -> 'EnrichmentJournal':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as infile:
+            infile.seek(-1, os.SEEK_END)
+            return infile.read(1) == b'\n'
+
+    def _replay(self) -> Dict:
+        results = {}
+        if not os.path.exists(self.path):
+            return results
+
+        with open(self.path, 'r', encoding='utf-8') as infile:
+            for line in infile:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # last line of a crashed run
+                    continue
+                results[(record['key'], record['source'])] = record['data']
+
+        return results
+
+
+def journal_path(snapshot: str) -> str:
+    """
+    :param snapshot: identifier of the ORKG state (see ORKGData)
+    :return: path of the journal of the enrichment run of a snapshot
+    """
+    return os.path.join(JOURNAL_DIR, f'journal-{snapshot}.jsonl')
+
+
+def row_key(doi, title, author) -> str:
+    """
+    Key of a paper in the journal. The API results depend on doi, title and author (data validation), so all three
+    are part of the key.
+
+    :return: hex digest
+    """
+    values = [value if isinstance(value, (str, list)) else None for value in [doi, title, author]]
+    return hashlib.sha1(json.dumps(values, default=str).encode('utf-8')).hexdigest()
@@ -0,0 +1,34 @@
+from typing import Dict
+import os
+
+# Base URLs of the external APIs. Each can be overridden with an environment variable, e.g. to run the pipeline
+# against a local replay server (see benchmarks/replay_server.py).
+DEFAULT_API_URLS = {
+    'crossref': 'https://api.crossref.org',
+    'semantic': 'https://api.semanticscholar.org',
+    'openalex': 'https://api.openalex.org',
+    'orkg': 'https://orkg.org',
+}
+ENV_VARIABLES = {
+    'crossref': 'CROSSREF_API_URL',
+    'semantic': 'S2AG_API_URL',
+    'openalex': 'OPENALEX_API_URL',
+    'orkg': 'ORKG_API_URL',
+}
+
+
+def api_url(api: str) -> str:
+    """
+    Provides the base URL of an API (without trailing slash). The environment is read on every call, so overrides
+    set after import are respected.
+
+    :param api: key of DEFAULT_API_URLS
+    :return: base URL
+    """
+    return os.environ.get(ENV_VARIABLES[api], DEFAULT_API_URLS[api]).rstrip('/')
+
+
+def api_urls() -> Dict[str, str]:
+    """ base URLs of all APIs """
+    return {api: api_url(api) for api in DEFAULT_API_URLS}
+
@@ -0,0 +1,173 @@
+from typing import Dict, Iterable, List, Optional
+import argparse
+import hashlib
+import json
+import mmap
+import os
+
+import numpy as np
+import pandas as pd
+
+from checkpoint import file_key
+
+FILE_PATH = os.path.dirname(__file__)
+DEFAULT_INDEX_DIR = os.path.join(FILE_PATH, 'data/arxiv_index')
+FIELDS = ['doi', 'id']
+
+
+def hash_key(field: str, value: str) -> int:
+    """
+    64 bit key of a doi or arXiv id in the index.
+
+    :param field: 'doi' or 'id'
+    :param value: doi or arXiv id as stored in the snapshot
+    """
+    digest = hashlib.blake2b(f'{field}:{value}'.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class ArxivIndex:
+    """
+    Persistent index over the arXiv snapshot (json lines) that maps doi and arXiv id to the byte offset of the line
+    of the paper.
+
+    The index is built once by scanning the snapshot and stored as a sorted (n, 2) uint64 array (hashed key, offset)
+    in DEFAULT_INDEX_DIR, together with the fingerprint of the snapshot (see checkpoint.file_key); it is rebuilt when
+    the snapshot changes. Index and snapshot are memory mapped, so a lookup is a binary search plus the parse of one
+    line instead of a parse of the whole snapshot. Hash collisions are resolved by comparing the field of the parsed
+    line with the requested value.
+    """
+
+    def __init__(self, snapshot_path: str, index_dir: str = DEFAULT_INDEX_DIR):
+        """
+        :param snapshot_path: path of the arXiv snapshot
+        :param index_dir: directory of the index files
+        """
+        self.snapshot_path = os.path.expanduser(snapshot_path)
+        name = os.path.basename(self.snapshot_path)
+        self.index_path = os.path.join(index_dir, name + '.idx.npy')
+        self.meta_path = os.path.join(index_dir, name + '.idx.json')
+
+        fingerprint = file_key(self.snapshot_path)
+        if not self._is_current(fingerprint):
+            print(f"Building arXiv index of {self.snapshot_path}...")
+            self.build(fingerprint)
+
+        self.entries = np.load(self.index_path, mmap_mode='r')
+        self.keys = self.entries[:, 0]
+        with open(self.snapshot_path, 'rb') as infile:
+            self._snapshot = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(
+                self.snapshot_path) else b''
+
+    def build(self, fingerprint: str) -> None:
+        """
+        Scans the snapshot once and writes the index (atomically, so an interrupted build leaves no index behind).
+
+        :param fingerprint: fingerprint of the snapshot, stored with the index
+        """
+        keys = []
+        offsets = []
+        records = 0
+        with open(self.snapshot_path, 'rb') as infile:
+            offset = 0
+            for line in infile:
+                if line.strip():
+                    record = json.loads(line)
+                    records += 1
+                    for field in FIELDS:
+                        value = record.get(field)
+                        if value:
+                            keys.append(hash_key(field, str(value)))
+                            offsets.append(offset)
+                offset += len(line)
+
+        entries = np.empty((len(keys), 2), dtype=np.uint64)
+        entries[:, 0] = np.array(keys, dtype=np.uint64)
+        entries[:, 1] = np.array(offsets, dtype=np.uint64)
+        # sort by key, equal keys by offset (the order of the snapshot)
+        entries = entries[np.lexsort((entries[:, 1], entries[:, 0]))]
+
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'wb') as outfile:
+            np.save(outfile, entries)
+        os.replace(tmp_path, self.index_path)
+        with open(self.meta_path, 'w') as outfile:
+            json.dump({'fingerprint': fingerprint, 'records': records, 'entries': len(entries)}, outfile)
+
+    def offsets(self, field: str, value: str) -> List[int]:
+        """
+        :return: byte offsets of the lines whose hashed key matches (candidates, not yet compared with value)
+        """
+        key = np.uint64(hash_key(field, value))
+        start = np.searchsorted(self.keys, key, side='left')
+        end = np.searchsorted(self.keys, key, side='right')
+        return [int(offset) for offset in self.entries[start:end, 1]]
+
+    def read(self, offset: int) -> Dict:
+        """
+        :return: the parsed record of the line starting at offset
+        """
+        end = self._snapshot.find(b'\n', offset)
+        return json.loads(self._snapshot[offset:end if end != -1 else len(self._snapshot)])
+
+    def get(self, doi: Optional[str] = None, arxiv_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Point lookup by doi or arXiv id.
+
+        :return: the first record (in snapshot order) with the doi or id, None if there is none
+        """
+        field, value = ('doi', doi) if doi is not None else ('id', arxiv_id)
+        for offset in self.offsets(field, value):
+            record = self.read(offset)
+            if str(record.get(field)) == value:
+                return record
+        return None
+
+    def get_many(self, values: Iterable[str], field: str = 'doi') -> pd.DataFrame:
+        """
+        Batch lookup. The lines are read in snapshot order, so the result has the order (and the duplicates) of the
+        snapshot, like a filter of the fully loaded snapshot.
+
+        :param values: dois or arXiv ids
+        :param field: 'doi' or 'id'
+        :return: records of the found papers (columns of the snapshot)
+        """
+        values = set(values)
+        offsets = sorted({offset for value in values for offset in self.offsets(field, value)})
+        records = [record for record in map(self.read, offsets) if str(record.get(field)) in values]
+        return pd.DataFrame(records)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def close(self) -> None:
+        if isinstance(self._snapshot, mmap.mmap):
+            self._snapshot.close()
+
+    def __enter__(self) -> 'ArxivIndex':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _is_current(self, fingerprint: str) -> bool:
+        if not os.path.exists(self.index_path) or not os.path.exists(self.meta_path):
+            return False
+        with open(self.meta_path, 'r') as infile:
+            return json.load(infile).get('fingerprint') == fingerprint
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds the arXiv index and looks up papers by doi or arXiv id.')
+    parser.add_argument('snapshot', help='path of the arXiv snapshot (json lines)')
+    parser.add_argument('--doi', nargs='*', default=[], help='dois to look up')
+    parser.add_argument('--id', nargs='*', default=[], help='arXiv ids to look up')
+    args = parser.parse_args()
+
+    with ArxivIndex(args.snapshot) as index:
+        print(f"Index of {len(index)} entries: {index.index_path}")
+        for doi in args.doi:
+            print(json.dumps(index.get(doi=doi)))
+        for arxiv_id in args.id:
+            print(json.dumps(index.get(arxiv_id=arxiv_id)))
@@ -0,0 +1,210 @@
+from typing import Dict, Iterable, List
+import hashlib
+import io
+import json
+import mmap
+import os
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from checkpoint import file_key
+from storage import read_dataset, write_dataset
+
+FILE_PATH = os.path.dirname(__file__)
+DEFAULT_STATE_DIR = os.path.join(FILE_PATH, 'data/arxiv_state')
+RECORD_COLUMNS = ['id', 'doi', 'categories', 'line_hash', 'offset', 'sample_key']
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+class ArxivState:
+    """
+    Processed state of the arXiv snapshot, kept between runs so a new snapshot only needs the records that changed.
+
+    Files in the state directory:
+        - records.parquet: one row per paper with id, doi, categories, hash of its snapshot line, byte offset of the
+          line and the sample key (hash of the id),
+        - arxiv_dist.json: number of papers per category (a paper counts for each of its categories),
+        - single_label_dist.json: number of single-label papers per category (see ArxivDataReduction),
+        - meta.json: fingerprint and path of the snapshot the state belongs to.
+
+    update() hashes every line of the new snapshot and only parses the lines whose hash is unknown, i.e. papers that
+    are new or whose record changed (new version, update_date, ...); the distributions are updated by the difference.
+    sample() draws the stratified sample with bottom-k hash sampling: per category, the papers with the smallest
+    sample keys. The sample only depends on the set of papers, not on the order of updates, so an incrementally
+    updated state gives the same sample as one built from scratch and a weekly refresh changes the sample only where
+    papers were added, removed or relabeled.
+    """
+
+    def __init__(self, state_dir: str = DEFAULT_STATE_DIR):
+        self.state_dir = state_dir
+        self.records_path = os.path.join(state_dir, 'records.parquet')
+        self.distribution_path = os.path.join(state_dir, 'arxiv_dist.json')
+        self.single_label_distribution_path = os.path.join(state_dir, 'single_label_dist.json')
+        self.meta_path = os.path.join(state_dir, 'meta.json')
+
+        self.records = pd.DataFrame({column: pd.Series(dtype=np.uint64 if column in ['line_hash', 'offset',
+                                                                                     'sample_key'] else object)
+                                     for column in RECORD_COLUMNS})
+        self.distribution = {}
+        self.single_label_distribution = {}
+        self.meta = {}
+        if os.path.exists(self.meta_path):
+            self.records = read_dataset(self.records_path)
+            self.distribution = self._load_json(self.distribution_path)
+            self.single_label_distribution = self._load_json(self.single_label_distribution_path)
+            self.meta = self._load_json(self.meta_path)
+
+    @property
+    def snapshot_path(self) -> str:
+        return self.meta.get('snapshot_path', '')
+
+    def update(self, snapshot_path: str) -> Dict[str, int]:
+        """
+        Brings the state up to date with a snapshot and saves it. Nothing is read if the snapshot is the one of the
+        last update.
+
+        :param snapshot_path: path of the arXiv snapshot (json lines)
+        :return: number of new, changed, removed and unchanged papers
+        """
+        snapshot_path = os.path.abspath(os.path.expanduser(snapshot_path))
+        fingerprint = file_key(snapshot_path)
+        if self.meta.get('fingerprint') == fingerprint:
+            return {'new': 0, 'changed': 0, 'removed': 0, 'unchanged': len(self.records)}
+
+        known_hashes = set(self.records['line_hash'].tolist())
+        hashes, offsets, new_lines, new_offsets = [], [], [], []
+        with open(snapshot_path, 'rb') as infile:
+            offset = 0
+            for line in infile:
+                if line.strip():
+                    line_hash = _hash64(line)
+                    hashes.append(line_hash)
+                    offsets.append(offset)
+                    if line_hash not in known_hashes:
+                        new_lines.append(line)
+                        new_offsets.append(offset)
+                offset += len(line)
+
+        # unchanged papers only move to their new offset
+        line_offsets = pd.Series(np.array(offsets, dtype=np.uint64), index=np.array(hashes, dtype=np.uint64))
+        line_offsets = line_offsets[~line_offsets.index.duplicated()]
+        unchanged = self.records[self.records['line_hash'].isin(line_offsets.index)].copy()
+        unchanged['offset'] = line_offsets.loc[unchanged['line_hash']].to_numpy()
+
+        parsed = [json.loads(line) for line in new_lines]
+        new_records = pd.DataFrame({
+            'id': [str(record['id']) for record in parsed],
+            'doi': [record.get('doi') for record in parsed],
+            'categories': [record.get('categories', '') for record in parsed],
+            'line_hash': np.array([_hash64(line) for line in new_lines], dtype=np.uint64),
+            'offset': np.array(new_offsets, dtype=np.uint64),
+            'sample_key': np.array([_hash64(str(record['id']).encode('utf-8')) for record in parsed],
+                                   dtype=np.uint64)
+        }, columns=RECORD_COLUMNS).drop_duplicates('id', keep='last')
+        unchanged = unchanged[~unchanged['id'].isin(new_records['id'])]
+
+        replaced = self.records[~self.records.index.isin(unchanged.index)]
+        stats = {'new': int((~new_records['id'].isin(replaced['id'])).sum()),
+                 'changed': int(new_records['id'].isin(replaced['id']).sum()),
+                 'removed': int((~replaced['id'].isin(new_records['id'])).sum()),
+                 'unchanged': len(unchanged)}
+
+        self._count(replaced['categories'], -1)
+        self._count(new_records['categories'], 1)
+        self.records = pd.concat([unchanged, new_records], ignore_index=True)
+        self.meta = {'fingerprint': fingerprint, 'snapshot_path': snapshot_path, 'papers': len(self.records)}
+        self.save()
+
+        instrumentation.record_cache('arxiv_state', True, stats['unchanged'])
+        instrumentation.record_cache('arxiv_state', False, len(new_records))
+        return stats
+
+    def sample(self, threshold_instances: int, exclude_dois: Iterable[str] = ()) -> pd.DataFrame:
+        """
+        Stratified sample of the single-label papers with the label distribution of ArxivDataReduction, drawn with
+        bottom-k hash sampling. Like in the full mode, the excluded papers are removed before the distribution is
+        computed and the sample is drawn, so the sample has the same size and distribution.
+
+        :param threshold_instances: desired number of instances overall
+        :param exclude_dois: dois of papers that are not sampled (the arXiv papers that exist in ORKG)
+        :return: the sampled papers as loaded from the snapshot (see load_arxiv_snapshot)
+        """
+        excluded = self.records['doi'].isin(set(exclude_dois))
+        single_label_distribution = dict(self.single_label_distribution)
+        for label, count in self.records.loc[excluded, 'categories'].value_counts().items():
+            if label in single_label_distribution:
+                single_label_distribution[label] -= count
+        single_label_distribution = {label: count for label, count in single_label_distribution.items() if count}
+
+        df_length = sum(single_label_distribution.values())
+        distribution_reduced = {label: int(count / df_length * threshold_instances)
+                                for label, count in single_label_distribution.items()}
+
+        candidates = self.records[~excluded & self.records['categories'].isin(distribution_reduced.keys())]
+        offsets = []
+        for label, group in candidates.groupby('categories'):
+            offsets.extend(group.nsmallest(distribution_reduced[label], 'sample_key')['offset'].tolist())
+        return self.read(offsets)
+
+    def get_many(self, dois: Iterable[str]) -> pd.DataFrame:
+        """
+        :return: the papers with the given dois as loaded from the snapshot (in snapshot order)
+        """
+        return self.read(sorted(self.records.loc[self.records['doi'].isin(set(dois)), 'offset'].tolist()))
+
+    def read(self, offsets: List[int]) -> pd.DataFrame:
+        """
+        Reads the lines at the given offsets of the current snapshot.
+
+        :return: the records in the format of load_arxiv_snapshot
+        """
+        if not offsets:
+            return pd.DataFrame()
+        with open(self.snapshot_path, 'rb') as infile, \
+                mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as snapshot:
+            lines = []
+            for offset in offsets:
+                end = snapshot.find(b'\n', int(offset))
+                lines.append(snapshot[int(offset):end if end != -1 else len(snapshot)])
+        return pd.read_json(io.StringIO(b'\n'.join(lines).decode('utf-8')), lines=True)
+
+    def save(self) -> None:
+        """
+        Writes the state to disk. meta.json is removed first and written last, so a state whose save was
+        interrupted is not loaded (the next update rebuilds it from scratch).
+        """
+        os.makedirs(self.state_dir, exist_ok=True)
+        if os.path.exists(self.meta_path):
+            os.remove(self.meta_path)
+        write_dataset(self.records, self.records_path)
+        self._save_json(self.distribution, self.distribution_path)
+        self._save_json(self.single_label_distribution, self.single_label_distribution_path)
+        self._save_json(self.meta, self.meta_path)
+
+    def _count(self, categories: pd.Series, sign: int) -> None:
+        for value in categories:
+            labels = value.split(' ')
+            for label in labels:
+                self.distribution[label] = self.distribution.get(label, 0) + sign
+            if len(labels) == 1:
+                self.single_label_distribution[value] = self.single_label_distribution.get(value, 0) + sign
+        self.distribution = {label: count for label, count in self.distribution.items() if count}
+        self.single_label_distribution = {label: count for label, count in self.single_label_distribution.items()
+                                          if count}
+
+    @staticmethod
+    def _load_json(path: str) -> Dict:
+        with open(path, 'r') as infile:
+            return json.load(infile)
+
+    @staticmethod
+    def _save_json(data: Dict, path: str) -> None:
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as outfile:
+            json.dump(data, outfile, indent=1)
+        os.replace(tmp_path, path)
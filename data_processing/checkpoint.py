@@ -0,0 +1,212 @@
+from typing import Callable, Dict, Iterable, List, Optional
+import hashlib
+import inspect
+import json
+import os
+import sys
+import sysconfig
+import types
+
+import pandas as pd
+
+import instrumentation
+from storage import read_dataset, write_dataset
+
+FILE_PATH = os.path.dirname(__file__)
+DEFAULT_CHECKPOINT_DIR = os.path.join(FILE_PATH, 'data/checkpoints')
+# code installed with python or from packages is versioned by the environment, not by the stage keys
+LIBRARY_PATHS = tuple(os.path.abspath(sysconfig.get_paths()[name]) + os.sep
+                      for name in ['stdlib', 'platstdlib', 'purelib', 'platlib'])
+
+
+class CheckpointStore:
+    """
+    Content-addressed checkpoints of pipeline stages.
+
+    The key of a stage is a hash of:
+        - the stage name and parameters,
+        - the keys of its inputs (keys of upstream stages or fingerprints of input data),
+        - the source of the code it runs, i.e. the stage function and every function or class of the project it
+          reaches through its call graph (code version, see code_closure),
+        - the content of the files it reads (e.g. mapping files).
+    A stage whose key already has a checkpoint is loaded instead of recomputed. Since the key of a stage is an input
+    of all downstream stages, a changed key invalidates everything downstream of it.
+    Checkpoints are stored as parquet files (see storage.write_dataset).
+    """
+
+    def __init__(self, checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR):
+        self.checkpoint_dir = checkpoint_dir
+        self._file_hashes = {}
+
+    def stage_key(self, name: str, inputs: Iterable[str], code: Iterable = (), files: Iterable[str] = (),
+                  params: Optional[Dict] = None) -> str:
+        """
+        Computes the key of a stage.
+
+        :param name: name of the stage
+        :param inputs: keys of the inputs of the stage
+        :param code: functions, methods or classes the stage runs; their source and the source of the project code
+            they reach makes up the code version of the stage (see code_closure)
+        :param files: paths of the files read by the stage
+        :param params: json serializable parameters of the stage
+        :return: hex digest
+        """
+        key_data = {
+            'name': name,
+            'inputs': list(inputs),
+            'code': sorted(hashlib.sha256(inspect.getsource(obj).encode('utf-8')).hexdigest()
+                           for obj in code_closure(code)),
+            'files': [self._file_hash(path) for path in files],
+            'params': params or {}
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def run_stage(self, name: str, func: Callable[[], pd.DataFrame], inputs: Iterable[str], code: Iterable = (),
+                  files: Iterable[str] = (), params: Optional[Dict] = None,
+                  rows_in: Optional[int] = None) -> (str, pd.DataFrame):
+        """
+        Loads the checkpoint of a stage if its key is unchanged, otherwise runs the stage and stores its output.
+        The stage is measured in the run report (see instrumentation).
+
+        :param name: name of the stage
+        :param func: function that computes the output of the stage
+        :param rows_in: number of input rows (for the run report)
+        :return: key of the stage, output of the stage
+        """
+        key = self.stage_key(name, inputs, code, files, params)
+        path = self.path(name, key)
+
+        with instrumentation.stage(name, rows_in) as record:
+            record.cached = os.path.exists(path)
+            instrumentation.record_cache('checkpoints', record.cached)
+            if record.cached:
+                print(f"Loaded checkpoint of stage '{name}'...")
+                df = self.read(path)
+            else:
+                df = func()
+                self.write(df, path)
+            record.rows_out = len(df)
+
+        return key, df
+
+    def path(self, name: str, key: str) -> str:
+        """ path of the checkpoint of a stage """
+        return os.path.join(self.checkpoint_dir, f'{name}-{key[:16]}.parquet')
+
+    def read(self, path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return read_dataset(path, columns=columns)
+
+    def write(self, df: pd.DataFrame, path: str) -> None:
+        # write_dataset replaces the file atomically, so an interrupted write never leaves a valid-looking checkpoint
+        write_dataset(df, path)
+
+    def _file_hash(self, path: str) -> str:
+        path = os.path.abspath(path)
+        if path not in self._file_hashes:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as infile:
+                for block in iter(lambda: infile.read(1 << 20), b''):
+                    digest.update(block)
+            self._file_hashes[path] = digest.hexdigest()
+        return self._file_hashes[path]
+
+
+def code_closure(code: Iterable) -> List:
+    """
+    Collects the functions and classes of the project (not of python or installed packages) that the given code can
+    reach: the globals a function references, the methods it calls on self (members of its class), the members of
+    project modules and classes it reads (e.g. module.helper or Class.method) and, for classes, all their methods and
+    their project base classes. References are followed by name, so a helper that is only reached dynamically (e.g.
+    through an attribute set at runtime) has to be passed in code explicitly.
+
+    The checkpoint store itself (this module) is not part of the code version of a stage.
+
+    :param code: functions, methods or classes
+    :return: the given code and everything it reaches, without duplicates
+    """
+    reached = {}
+    pending = list(code)
+    while pending:
+        obj = pending.pop()
+        if id(obj) not in reached:
+            reached[id(obj)] = obj
+            pending.extend(value for value in _references(obj) if value.__module__ != __name__)
+    return list(reached.values())
+
+
+def _references(obj) -> List:
+    """ project functions and classes referenced by obj (see code_closure) """
+    if inspect.isclass(obj):
+        return [base for base in obj.__bases__ if _is_project_code(base)] + \
+            [func for member in vars(obj).values() for func in _functions(member)]
+    if not inspect.isfunction(obj):
+        return []
+
+    names = set()
+    code_objects = [obj.__code__]
+    while code_objects:
+        code_object = code_objects.pop()
+        names.update(code_object.co_names)
+        code_objects.extend(const for const in code_object.co_consts if isinstance(const, types.CodeType))
+
+    # a name is looked up in the globals of the function and, for methods, in their class
+    owner = sys.modules.get(obj.__module__)
+    for part in obj.__qualname__.split('.')[:-1]:
+        owner = getattr(owner, part, None)
+    namespaces = [obj.__globals__] + ([vars(owner)] if inspect.isclass(owner) else [])
+    values = [namespace[name] for namespace in namespaces for name in names if name in namespace]
+    # attributes read of project modules and classes
+    values += [vars(value)[name] for value in list(values)
+               if (inspect.ismodule(value) or inspect.isclass(value)) and _is_project_code(value)
+               for name in names if name in vars(value)]
+    return [func for value in values for func in _functions(value)]
+
+
+def _functions(value) -> List:
+    """ the project functions and classes behind a value (methods, static and class methods, properties) """
+    if isinstance(value, (staticmethod, classmethod)):
+        value = value.__func__
+    values = [value.fget, value.fset, value.fdel] if isinstance(value, property) else [value]
+    return [inspect.unwrap(value) if inspect.isfunction(value) else value for value in values
+            if (inspect.isfunction(value) or inspect.isclass(value)) and _is_project_code(value)]
+
+
+def _is_project_code(obj) -> bool:
+    """ True for functions, classes and modules defined in a source file of the project """
+    if inspect.isfunction(obj):
+        # functions generated at runtime (e.g. by dataclasses) have no source file
+        path = obj.__code__.co_filename
+    else:
+        module = obj if inspect.ismodule(obj) else sys.modules.get(getattr(obj, '__module__', None))
+        path = getattr(module, '__file__', None)
+    return bool(path) and os.path.isfile(path) and not os.path.abspath(path).startswith(LIBRARY_PATHS)
+
+
+def frame_key(df: pd.DataFrame) -> str:
+    """
+    Fingerprint of the content of a dataframe, used as input key of stages that get data from outside the store.
+    Columns with unhashable cells (e.g. lists) are hashed via their string representation.
+
+    :param df: dataframe
+    :return: hex digest
+    """
+    digest = hashlib.sha256(json.dumps(list(map(str, df.columns))).encode('utf-8'))
+    for column in df.columns:
+        try:
+            hashes = pd.util.hash_pandas_object(df[column], index=True)
+        except TypeError:
+            hashes = pd.util.hash_pandas_object(df[column].astype(str), index=True)
+        digest.update(hashes.values.tobytes())
+    return digest.hexdigest()
+
+
+def file_key(path: str) -> str:
+    """
+    Cheap fingerprint of a large input file (path, size and modification time).
+
+    :param path: path of the file
+    :return: hex digest
+    """
+    path = os.path.abspath(os.path.expanduser(path))
+    stat = os.stat(path)
+    return hashlib.sha256(f'{path}:{stat.st_size}:{stat.st_mtime_ns}'.encode('utf-8')).hexdigest()
@@ -4,6 +4,7 @@ import spacy
 from nameparser import HumanName
 import fasttext
 import string
+from functools import lru_cache
 
 class LanguageIdentification:
     """
@@ -92,30 +93,76 @@ def standardize_doi(doi):
     return doi
 
 
+def normalize_titles(titles: pd.Series) -> pd.Series:
+    """
+    Normalizes titles for use as join keys: lowercase, no punctuation, single spaces.
+    :param titles: column of titles
+    :return: column of normalized titles (NaN stays NaN)
+    """
+    titles = titles.astype('string').str.lower()
+    titles = titles.str.replace('[{}]'.format(re.escape(string.punctuation)), '', regex=True)
+    return titles.str.replace(r'\s+', ' ', regex=True).str.strip().replace('', pd.NA)
+
+
+def normalize_dois(dois: pd.Series) -> pd.Series:
+    """
+    Normalizes dois for use as join keys: lowercase without the "https://doi.org/" prefix.
+    :param dois: column of dois
+    :return: column of normalized dois (NaN stays NaN)
+    """
+    dois = dois.astype('string').str.strip().str.lower()
+    return dois.str.replace(r'^(https?://(dx\.)?doi\.org/)', '', regex=True).replace('', pd.NA)
+
+
+@lru_cache(maxsize=1)
+def _language_model() -> LanguageIdentification:
+    """ the fasttext model is loaded once per process """
+    return LanguageIdentification()
+
+
 def is_english(text):
     """
     A function that checks if a text is in English using fasttext language detection.
     :param text: text
     :return: True if the input text is in English, False otherwise
     """
-    LANGUAGE = LanguageIdentification()
-    lang = LANGUAGE.predict_lang(text)
+    lang = _language_model().predict_lang(text)
     return lang[0][0] == '__label__en'
 
 
+def english_mask(titles: pd.Series, abstracts: pd.Series) -> pd.Series:
+    """
+    Identifies the papers that are in English according to title and abstract.
+    :param titles: titles of the papers
+    :param abstracts: abstracts of the papers (same index as titles)
+    :return: boolean column, True for English papers
+    """
+    texts = titles.astype(str) + ' ' + abstracts.astype(str)
+    return pd.Series([is_english(text.replace('\n', ' ').replace('\r', ' ')) for text in texts],
+                     index=titles.index, dtype=bool)
+
+
+def non_english_mask(texts: pd.Series, min_probability: float = 0.9) -> pd.Series:
+    """
+    Identifies the texts that are not in English with high confidence.
+    :param texts: texts (e.g. titles)
+    :param min_probability: minimum probability of the predicted (non-English) language
+    :return: boolean column, True for texts whose most likely language is not English with at least min_probability
+    """
+    mask = []
+    for text in texts.astype(str):
+        labels, probabilities = _language_model().predict_lang(text.replace('\n', ' ').replace('\r', ' '))
+        mask.append(labels[0] != '__label__en' and probabilities[0] >= min_probability)
+    return pd.Series(mask, index=texts.index, dtype=bool)
+
+
 def remove_non_english(df):
     """
     Removes papers that are not in English (according to title and abstract).
     :param df: dataset
     :return: the same dataset with non-English papers removed
     """
-    df['title_abstract'] = str(df['title']) + ' ' + str(df['abstract'])
-    df['title_abstract'] = [text.replace('\n', ' ').replace('\r', ' ') for text in df['title_abstract']]
-    df['is_english'] = [is_english(str(text)) for text in df['title_abstract']]
-    df = df[df['is_english'] == True]
-    df = df.drop(columns=['is_english', 'title_abstract'])
-
-    return df
+    return df[english_mask(df['title'], df['abstract'])]
 
 
 def drop_non_papers(df):
@@ -135,15 +182,15 @@ def drop_non_papers(df):
 def remove_duplicates(df):
     """
     A function that removes duplicat papers according to title, and keeps the one with the least NaN elements in it.
+    Papers without doi are never considered duplicates of each other by doi.
     :param df: dataframe of orkg data
     :return: the same dataframe with dropped duplicates
     """
-    df['crossref_field'] = df['crossref_field'].apply(lambda x: np.nan if x == '{}' else x)
-    df['semantic_field'] = df['semantic_field'].apply(lambda x: np.nan if x == '{}' else x)
+    df['nan_count'] = df.isna().sum(axis=1)
+    df = df.sort_values('nan_count', ascending=True, kind='stable').drop_duplicates('title', keep='first')
 
-    df['nan_count'] = [df.loc[index].isna().sum().sum() for index, row in df.iterrows()]
-    df = df.sort_values('nan_count', ascending=True).drop_duplicates('title', keep='first').sort_index()
-    df = df.sort_values('nan_count', ascending=True).drop_duplicates('doi', keep='first').sort_index().append(df[df['doi'].isna()])
+    has_doi = df['doi'].notna() & (df['doi'] != '')
+    df = pd.concat([df[has_doi].drop_duplicates('doi', keep='first'), df[~has_doi]]).sort_index()
     df = df.drop(columns=['nan_count'])
 
     return df
@@ -0,0 +1,274 @@
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Optional
+import bisect
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+FILE_PATH = os.path.dirname(__file__)
+DEFAULT_REPORT_DIR = os.path.join(FILE_PATH, 'data/reports')
+
+# upper bounds (ms) of the buckets of the request latency histograms, the last bucket is unbounded
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class StageRecord:
+    """
+    Measurements of one stage: wall and CPU time, rows in and out, peak RSS of the process after the stage and
+    whether the output was loaded from a checkpoint.
+    """
+
+    def __init__(self, name: str, rows_in: Optional[int] = None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.cached = False
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_rss_mb = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'wall_time': round(self.wall_time, 3),
+            'cpu_time': round(self.cpu_time, 3),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'peak_rss_mb': self.peak_rss_mb,
+            'cached': self.cached
+        }
+
+
+class RunReport:
+    """
+    Collects the performance measurements of a pipeline run:
+        - stages: wall/CPU time, rows in/out and peak RSS per stage,
+        - apis: request counts, failed requests, retries and a latency histogram per API,
+        - caches: hits and misses per cache (checkpoints, statement store, research field index),
+        - pushdowns: rows removed and API calls avoided per filter applied ahead of the API enrichment.
+    Reports of worker processes are combined with merge().
+    """
+
+    def __init__(self):
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.stages = []
+        self.apis = {}
+        self.caches = {}
+        self.pushdowns = {}
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None):
+        """
+        Measures the stage executed in the with block. The caller sets rows_out (and cached) on the yielded record.
+
+        :param name: name of the stage
+        :param rows_in: number of input rows
+        """
+        record = StageRecord(name, rows_in)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_time = time.perf_counter() - wall_start
+            record.cpu_time = time.process_time() - cpu_start
+            record.peak_rss_mb = peak_rss_mb()
+            self.stages.append(record.to_dict())
+
+    def record_request(self, api: str, latency: float, ok: bool) -> None:
+        """
+        :param api: name of the API
+        :param latency: duration of the request in seconds
+        :param ok: whether the request succeeded
+        """
+        stats = self._api_stats(api)
+        latency_ms = latency * 1000
+        stats['requests'] += 1
+        stats['failed'] += 0 if ok else 1
+        stats['total_latency_ms'] += latency_ms
+        stats['max_latency_ms'] = max(stats['max_latency_ms'], latency_ms)
+        stats['latency_histogram'][bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+
+    def record_retry(self, api: str) -> None:
+        self._api_stats(api)['retries'] += 1
+
+    def record_cache(self, cache: str, hit: bool, count: int = 1) -> None:
+        stats = self.caches.setdefault(cache, {'hits': 0, 'misses': 0})
+        stats['hits' if hit else 'misses'] += count
+
+    def record_pushdown(self, name: str, rows: int, calls_avoided: int) -> None:
+        """
+        :param name: name of the filter
+        :param rows: number of rows the filter excluded from the API enrichment
+        :param calls_avoided: number of API requests that were not sent because of the filter
+        """
+        stats = self.pushdowns.setdefault(name, {'rows': 0, 'calls_avoided': 0})
+        stats['rows'] += rows
+        stats['calls_avoided'] += calls_avoided
+
+    def merge(self, report: Dict) -> None:
+        """
+        Adds the measurements of another report (e.g. of a worker process).
+
+        :param report: report in the format of to_dict()
+        """
+        self.stages.extend(report['stages'])
+        for api, other in report['apis'].items():
+            stats = self._api_stats(api)
+            for name in ['requests', 'failed', 'retries', 'total_latency_ms']:
+                stats[name] += other[name]
+            stats['max_latency_ms'] = max(stats['max_latency_ms'], other['max_latency_ms'])
+            stats['latency_histogram'] = [a + b for a, b in zip(stats['latency_histogram'],
+                                                                other['latency_histogram'])]
+        for cache, other in report['caches'].items():
+            self.record_cache(cache, True, other['hits'])
+            self.record_cache(cache, False, other['misses'])
+        for name, other in report.get('pushdowns', {}).items():
+            self.record_pushdown(name, other['rows'], other['calls_avoided'])
+
+    def to_dict(self) -> Dict:
+        apis = {}
+        for api, stats in self.apis.items():
+            apis[api] = dict(stats)
+            apis[api]['mean_latency_ms'] = stats['total_latency_ms'] / stats['requests'] if stats['requests'] else 0.0
+        caches = {}
+        for cache, stats in self.caches.items():
+            total = stats['hits'] + stats['misses']
+            caches[cache] = dict(stats, hit_ratio=stats['hits'] / total if total else 0.0)
+
+        return {
+            'started': self.started,
+            'peak_rss_mb': peak_rss_mb(),
+            'latency_buckets_ms': LATENCY_BUCKETS_MS + ['inf'],
+            'stages': self.stages,
+            'apis': apis,
+            'caches': caches,
+            'pushdowns': {name: dict(stats) for name, stats in self.pushdowns.items()}
+        }
+
+    def write_json(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as outfile:
+            json.dump(self.to_dict(), outfile, indent=2)
+
+    def summary(self) -> str:
+        """ human readable summary of the report """
+        report = self.to_dict()
+        lines = [f"{'stage':<28}{'wall (s)':>10}{'cpu (s)':>10}{'rows in':>10}{'rows out':>10}{'rss (MB)':>10}"]
+        for stage in report['stages']:
+            name = stage['name'] + (' (cached)' if stage['cached'] else '')
+            lines.append(f"{name:<28}{stage['wall_time']:>10.2f}{stage['cpu_time']:>10.2f}"
+                         f"{_format_count(stage['rows_in']):>10}{_format_count(stage['rows_out']):>10}"
+                         f"{_format_count(stage['peak_rss_mb']):>10}")
+
+        for api, stats in report['apis'].items():
+            lines.append(f"{api}: {stats['requests']} requests, {stats['failed']} failed, {stats['retries']} retries, "
+                         f"mean latency {stats['mean_latency_ms']:.0f} ms, max {stats['max_latency_ms']:.0f} ms")
+
+        for cache, stats in report['caches'].items():
+            lines.append(f"{cache}: {stats['hits']} hits, {stats['misses']} misses "
+                         f"(hit ratio {stats['hit_ratio']:.2f})")
+
+        for name, stats in report['pushdowns'].items():
+            lines.append(f"{name}: {stats['rows']} rows filtered before enrichment, "
+                         f"{stats['calls_avoided']} API calls avoided")
+
+        return '\n'.join(lines)
+
+    def _api_stats(self, api: str) -> Dict:
+        return self.apis.setdefault(api, {
+            'requests': 0,
+            'failed': 0,
+            'retries': 0,
+            'total_latency_ms': 0.0,
+            'max_latency_ms': 0.0,
+            'latency_histogram': [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        })
+
+
+# report of the current process
+_report = RunReport()
+
+
+def get_report() -> RunReport:
+    return _report
+
+
+def reset_report() -> RunReport:
+    """ starts a new report for the current process and returns it """
+    global _report
+    _report = RunReport()
+    return _report
+
+
+def stage(name: str, rows_in: Optional[int] = None):
+    """ measures a stage in the report of the current process (see RunReport.stage) """
+    return _report.stage(name, rows_in)
+
+
+def track_request(api: str, request: Callable, *args, **kwargs):
+    """
+    Calls request(*args, **kwargs) and records its latency and outcome. Exceptions are recorded as failed requests
+    and re-raised.
+
+    :param api: name of the API
+    :param request: function that sends the request, e.g. requests.get
+    :return: response returned by request
+    """
+    start = time.perf_counter()
+    try:
+        response = request(*args, **kwargs)
+    except Exception:
+        _report.record_request(api, time.perf_counter() - start, False)
+        raise
+    ok = getattr(response, 'ok', getattr(response, 'succeeded', True))
+    _report.record_request(api, time.perf_counter() - start, bool(ok))
+    return response
+
+
+def record_retry(api: str) -> None:
+    _report.record_retry(api)
+
+
+def record_cache(cache: str, hit: bool, count: int = 1) -> None:
+    _report.record_cache(cache, hit, count)
+
+
+def record_pushdown(name: str, rows: int, calls_avoided: int) -> None:
+    _report.record_pushdown(name, rows, calls_avoided)
+
+
+def finish_run(name: str, report_dir: str = DEFAULT_REPORT_DIR) -> str:
+    """
+    Writes the report of the current process as json file and prints its summary.
+
+    :param name: name of the run, used as prefix of the file name
+    :param report_dir: directory of the reports
+    :return: path of the json report
+    """
+    path = os.path.join(report_dir, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    _report.write_json(path)
+    print(_report.summary())
+    print(f"Run report saved to {path}")
+    return path
+
+
+def peak_rss_mb() -> Optional[float]:
+    """ peak resident set size of the current process and its finished children in MB """
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _format_count(value) -> str:
+    return '-' if value is None else str(value)
@@ -0,0 +1,52 @@
+from functools import lru_cache
+from typing import Dict
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+FILE_PATH = os.path.dirname(__file__)
+MAPPINGS_DIR = os.path.join(FILE_PATH, 'data/mappings')
+
+
+def load_mapping(filename: str) -> Dict[str, str]:
+    """
+    Loads a label mapping json file once per process. The file is re-read only if it changed on disk.
+    Note that the returned dict is shared between callers and must not be modified.
+
+    :param filename: file name in data_processing/data/mappings or absolute path
+    :return: mapping dict
+    """
+    path = os.path.abspath(os.path.join(MAPPINGS_DIR, filename))
+    return _read_mapping(path, os.path.getmtime(path))
+
+
+@lru_cache(maxsize=None)
+def _read_mapping(path: str, mtime: float) -> Dict[str, str]:
+    with open(path, 'r') as infile:
+        return json.load(infile)
+
+
+def map_labels(labels: pd.Series, mapping: Dict[str, str], keep_unmapped: bool = True) -> pd.Series:
+    """
+    Maps a label column by converting it to a categorical and mapping its categories, so the mapping dict is
+    consulted once per distinct label and the rows are remapped with a single take over the category codes.
+
+    :param labels: label column
+    :param mapping: {label: new label}
+    :param keep_unmapped: keep labels that are not in mapping, otherwise they become NaN
+    :return: mapped label column as categorical
+    """
+    labels = labels.astype('category')
+    categories = labels.cat.categories
+    mapped = pd.Series(categories, dtype=object).map(mapping)
+    if keep_unmapped:
+        mapped = mapped.fillna(pd.Series(categories, dtype=object))
+
+    # codes of the mapped categories in the (deduplicated) new categories; the appended -1 keeps NaN rows NaN
+    new_codes, new_categories = pd.factorize(mapped)
+    codes = np.append(new_codes, -1)[labels.cat.codes.to_numpy()]
+
+    return pd.Series(pd.Categorical.from_codes(codes, categories=new_categories), index=labels.index,
+                     name=labels.name)
@@ -39,3 +39,20 @@ class Strategy(ABC):
         Dict[str, list]
         """
         pass
+
+    @abstractmethod
+    def get_subfield_statements(self, predicate_id: str) -> Dict[str, list]:
+        """
+        Method that provides all edges of the research field hierarchy as parallel lists of labels.
+        Dict = {'parent': List[str], 'child': List[str]}
+
+        Parameters
+        ----------
+        predicate_id : str
+            ID of "has subfield"
+
+        Returns
+        -------
+        Dict[str, list]
+        """
+        pass
@@ -1,5 +1,6 @@
+import ast
 import pandas as pd
-from typing import Dict
+from typing import List, Optional
 
 from data_cleaning_utils import standardize_doi, cleanhtml_titles, remove_extra_space, \
     drop_non_papers, remove_duplicates, parse_author, remove_punctuation
@@ -35,26 +36,21 @@ class ORKGDataCleaner:
     def _parse_authors_orkg(self, orkg_df: pd.DataFrame) -> pd.DataFrame:
         """
         Takes the orkg_df and adds the column 'authors_parsed' with the same authors parsed in a list.
+        Every cell is either a list of [last name, first + middle name, title, suffix] lists or None, so the column
+        maps directly to a nested list type when it is stored.
         """
-        orkg_df['authors_parsed'] = ''
-        for index, row in orkg_df.iterrows():
-
-            if type(row['author']) != float:
-
-                if type(row['author']) == str:
-                    if row['author'].startswith('['):
-                        author_list = ast.literal_eval(row['author'])
-                    else:
-                        orkg_df.at[index, 'authors_parsed'] = parse_author(row['author'])
-                        return orkg_df
-                    
-                elif type(row['author']) == list:
-                    author_list = row['author']
-
-                authors_list_parsed = []
-                for author in author_list:
-                    authors_list_parsed.append(parse_author(author))
-                orkg_df.at[index, 'authors_parsed'] = authors_list_parsed
-            
-
+        orkg_df['authors_parsed'] = orkg_df['author'].map(self._parse_author_cell)
         return orkg_df
+
+    @staticmethod
+    def _parse_author_cell(author) -> Optional[List[List[str]]]:
+        if isinstance(author, str):
+            if not author:
+                return None
+            author_list = ast.literal_eval(author) if author.startswith('[') else [author]
+        elif isinstance(author, list):
+            author_list = author
+        else:
+            return None
+
+        return [parse_author(name) for name in author_list]
@@ -1,6 +1,11 @@
 import pandas as pd
-import json
-import ast
+import numpy as np
+
+from data_cleaning_utils import normalize_titles, normalize_dois
+from label_mapping import load_mapping, map_labels
+from additional_api_data.api_fields import split_list_column
+
+RELABEL_CSV_PATH = "data_processing/data/merged_data_relabeling_science.csv"
 
 
 class ScienceLabelConverter:
@@ -8,10 +13,14 @@ class ScienceLabelConverter:
     Converts 'Science' labels in orkg data to the appropriate label from crossref and semantic scholar.
     Note that this class includes a manual re-labeling step, which is done by exporting the science labels to a .csv
     file and then re-importing the relabeled file in .xlsx format; in which new labels are added.
+
+    All label sources are resolved as keyed lookups: the api research fields of the 'Science' papers are
+    mapped per distinct label, and the manual re-labeling table is joined on the normalized doi or title in one merge.
     """
 
-    def __init__(self, orkg_df):
+    def __init__(self, orkg_df, relabel_csv_path=RELABEL_CSV_PATH):
         self.orkg_df = orkg_df
+        self.relabel_csv_path = relabel_csv_path
 
     def run(self) -> pd.DataFrame:
         """
@@ -19,90 +28,81 @@ class ScienceLabelConverter:
         :return: dataframe with converted science labels
         """
         self.orkg_df = self._convert_science_labels()
-        self.export_science_labels(self.orkg_df)
-        self.orkg_df = self.relabel_science_manual(self.orkg_df)
+        self._export_science_labels()
+        self.orkg_df = self._relabel_science_manual(self.orkg_df, self.relabel_csv_path)
         return self.orkg_df
 
     def _convert_science_labels(self) -> pd.DataFrame:
         """
         converts 'Science' labels in orkg data to the appropriate label from crossref and semantic scholar
-        according to mapping files
+        according to mapping files. The primary (first) research field of an api decides first, crossref before
+        semantic scholar; the further research fields reported by the apis (in the same order) are only used for
+        papers whose primary fields have no mapping.
 
         :return: dataframe converted Science labels
         """
-        # load df only with science labels
-        science_df = self.orkg_df.query('label == "Science"')
-        science_df['crossref_field'] = science_df['crossref_field'].apply(lambda x: ast.literal_eval(x))
-
-        # load crossref -> orkg mappings
-        crossref_path = 'data_processing/data/mappings/research_field_mapping_crossref_field.json'
-        with open(crossref_path, 'r') as infile:
-            cross_ref_mappings = json.load(infile)
-
-        for index, row in science_df.iterrows():
-            crossref_field = row['crossref_field']
-            # if crossref_field is not an empty dict
-            if bool(crossref_field):
-                if len(crossref_field['crossref_field'][0]) > 0:
-                    label = crossref_field['crossref_field'][0][0]
-
-                    if label in cross_ref_mappings.keys():
-                        self.orkg_df.at[index, 'label'] = cross_ref_mappings[label]
-
-        science_df = df.query('label == "Science"')
-        science_df['semantic_field'] = science_df['semantic_field'].apply(lambda x: ast.literal_eval(x))
-
-        semanticschol_path = 'data_processing/data/mappings/research_field_mapping_semantic_field.json'
-        with open(semanticschol_path, 'r') as infile:
-            semanticschol_mappings = json.load(infile)
-
-        for index, row in science_df.iterrows():
-            semantic_field = row['semantic_field']
-            if bool(semantic_field):
-                if semantic_field['semantic_field'] is not None:
-                    if len(semantic_field['semantic_field']) > 0:
-                        label = semantic_field['semantic_field'][0]
-
-                        if label in semanticschol_mappings.keys():
-                            self.orkg_df.at[index, 'label'] = semanticschol_mappings[label]
-
+        labels = self.orkg_df['label'].astype(object).to_numpy(copy=True)
+        science = labels == 'Science'
+        science_df = self.orkg_df[science]
+
+        candidates = []
+        for order, source in enumerate(['crossref', 'semantic']):
+            fields = split_list_column(science_df[f'{source}_field'])
+            fields['label'] = map_labels(fields['value'], load_mapping(f'research_field_mapping_{source}_field.json'),
+                                         keep_unmapped=False).astype(object).to_numpy()
+            fields['priority'] = list(zip(fields['rank'] > 0, [order] * len(fields), fields['rank']))
+            candidates.append(fields.dropna(subset=['label']))
+        candidates = pd.concat(candidates).sort_values('priority', kind='stable').drop_duplicates('position')
+
+        # positional assignment, the index of orkg_df is not guaranteed to be unique
+        positions = np.flatnonzero(science)[candidates['position'].to_numpy(dtype=int)]
+        labels[positions] = candidates['label'].to_numpy()
+
+        self.orkg_df['label'] = pd.Categorical(labels)
         return self.orkg_df
 
     def _export_science_labels(self, export_path="data_processing/data/science_labels.csv") -> None:
         """
         Exports science labels to .csv in preparation for manual re-labelling.
-        :parameter orkg_df: dataframe with science labels
         :parameter export_path: path to export the science labels to
         """
-        science_df = self.orkg_df.query('label == "Science"')
+        science_df = self.orkg_df[self.orkg_df['label'] == 'Science']
         science_df.to_csv(export_path, index=False)
 
     def _relabel_science_manual(self, orkg_df,
-                               csv_path="data_processing/data/merged_data_relabeling_science.csv") \
+                                csv_path=RELABEL_CSV_PATH) \
             -> pd.DataFrame:
         """
         relabels the remaining 'Science' labels manually by:
-        1. Importing the relabeled file in .xlsx format; in which nee labels are added in the 'new_label' column.
-        2. Merging the relabeled dataframe with the original dataframe.
-        :return:
+        1. Importing the relabeled file, in which new labels are added in the 'new_label' column.
+        2. Joining the relabeled table with the original dataframe on the normalized doi (if the relabeled file has
+           a 'doi' column) or title. A doi match takes precedence over a title match.
+        :return: dataframe with the manually relabeled labels
 
         """
-        science_relabeled_df = pd.csv(csv_path)
-        orkg_df['label'] = [self._get_new_label(row, science_relabeled_df) for index, row in
-                            orkg_df.iterrows()]
+        science_relabeled_df = pd.read_csv(csv_path)
+
+        # relabel table: one row per key, keys are prefixed with their type so dois and titles can share one index
+        relabel_keys = [('title:' + normalize_titles(science_relabeled_df['title'])).rename('key')]
+        if 'doi' in science_relabeled_df:
+            relabel_keys.insert(0, ('doi:' + normalize_dois(science_relabeled_df['doi'])).rename('key'))
+        relabel_df = pd.concat([pd.concat([key, science_relabeled_df['new_label']], axis=1) for key in relabel_keys])
+        relabel_df = relabel_df.dropna().drop_duplicates('key').set_index('key')
+
+        # orkg keys in long format: (row position, key, priority)
+        positions = pd.RangeIndex(len(orkg_df))
+        orkg_keys = pd.concat([
+            pd.DataFrame({'position': positions, 'key': ('doi:' + normalize_dois(orkg_df['doi'])).values,
+                          'priority': 0}),
+            pd.DataFrame({'position': positions, 'key': ('title:' + normalize_titles(orkg_df['title'])).values,
+                          'priority': 1})
+        ]).dropna()
+
+        matches = orkg_keys.merge(relabel_df, left_on='key', right_index=True, how='inner')
+        matches = matches.sort_values('priority').drop_duplicates('position').set_index('position')['new_label']
+
+        labels = pd.Series(orkg_df['label'].astype(object).values, index=positions)
+        labels.update(matches)
+        orkg_df['label'] = pd.Categorical(labels.values)
 
         return orkg_df
-
-    def _get_new_label(self, row, science_relabeled_df) -> str:
-        """
-        get the new label of a row originally tagged as 'Science'
-        :param row: row in the original dataframe
-        :param science_relabeled_df: dataframe with the manually relabeled science labels
-        :return: new label
-        """
-        title = row['title']
-        label = row['label']
-        if title in science_relabeled_df['title'].values:
-            label = science_relabeled_df[science_relabeled_df['title'] == title]['new_label']
-            return label.values[0]
-        return label
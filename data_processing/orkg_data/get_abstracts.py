@@ -1,12 +1,29 @@
 import pandas as pd
 import numpy as np
+from typing import Callable, Dict
 
 from additional_api_data.api_data import APIData
+from additional_api_data.api_fields import to_api_frame
+from additional_api_data.enrichment_journal import EnrichmentJournal, DEFAULT_JOURNAL_PATH, row_key
+from data_cleaning_utils import english_mask, get_orkg_abstract_doi, get_orkg_abstract_title, is_english, \
+    non_english_mask, process_abstract
+from instrumentation import record_cache, record_pushdown
+
+# minimum probability of a non-English title for skipping the lookups of a paper without abstract
+TITLE_MIN_PROBABILITY = 0.9
 
 
 class DataAbstracts:
-    def __init__(self, orkg_df: pd.DataFrame):
+    def __init__(self, orkg_df: pd.DataFrame, journal_path: str = DEFAULT_JOURNAL_PATH, push_down: bool = True):
+        """
+        :param orkg_df: ORKG data
+        :param journal_path: path of the journal of the API lookups (see EnrichmentJournal)
+        :param push_down: skip the API lookups of papers that are removed by the language filter anyway
+            (see _rows_to_enrich)
+        """
         self.orkg_df = orkg_df
+        self.journal_path = journal_path
+        self.push_down = push_down
 
     def run(self) -> pd.DataFrame:
         """
@@ -19,46 +36,114 @@ class DataAbstracts:
 
     def _get_abstracts_from_apis(self) -> pd.DataFrame:
         """
-        Get abstracts from crossref and semantic scholar (s2ag) using the APIData class
+        Get abstracts from crossref, semantic scholar (s2ag) and openalex using the APIData class.
+        The api data is stored in typed flat columns (see additional_api_data.api_fields). An abstract that the paper
+        already has is kept; missing abstracts are filled in the order crossref, semantic scholar, openalex. (The
+        original code overwrote the abstract column with the crossref abstract; this only differs for papers that have
+        an abstract before this stage, which the ORKG loader never provides, and keeps existing abstracts final for
+        the language push-down of _rows_to_enrich.)
+        Every successful lookup is journaled as soon as it returns, lookups found in the journal of an earlier (crashed)
+        run are not sent again. Failed lookups (rate limits, server errors, papers not found) are not journaled and are
+        retried by the next run.
+        Papers excluded by _rows_to_enrich are not looked up, their api columns stay empty; 'Science' papers among them
+        are still looked up in crossref and semantic scholar, whose research fields ScienceLabelConverter needs.
         :return: dataframe with added abstracts
         """
         api_data = APIData(self.orkg_df)
-        self.orkg_df['crossref_field'] = [api_data.get_crossref_data(row['doi'], index)
-                                          for index, row in self.orkg_df.iterrows()]
-        self.orkg_df['abstract'] = [ab['abstract'] if ab != {} else {} for ab in self.orkg_df['crossref_field']]
-
-        self.orkg_df['semantic_field'] = [api_data.get_s2ag_data(row['doi'], index)
-                                          for index, row in self.orkg_df.iterrows()]
-
-        # make all non-existent abstract cells NaN
-        self.orkg_df.loc[self.orkg_df['abstract'] == '{}', 'abstract'] = np.NaN
-
-        # make all rows of semantic field a dict
-        self.orkg_df['semantic_field'] = self.orkg_df['semantic_field'].apply(lambda x: ast.literal_eval(x))
-
-        # iterate and add abstracts if they exist in semantic scholar data
-        for index, row in self.orkg_df.iterrows():
-            sem_field = row['semantic_field']
-
-        if pd.isnull(row['abstract']):
-            if bool(sem_field):
-                self.orkg_df.at[index, 'abstract'] = sem_field['abstract']
-
-        self.orkg_df['openalex_field'] = [api_data.get_openalex_data('https://doi.org/' + row['doi'], index)
-                                          if not pd.isnull(row['doi']) else np.NaN
-                                          for index, row in self.orkg_df.iterrows()]
+        index = self.orkg_df.index
+        enrich = self._rows_to_enrich()
+        enrich_fields = enrich | self._science_rows()
+        keys = [row_key(doi, title, author) for doi, title, author in
+                zip(self.orkg_df['doi'], self.orkg_df['title'], self.orkg_df['author'])]
+        rows = list(zip(keys, index, self.orkg_df['doi'], enrich, enrich_fields))
+
+        with EnrichmentJournal(self.journal_path) as journal:
+            crossref_data = [self._journaled(journal, key, 'crossref', lambda: api_data.get_crossref_data(doi, idx))
+                             if fields else {} for key, idx, doi, keep, fields in rows]
+            semantic_data = [self._journaled(journal, key, 'semantic', lambda: api_data.get_s2ag_data(doi, idx))
+                             if fields else {} for key, idx, doi, keep, fields in rows]
+            openalex_data = [self._journaled(journal, key, 'openalex',
+                                             lambda: api_data.get_openalex_data('https://doi.org/' + doi))
+                             if keep and isinstance(doi, str) and doi else {} for key, idx, doi, keep, fields in rows]
+
+        api_frames = [to_api_frame(crossref_data, 'crossref', index), to_api_frame(semantic_data, 'semantic', index),
+                      to_api_frame(openalex_data, 'openalex', index)]
+        api_column_names = [column for frame in api_frames for column in frame.columns]
+        self.orkg_df = pd.concat([self.orkg_df.drop(columns=api_column_names, errors='ignore')] + api_frames, axis=1)
+
+        # fill non-existent abstracts
+        self.orkg_df['abstract'] = self.orkg_df['abstract'].replace('', np.NaN) \
+            .fillna(self.orkg_df['crossref_abstract']) \
+            .fillna(self.orkg_df['semantic_abstract']) \
+            .fillna(self.orkg_df['openalex_abstract'])
 
-        # make all non-existent abstract cells NaN
-        self.orkg_df.loc[self.orkg_df['abstract'] == '{}', 'abstract'] = np.NaN
+        return self.orkg_df
 
-        # make all rows of openalex field a dict
-        self.orkg_df['openalex_field'] = self.orkg_df['openalex_field'].apply(lambda x: ast.literal_eval(x))
+    def _rows_to_enrich(self) -> pd.Series:
+        """
+        Pushes the language filter of the merged dataset (remove_non_english) ahead of the API lookups.
+        The filter runs on title and processed abstract. For papers that already have an abstract, neither changes
+        after this stage (the APIs, ORKG Abstracts and arXiv only fill missing abstracts), so the filter decision is
+        known now: non-English papers are removed at the end anyway and need no lookups ('language').
+        The ORKG loader provides no abstracts, so for most papers only the title is known. Papers without abstract
+        are skipped if their title is not English with a probability of at least TITLE_MIN_PROBABILITY
+        ('language_title'). This is an approximation: a paper with a non-English title and an English abstract from
+        the APIs would have passed the final filter, but stays without abstract and is removed.
+        Duplicates are already removed before this stage (ORKGDataCleaner).
+        The push-down only concerns the abstracts: the research fields of 'Science' papers are looked up regardless,
+        since ScienceLabelConverter converts (and exports) the labels of all of them before the language filter.
+        :return: boolean column, True for papers whose abstracts are looked up
+        """
+        enrich = pd.Series(True, index=self.orkg_df.index)
+        if not self.push_down:
+            return enrich
+
+        abstracts = self.orkg_df['abstract']
+        known = (abstracts.notna() & (abstracts != '')).to_numpy()
+        if known.any():
+            enrich[known] = english_mask(self.orkg_df['title'][known],
+                                         abstracts[known].apply(process_abstract)).to_numpy()
+        if (~known).any():
+            enrich[~known] = ~non_english_mask(self.orkg_df['title'][~known], TITLE_MIN_PROBABILITY).to_numpy()
+
+        for name, rows in [('language', known), ('language_title', ~known)]:
+            skipped = rows & ~enrich.to_numpy()
+            calls_avoided = self._calls_avoided(skipped)
+            record_pushdown(name, int(skipped.sum()), calls_avoided)
+            print(f"Language filter ({name}) pushed down: {int(skipped.sum())} non-English papers not enriched, "
+                  f"{calls_avoided} API calls avoided")
+        return enrich
+
+    def _calls_avoided(self, skipped: np.ndarray) -> int:
+        """
+        One crossref and one semantic scholar request per skipped paper that is not 'Science' (see
+        _get_abstracts_from_apis), one openalex request per skipped paper with doi (the semantic scholar scraping of
+        papers without doi is not counted).
+        :param skipped: boolean array, True for skipped papers
+        """
+        has_doi = self.orkg_df['doi'].apply(lambda doi: isinstance(doi, str) and doi != '').to_numpy()
+        return 2 * int((skipped & ~self._science_rows().to_numpy()).sum()) + int((skipped & has_doi).sum())
 
-        if pd.isnull(row['abstract']):
-            if bool(sem_field):
-                self.orkg_df.at[index, 'abstract'] = openalex_field['abstract']
+    def _science_rows(self) -> pd.Series:
+        """
+        :return: boolean column, True for papers labelled 'Science'
+        """
+        if 'label' not in self.orkg_df:
+            return pd.Series(False, index=self.orkg_df.index)
+        return (self.orkg_df['label'].astype(object) == 'Science').fillna(False)
 
-        return self.orkg_df
+    @staticmethod
+    def _journaled(journal: EnrichmentJournal, key: str, source: str, lookup: Callable[[], Dict]) -> Dict:
+        """
+        Returns the journaled result of a lookup or runs the lookup and journals its result if it found any data.
+        """
+        data = journal.get(key, source)
+        record_cache('enrichment_journal', data is not None)
+        if data is None:
+            data = lookup()
+            if isinstance(data, dict) and data:
+                journal.append(key, source, data)
+        return data
 
     def _get_abstracts_from_orkg(self) -> pd.DataFrame:
         """
@@ -1,6 +1,9 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from orkg_data.Strategy import Strategy
+from orkg_data.statement_store import StatementStore, DEFAULT_STORE_PATH
 from orkg import ORKG
+from instrumentation import track_request, record_retry, record_cache
+from api_config import api_url
 from requests.exceptions import ConnectionError
 import time
 import requests
@@ -10,12 +13,21 @@ import json
 class ORKGPyModule(Strategy):
     """
     Gets metadata of papers from the ORKG API.
+
+    In incremental mode, statements fetched in previous runs are kept in a local StatementStore. A sync then only
+    fetches the statements created since the last sync watermark and re-fetches the statements of the papers that
+    were touched by them. Note that the ORKG only reports created statements: label edits and deletions of
+    untouched papers are not visible, so a full sync (delete the store file) should be run from time to time.
     """
 
-    def __init__(self):
-        self.connector = ORKG(host="http://orkg.org/")
-        self.predicate_url = 'http://www.orkg.org/orkg/api/statements/predicate/'
-        self.subject_url = 'http://www.orkg.org/orkg/api/statements/subject/'
+    def __init__(self, incremental: bool = False, store_path: str = DEFAULT_STORE_PATH):
+        self.connector = ORKG(host=api_url('orkg'))
+        self.predicate_url = api_url('orkg') + '/api/statements/predicate/'
+        self.subject_url = api_url('orkg') + '/api/statements/subject/'
+        self.statements_url = api_url('orkg') + '/api/statements/'
+
+        self.incremental = incremental
+        self.store = StatementStore(store_path) if incremental else None
 
     def get_statement_by_predicate(self, predicate_id: str) -> Dict[str, List]:
         """
@@ -30,35 +42,25 @@ class ORKGPyModule(Strategy):
         -------
         Dict[str, list]
         """
-        statement_data = {'paper': [], 'label': []}  # initializing the dictionary that will then be returned by the
-        # function
-        size = 20  # the default size of the batch of data fetched from ORKG (bigger sizes can cause connection
-        # problems)
-        response = requests.get(self.predicate_url + predicate_id + '?size=20' + '&page=' + str(0))  # the first
-        # request, from which page_range will be obtained
-        pages_range = json.loads(response.content)['totalPages']  # the page range that will be used in the for loop
-        # to get all the statements
+        if not self.incremental:
+            statement_data = {'paper': [], 'label': []}
+            for statement in self._fetch_predicate_statements(predicate_id):
+                statement_data['paper'].append(statement['subject']['id'])
+                statement_data['label'].append(statement['object']['label'])
+            print('Ready')
+            return statement_data
 
-        for count in range(pages_range):
-            try:
-                response = requests.get(self.predicate_url + predicate_id + '?size=20' + '&page=' + str(count))
-
-            except ConnectionError:
-                time.sleep(60)
-                response = requests.get(self.predicate_url + predicate_id + '?size=20' + '&page=' + str(count))
-
-            if response.ok:
-                content = json.loads(response.content)['content']
-
-                for statement in content:
-                    statement_data['paper'].append(statement['subject']['id'])
-                    statement_data['label'].append(statement['object']['label'])
-
-                if len(content) < int(size):
-                    break
+        if self.store.is_empty or predicate_id not in self.store.predicates:
+            # full sync; the watermark is taken before fetching so that concurrent changes are picked up next time
+            watermark = self._get_latest_created_at()
+            self.store.set_predicate_statements(predicate_id, self._fetch_predicate_statements(predicate_id))
+            self.store.advance_watermark(watermark)
+        else:
+            self._sync_changes(predicate_id)
 
+        self.store.save()
         print('Ready')
-        return statement_data
+        return self.store.get_predicate_statements(predicate_id)
 
     def get_statement_by_subject(self, paper_ids: List, meta_ids: Dict) -> Dict[str, list]:
         """
@@ -86,33 +88,185 @@ class ORKGPyModule(Strategy):
 
         for paper_id in paper_ids:
 
+            if self.incremental:
+                record_cache('statement_store', paper_id in self.store.subjects)
+
+            if self.incremental and paper_id in self.store.subjects:
+                statements = self.store.subjects[paper_id]
+            else:
+                content = self._fetch_subject_statements(paper_id)
+                if content is None:
+                    continue
+                if self.incremental:
+                    self.store.set_subject_statements(paper_id, content)
+                statements = [{'predicate': statement['predicate']['id'],
+                               'object': statement['object']['label'],
+                               'subject': statement['subject']['label']} for statement in content]
+
+            infos = {key: [] for key in meta_ids.keys()}
+
+            for statement in statements:
+
+                pred_id = statement['predicate']
+                if pred_id in meta_ids.values():
+                    infos[look_up[pred_id]].append(statement['object'])
+
+                if not infos['title']:
+                    infos['title'].append(statement['subject'])
+
+            # build lists in meta info dict for every predicate field
+            for key, value in infos.items():
+                if len(value) == 0:
+                    value = ""
+
+                if len(value) == 1:
+                    value = value[0]
+
+                meta_infos[key].append(value)
+
+        if self.incremental:
+            self.store.save()
+
+        return meta_infos
+
+    def get_subfield_statements(self, predicate_id: str) -> Dict[str, list]:
+        """
+        Provides all edges of the research field hierarchy.
+
+        Parameters
+        ----------
+        predicate_id : str
+            ID of "has subfield"
+
+        Returns
+        -------
+        Dict[str, list]
+        """
+        statement_data = {'parent': [], 'child': []}
+        for statement in self._fetch_predicate_statements(predicate_id):
+            statement_data['parent'].append(statement['subject']['label'])
+            statement_data['child'].append(statement['object']['label'])
+        return statement_data
+
+    def _sync_changes(self, predicate_id: str) -> None:
+        """
+        Fetches all statements created at or after the watermark of the store (newest first) and re-fetches the
+        statements of every paper touched by them. Touched papers are papers already in the store and new papers
+        that got a statement with predicate_id.
+        Statements with the same 'created_at' as the watermark are fetched again, since statements created in the
+        same second may have been missed by the last sync; statements inserted while paging shift the pages, so a
+        statement can be returned twice. Both are handled by deduplicating on the statement id.
+
+        Parameters
+        ----------
+        predicate_id : str
+            ID of "has research field"
+        """
+        known_papers = {statement['paper'] for statement in self.store.predicates[predicate_id].values()}
+        touched_papers = set()
+        seen_statements = set()
+        newest = None
+        reached_watermark = False
+        page = 0
+
+        while not reached_watermark:
+            content = self._get_page(self.statements_url + '?size=100&sort=created_at,desc&page=' + str(page))
+            if not content:
+                break
+
+            for statement in content:
+                if StatementStore.is_newer(self.store.watermark, statement['created_at']):
+                    reached_watermark = True
+                    break
+                if statement['id'] in seen_statements:
+                    continue
+                seen_statements.add(statement['id'])
+
+                newest = newest or statement['created_at']
+                subject_id = statement['subject']['id']
+                if subject_id in known_papers or statement['predicate']['id'] == predicate_id:
+                    touched_papers.add(subject_id)
+
+            page += 1
+
+        for paper_id in touched_papers:
+            content = self._fetch_subject_statements(paper_id)
+            if content is not None:
+                self.store.set_subject_statements(paper_id, content)
+
+        self.store.advance_watermark(newest)
+        print(f'Synced {len(touched_papers)} touched papers since {self.store.watermark}')
+
+    def _fetch_predicate_statements(self, predicate_id: str) -> List[Dict]:
+        """
+        Fetches all statements of a predicate from the ORKG API.
+
+        Parameters
+        ----------
+        predicate_id : str
+
+        Returns
+        -------
+        List[Dict]
+        """
+        statements = []
+        size = 20  # the default size of the batch of data fetched from ORKG (bigger sizes can cause connection
+        # problems)
+        # the first request, from which page_range will be obtained
+        response = track_request('orkg', requests.get, self.predicate_url + predicate_id + '?size=20' + '&page=0')
+        pages_range = json.loads(response.content)['totalPages']  # the page range that will be used in the for loop
+        # to get all the statements
+
+        for count in range(pages_range):
+            page_url = self.predicate_url + predicate_id + '?size=20' + '&page=' + str(count)
             try:
-                response = self.connector.statements.get_by_subject(subject_id=paper_id, size=100, sort='id', desc=True)
+                response = track_request('orkg', requests.get, page_url)
+
             except ConnectionError:
+                record_retry('orkg')
                 time.sleep(60)
-                response = self.connector.statements.get_by_subject(subject_id=paper_id, size=100, sort='id', desc=True)
+                response = track_request('orkg', requests.get, page_url)
 
-            if response.succeeded:
-                content = response.content
-                infos = {key: [] for key in meta_ids.keys()}
+            if response.ok:
+                content = json.loads(response.content)['content']
+                statements.extend(content)
 
-                for statement in content:
+                if len(content) < int(size):
+                    break
 
-                    pred_id = statement['predicate']['id']
-                    if pred_id in meta_ids.values():
-                        infos[look_up[pred_id]].append(statement['object']['label'])
+        return statements
 
-                    if not infos['title']:
-                        infos['title'].append(statement['subject']['label'])
+    def _fetch_subject_statements(self, paper_id: str) -> Optional[List[Dict]]:
+        """
+        Fetches all statements of a paper from the ORKG API. Returns None if the request did not succeed.
+        """
+        try:
+            response = track_request('orkg', self.connector.statements.get_by_subject, subject_id=paper_id, size=100,
+                                     sort='id', desc=True)
+        except ConnectionError:
+            record_retry('orkg')
+            time.sleep(60)
+            response = track_request('orkg', self.connector.statements.get_by_subject, subject_id=paper_id, size=100,
+                                     sort='id', desc=True)
 
-                # build lists in meta info dict for every predicate field
-                for key, value in infos.items():
-                    if len(value) == 0:
-                        value = ""
+        if response.succeeded:
+            return response.content
+        return None
 
-                    if len(value) == 1:
-                        value = value[0]
+    def _get_latest_created_at(self) -> Optional[str]:
+        """ Provides the 'created_at' timestamp of the newest statement in the ORKG """
+        content = self._get_page(self.statements_url + '?size=1&sort=created_at,desc&page=0')
+        return content[0]['created_at'] if content else None
 
-                    meta_infos[key].append(value)
+    @staticmethod
+    def _get_page(url: str) -> List[Dict]:
+        try:
+            response = track_request('orkg', requests.get, url)
+        except ConnectionError:
+            record_retry('orkg')
+            time.sleep(60)
+            response = track_request('orkg', requests.get, url)
 
-        return meta_infos
+        if response.ok:
+            return json.loads(response.content)['content']
+        return []
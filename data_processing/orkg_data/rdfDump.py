@@ -88,6 +88,32 @@ class RDFDump(Strategy):
 
         return meta_infos
 
+    def get_subfield_statements(self, predicate_id: str) -> Dict[str, list]:
+        """
+        Provides all edges of the research field hierarchy from rdf dump.
+
+        Parameters
+        ----------
+        predicate_id : str
+            ID of "has subfield"
+
+        Returns
+        -------
+        Dict[str, list]
+        """
+        if not predicate_id.startswith('http'):
+            predicate_id = 'http://orkg.org/orkg/predicate/' + predicate_id
+        predicate = rdflib.URIRef(predicate_id)
+        statement_data = {'parent': [], 'child': []}
+
+        for sub, pred, obj in self.graph.triples((None, predicate, None)):
+            parent, child = self.id_to_string([sub]), self.id_to_string([obj])
+            if parent and child:
+                statement_data['parent'].append(parent[0])
+                statement_data['child'].append(child[0])
+
+        return statement_data
+
     def id_to_string(self, ids: List) -> List[str]:
         """
         maps all URIREFs to list of strings
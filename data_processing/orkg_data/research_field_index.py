@@ -0,0 +1,134 @@
+from typing import Dict, Iterable, List, Optional
+from collections import deque
+import hashlib
+import json
+import os
+
+from orkg_data.Strategy import Strategy
+from instrumentation import record_cache
+
+FILE_PATH = os.path.dirname(__file__)
+DEFAULT_CACHE_PATH = os.path.join(FILE_PATH, '../data/cache/rf_taxonomy_index.json')
+
+
+class ResearchFieldIndex:
+    """
+    Transitive ancestor closure of the ORKG research field hierarchy.
+
+    The hierarchy is read from the ORKG (API or rdfDump) via the given Strategy. The closure is cached on disk
+    together with the snapshot it was read for and a hash of the hierarchy edges. For a cached snapshot the hierarchy
+    is not read again; a new snapshot re-reads it and rebuilds the closure only if the edges changed.
+    """
+
+    def __init__(self, strategy: Strategy, predicate_id: str = 'P36', cache_path: str = DEFAULT_CACHE_PATH,
+                 snapshot: Optional[str] = None):
+        """
+        :param strategy: Strategy used to read the research field hierarchy
+        :param predicate_id: the id of the predicate 'has subfield' in ORKG
+        :param cache_path: path of the cached closure
+        :param snapshot: identifier of the ORKG state (e.g. the snapshot of ORKGData); None always re-reads the
+            hierarchy
+        """
+        self.cache_path = cache_path
+        self.snapshot = snapshot
+        cache = self._load_cache()
+
+        if snapshot is not None and cache.get('snapshot') == snapshot:
+            record_cache('rf_index', True)
+            self.hierarchy_hash = cache['hierarchy_hash']
+            self.ancestors = cache['ancestors']
+            return
+
+        edges = strategy.get_subfield_statements(predicate_id)
+        pairs = sorted(set(zip(edges['parent'], edges['child'])))
+        self.hierarchy_hash = hashlib.sha256(json.dumps(pairs).encode('utf-8')).hexdigest()
+        cached = cache.get('hierarchy_hash') == self.hierarchy_hash
+        record_cache('rf_index', cached)
+        self.ancestors = cache['ancestors'] if cached else self._build_closure(pairs)
+        self._save_cache()
+
+    def reduction_mapping(self, collapse_fields: Iterable[str], reduction: Dict[str, str],
+                          fallback_members: Optional[Dict[str, Iterable[str]]] = None) -> Dict[str, str]:
+        """
+        Builds a mapping from every field in the hierarchy to its reduced label:
+        1. A field below (or equal to) one of collapse_fields is mapped to the nearest of these fields.
+        2. The result is mapped with the flat reduction dict (e.g. rf_reduction.json).
+        Fields that are not part of the hierarchy are only mapped with the reduction dict.
+
+        :param collapse_fields: fields whose subfields are collapsed to the field itself
+        :param reduction: flat mapping of fields to reduced fields
+        :param fallback_members: {collapse field: its subfields}, used for collapse fields that are missing in the
+            hierarchy (e.g. a static list of subfields)
+        :return: {field: reduced field}
+        :raises ValueError: if a collapse field is neither in the hierarchy nor in fallback_members
+        """
+        collapse_fields = set(collapse_fields)
+        fallback_members = fallback_members or {}
+        mapping = dict(reduction)
+
+        for field, ancestors in self.ancestors.items():
+            label = next((item for item in [field] + ancestors if item in collapse_fields), field)
+            mapping[field] = reduction.get(label, label)
+
+        for field in sorted(collapse_fields - set(self.ancestors)):
+            if field not in fallback_members:
+                raise ValueError(f"Research field '{field}' is not in the ORKG research field hierarchy")
+            print(f"Research field '{field}' is not in the ORKG research field hierarchy, collapsing its "
+                  f"{len(fallback_members[field])} listed subfields instead")
+            for member in fallback_members[field]:
+                mapping[member] = reduction.get(field, field)
+
+        return mapping
+
+    def top_level_mapping(self, root: str = 'Research Field') -> Dict[str, str]:
+        """
+        Builds a mapping from every field in the hierarchy to its top-level class (the ancestor directly below root).
+
+        :param root: the label of the root of the hierarchy
+        :return: {field: top-level field}
+        """
+        mapping = {}
+        for field, ancestors in self.ancestors.items():
+            path = [field] + ancestors
+            if root in path and path.index(root) > 0:
+                mapping[field] = path[path.index(root) - 1]
+        return mapping
+
+    @staticmethod
+    def _build_closure(pairs: List) -> Dict[str, List[str]]:
+        """
+        Computes the ancestors of every field, ordered from the nearest to the most distant one.
+
+        :param pairs: (parent, child) edges of the hierarchy
+        :return: {field: [ancestors]}
+        """
+        parents = {}
+        for parent, child in pairs:
+            parents.setdefault(child, []).append(parent)
+            parents.setdefault(parent, [])
+
+        ancestors = {}
+        for field in parents:
+            seen = []
+            queue = deque(parents[field])
+            while queue:
+                parent = queue.popleft()
+                if parent in seen or parent == field:
+                    continue
+                seen.append(parent)
+                queue.extend(parents[parent])
+            ancestors[field] = seen
+
+        return ancestors
+
+    def _load_cache(self) -> Dict:
+        if not os.path.exists(self.cache_path):
+            return {}
+        with open(self.cache_path, 'r') as infile:
+            return json.load(infile)
+
+    def _save_cache(self) -> None:
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with open(self.cache_path, 'w') as outfile:
+            json.dump({'snapshot': self.snapshot, 'hierarchy_hash': self.hierarchy_hash, 'ancestors': self.ancestors},
+                      outfile)
@@ -0,0 +1,122 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+import json
+import os
+import re
+
+FILE_PATH = os.path.dirname(__file__)
+DEFAULT_STORE_PATH = os.path.join(FILE_PATH, '../data/orkg_store/statements.json')
+
+
+class StatementStore:
+    """
+    Local store of ORKG statements fetched by previous synchronisations.
+
+    Structure of the store file:
+        - watermark: 'created_at' timestamp of the newest statement seen in the last sync
+        - predicates: {predicate_id: {statement_id: {'paper': paper_id, 'label': object_label}}}
+        - subjects: {paper_id: [{'id', 'predicate', 'object', 'subject'}, ...]}
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self.watermark = None
+        self.predicates = {}
+        self.subjects = {}
+
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as infile:
+                data = json.load(infile)
+            self.watermark = data.get('watermark')
+            self.predicates = data.get('predicates', {})
+            self.subjects = data.get('subjects', {})
+
+    @property
+    def is_empty(self) -> bool:
+        """ True if no sync has been stored yet """
+        return self.watermark is None
+
+    def save(self) -> None:
+        """ Writes the store atomically to disk """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as outfile:
+            json.dump({'watermark': self.watermark, 'predicates': self.predicates, 'subjects': self.subjects},
+                      outfile)
+        os.replace(tmp_path, self.path)
+
+    def advance_watermark(self, created_at: Optional[str]) -> None:
+        """ Moves the watermark forward if created_at is newer than the current watermark """
+        if created_at and (self.watermark is None or self.is_newer(created_at, self.watermark)):
+            self.watermark = created_at
+
+    def set_predicate_statements(self, predicate_id: str, statements: List[Dict]) -> None:
+        """
+        Replaces all stored statements of a predicate.
+
+        Parameters
+        ----------
+        predicate_id : str
+        statements : List[Dict]
+            raw statements as returned by the ORKG API
+        """
+        self.predicates[predicate_id] = {}
+        for statement in statements:
+            self._add_predicate_statement(predicate_id, statement)
+
+    def set_subject_statements(self, paper_id: str, statements: List[Dict]) -> None:
+        """
+        Replaces all stored statements of a paper and reconciles the stored predicate statements of that paper
+        with the freshly fetched ones (this also removes statements that were deleted in the ORKG).
+
+        Parameters
+        ----------
+        paper_id : str
+        statements : List[Dict]
+            raw statements as returned by the ORKG API
+        """
+        # a statement returned twice (pages shifted by concurrent inserts) is stored once
+        statements = list({statement['id']: statement for statement in statements}.values())
+        self.subjects[paper_id] = [{'id': statement['id'],
+                                    'predicate': statement['predicate']['id'],
+                                    'object': statement['object']['label'],
+                                    'subject': statement['subject']['label']} for statement in statements]
+
+        for predicate_id, predicate_statements in self.predicates.items():
+            for statement_id in [key for key, value in predicate_statements.items() if value['paper'] == paper_id]:
+                del predicate_statements[statement_id]
+            for statement in statements:
+                if statement['predicate']['id'] == predicate_id:
+                    self._add_predicate_statement(predicate_id, statement)
+
+    def get_predicate_statements(self, predicate_id: str) -> Dict[str, list]:
+        """
+        Provides the stored statements of a predicate in the format of Strategy.get_statement_by_predicate.
+
+        Returns
+        -------
+        Dict[str, list]
+        """
+        statement_data = {'paper': [], 'label': []}
+        for statement in self.predicates.get(predicate_id, {}).values():
+            statement_data['paper'].append(statement['paper'])
+            statement_data['label'].append(statement['label'])
+        return statement_data
+
+    def _add_predicate_statement(self, predicate_id: str, statement: Dict) -> None:
+        self.predicates.setdefault(predicate_id, {})[statement['id']] = {
+            'paper': statement['subject']['id'],
+            'label': statement['object']['label']
+        }
+
+    @staticmethod
+    def is_newer(created_at: str, other: str) -> bool:
+        """ Compares two ORKG 'created_at' timestamps """
+        return StatementStore._parse_timestamp(created_at) > StatementStore._parse_timestamp(other)
+
+    @staticmethod
+    def _parse_timestamp(created_at: str) -> datetime:
+        # the API drops trailing zeros of the fraction, which datetime.fromisoformat does not accept before 3.11
+        created_at = created_at.replace('Z', '+00:00')
+        return datetime.fromisoformat(re.sub(r'\.(\d+)', lambda match: '.' + match.group(1)[:6].ljust(6, '0'),
+                                             created_at))
@@ -0,0 +1,169 @@
+import argparse
+import os
+
+import pandas as pd
+
+import instrumentation
+from arxiv_index import ArxivIndex
+from checkpoint import DEFAULT_CHECKPOINT_DIR, file_key
+from data_cleaning_utils import remove_non_english
+from label_mapping import MAPPINGS_DIR, load_mapping, map_labels
+from pipeline_dag import DAGExecutor, Stage
+from storage import write_dataset
+from process_arxiv_data import load_arxiv_snapshot, find_orkg_duplicates, add_arxiv_abstracts
+from process_merged_data import MergedData, merge_datasets
+from process_orkg_data import ORKGData, ARTS_HUMANITIES_CSV_PATH
+from reduce_arxiv_data import ArxivDataReduction
+from orkg_data.clean_data import ORKGDataCleaner
+from orkg_data.convert_science_label import ScienceLabelConverter, RELABEL_CSV_PATH
+from orkg_data.get_abstracts import DataAbstracts
+from additional_api_data.enrichment_journal import EnrichmentJournal, journal_path
+
+ARXIV_MAPPING = 'arxiv_to_orkg_fields.json'
+
+
+def orkg_fetch(snapshot: str, incremental: bool = False) -> pd.DataFrame:
+    """ loads the raw ORKG data (snapshot only identifies the ORKG state in the stage key) """
+    orkg_data = ORKGData(snapshot, incremental=incremental)
+    orkg_data._load_label_data()
+    return orkg_data.orkg_df
+
+
+def orkg_clean(orkg_df: pd.DataFrame) -> pd.DataFrame:
+    return ORKGDataCleaner(orkg_df).run()
+
+
+def orkg_abstracts(orkg_df: pd.DataFrame, snapshot: str) -> pd.DataFrame:
+    """ adds abstracts from the APIs, journaled per snapshot (see EnrichmentJournal) """
+    return DataAbstracts(orkg_df, journal_path(snapshot)).run()
+
+
+def orkg_science_labels(orkg_df: pd.DataFrame) -> pd.DataFrame:
+    """ converts 'Science' labels with the research fields of the APIs """
+    return ScienceLabelConverter(orkg_df)._convert_science_labels()
+
+
+def orkg_labels(orkg_df: pd.DataFrame, snapshot: str) -> pd.DataFrame:
+    """
+    applies the manual re-labeling of the remaining 'Science' labels and reduces the research fields (snapshot
+    identifies the research field hierarchy)
+    """
+    orkg_data = ORKGData(snapshot)
+    orkg_data.orkg_df = ScienceLabelConverter(orkg_df)._relabel_science_manual(orkg_df)
+    return orkg_data._reduce_rf()
+
+
+def arxiv_load(arxiv_data_path: str, fingerprint: str) -> pd.DataFrame:
+    """ loads the arXiv snapshot (fingerprint identifies the snapshot file in the stage key) """
+    return load_arxiv_snapshot(arxiv_data_path)
+
+
+def arxiv_sample(arxiv_df: pd.DataFrame, orkg_df: pd.DataFrame, threshold_instances: int) -> pd.DataFrame:
+    """ drops the arXiv papers that exist in ORKG and samples the remaining ones (as ArxivData.run) """
+    arxiv_df = arxiv_df[~find_orkg_duplicates(arxiv_df, orkg_df)]
+    arxiv_labels = list(load_mapping(ARXIV_MAPPING).keys())
+    return ArxivDataReduction(arxiv_df, arxiv_labels, {}, {}).get_reduced_data(threshold_instances)
+
+
+def arxiv_map(arxiv_df: pd.DataFrame) -> pd.DataFrame:
+    arxiv_df['categories'] = map_labels(arxiv_df['categories'], load_mapping(ARXIV_MAPPING))
+    return arxiv_df
+
+
+def arxiv_doi_abstracts(orkg_df: pd.DataFrame, arxiv_data_path: str, fingerprint: str) -> pd.DataFrame:
+    """
+    the dois and abstracts of the arXiv papers that exist in ORKG, used to add missing abstracts to ORKG papers;
+    looked up in the arXiv index instead of the loaded snapshot (fingerprint identifies the snapshot in the stage key)
+    """
+    orkg_dois = orkg_df['doi'][orkg_df['doi'].notna() & (orkg_df['doi'] != '')].astype(str)
+    with ArxivIndex(arxiv_data_path) as index:
+        arxiv_orkg_data = index.get_many(orkg_dois, 'doi')
+    return arxiv_orkg_data.reindex(columns=['doi', 'abstract'])
+
+
+def join(orkg_df: pd.DataFrame, arxiv_df: pd.DataFrame, doi_abstracts: pd.DataFrame) -> pd.DataFrame:
+    """ adds missing abstracts to ORKG papers and merges them with the sampled arXiv papers """
+    orkg_df = add_arxiv_abstracts(orkg_df, doi_abstracts[find_orkg_duplicates(doi_abstracts, orkg_df)])
+    return merge_datasets(orkg_df, arxiv_df)
+
+
+def merged_abstracts(merged_df: pd.DataFrame) -> pd.DataFrame:
+    return MergedData._process_abstracts(merged_df)
+
+
+def language_filter(merged_df: pd.DataFrame) -> pd.DataFrame:
+    return remove_non_english(merged_df)
+
+
+def build_stages(arxiv_data_path: str, snapshot: str, threshold_instances: int = 50000, incremental: bool = False):
+    """
+    Builds the stages of the pipeline DAG:
+
+        orkg_fetch -> orkg_clean -> orkg_abstracts -> orkg_science_labels -> orkg_labels
+        arxiv_load + orkg_labels -> arxiv_sample -> arxiv_map
+        orkg_labels -> arxiv_doi_abstracts
+        orkg_labels + arxiv_map + arxiv_doi_abstracts -> join -> merged_abstracts -> language_filter
+
+    The ORKG branch (network bound) and the loading of the arXiv snapshot (CPU/disk bound) run concurrently in
+    separate processes (see DAGExecutor). As in ArxivData.run, the arXiv papers that exist in ORKG are dropped before
+    sampling, so arxiv_sample waits for the ORKG dois. The code version of every stage is its function and the code it
+    reaches (see code_closure).
+
+    :param arxiv_data_path: path of the arXiv snapshot
+    :param snapshot: identifier of the ORKG state (see ORKGData)
+    :param threshold_instances: number of sampled arXiv papers
+    :param incremental: incremental ORKG sync (see ORKGPyModule)
+    """
+    return [
+        Stage('orkg_fetch', orkg_fetch, params={'snapshot': snapshot, 'incremental': incremental}),
+        Stage('orkg_clean', orkg_clean, ['orkg_fetch']),
+        Stage('orkg_abstracts', orkg_abstracts, ['orkg_clean'], params={'snapshot': snapshot}),
+        Stage('orkg_science_labels', orkg_science_labels, ['orkg_abstracts'],
+              files=[os.path.join(MAPPINGS_DIR, 'research_field_mapping_crossref_field.json'),
+                     os.path.join(MAPPINGS_DIR, 'research_field_mapping_semantic_field.json')]),
+        Stage('orkg_labels', orkg_labels, ['orkg_science_labels'],
+              files=[os.path.join(MAPPINGS_DIR, 'rf_reduction.json'), RELABEL_CSV_PATH, ARTS_HUMANITIES_CSV_PATH],
+              params={'snapshot': snapshot}),
+        Stage('arxiv_load', arxiv_load,
+              params={'arxiv_data_path': arxiv_data_path, 'fingerprint': file_key(arxiv_data_path)}),
+        Stage('arxiv_sample', arxiv_sample, ['arxiv_load', 'orkg_labels'],
+              files=[os.path.join(MAPPINGS_DIR, ARXIV_MAPPING)], params={'threshold_instances': threshold_instances}),
+        Stage('arxiv_map', arxiv_map, ['arxiv_sample'], files=[os.path.join(MAPPINGS_DIR, ARXIV_MAPPING)]),
+        Stage('arxiv_doi_abstracts', arxiv_doi_abstracts, ['orkg_labels'],
+              params={'arxiv_data_path': arxiv_data_path, 'fingerprint': file_key(arxiv_data_path)}),
+        Stage('join', join, ['orkg_labels', 'arxiv_map', 'arxiv_doi_abstracts']),
+        Stage('merged_abstracts', merged_abstracts, ['join']),
+        Stage('language_filter', language_filter, ['merged_abstracts']),
+    ]
+
+
+def run_pipeline(snapshot: str, arxiv_data_path: str = "~/Documents/test.nosync/arxiv-metadata-oai-snapshot.json",
+                 threshold_instances: int = 50000, checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR,
+                 max_workers: int = 2, incremental: bool = False) -> pd.DataFrame:
+    """
+    Runs the whole pipeline with the DAGExecutor and returns the merged dataset.
+
+    :param snapshot: identifier of the ORKG state (see ORKGData)
+    """
+    arxiv_data_path = os.path.expanduser(arxiv_data_path)
+    stages = build_stages(arxiv_data_path, snapshot, threshold_instances, incremental)
+    executor = DAGExecutor(stages, checkpoint_dir, max_workers)
+    merged_df = executor.run('language_filter')
+    # the export for the manual re-labeling is not checkpointed, it is written on every run (also on cache hits)
+    ScienceLabelConverter(executor.run('orkg_science_labels'))._export_science_labels()
+    # all stages are checkpointed, the lookups of orkg_abstracts are not needed anymore
+    EnrichmentJournal.discard(journal_path(snapshot))
+    return merged_df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs the dataset construction pipeline as a stage DAG.')
+    parser.add_argument('--snapshot', required=True, help='identifier of the ORKG state, e.g. the date of the crawl')
+    parser.add_argument('--incremental', action='store_true', help='incremental ORKG sync (see ORKGPyModule)')
+    args = parser.parse_args()
+
+    merged_df = run_pipeline(args.snapshot, incremental=args.incremental)
+    write_dataset(merged_df, 'data_processing/data/merged_data.parquet')
+    merged_df.to_csv('data_processing/data/merged_data.csv')
+    print("Merged dataset saved to data_processing/data/merged_data.parquet and merged_data.csv")
+    instrumentation.finish_run('pipeline')
@@ -0,0 +1,199 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, List, Optional
+import os
+
+import pandas as pd
+
+import instrumentation
+from checkpoint import CheckpointStore, DEFAULT_CHECKPOINT_DIR
+
+
+class Stage:
+    """
+    A stage of the pipeline DAG.
+
+    func is called with the outputs of deps (in order) and returns a pd.DataFrame. It has to be a module level
+    function, since stages are executed in worker processes.
+    """
+
+    def __init__(self, name: str, func: Callable[..., pd.DataFrame], deps: Iterable[str] = (), code: Iterable = (),
+                 files: Iterable[str] = (), params: Optional[Dict] = None):
+        """
+        :param name: unique name of the stage
+        :param func: function computing the output of the stage
+        :param deps: names of the stages whose outputs are the arguments of func
+        :param code: helper functions, methods or classes that make up the code version of the stage together with
+            func (see CheckpointStore)
+        :param files: files read by the stage
+        :param params: json serializable parameters; keyword arguments of func and part of the stage key
+        """
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.code = list(code)
+        self.files = list(files)
+        self.params = params or {}
+
+
+class DAGExecutor:
+    """
+    Runs a DAG of stages with independent branches in parallel processes.
+
+    The DAG is split into branches: a stage without deps or with several deps (a join) starts a new branch, a stage
+    with exactly one dep belongs to the branch of that dep. All stages of a branch run in one worker process and pass
+    their outputs in memory. Outputs are checkpointed in the CheckpointStore, so a branch only receives the paths of
+    the checkpoints of its inputs and loads them, and stages whose key is unchanged are not recomputed.
+    The run reports of the workers are merged into the run report of the current process (see instrumentation).
+    """
+
+    def __init__(self, stages: List[Stage], checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR, max_workers: int = 2):
+        self.stages = {stage.name: stage for stage in stages}
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoints = CheckpointStore(checkpoint_dir)
+        self.max_workers = max_workers
+
+        self.order = self._topological_order()
+        self.keys = {}
+        for name in self.order:
+            stage = self.stages[name]
+            self.keys[name] = self.checkpoints.stage_key(name, [self.keys[dep] for dep in stage.deps],
+                                                         [stage.func] + stage.code, stage.files, stage.params)
+
+        self.branches = self._split_branches()
+
+    def run(self, target: str) -> pd.DataFrame:
+        """
+        Runs all stages needed for target and returns the output of target.
+
+        :param target: name of the final stage
+        :return: output of target
+        """
+        needed = self._needed_branches(target)
+        done = {}
+        running = {}
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            while len(done) < len(needed):
+                for branch_id in needed:
+                    if branch_id in done or branch_id in running:
+                        continue
+                    if all(dep in done for dep in self._branch_deps(branch_id)):
+                        running[branch_id] = pool.submit(_run_branch, self._branch_spec(branch_id, target),
+                                                         self.checkpoint_dir)
+
+                finished, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+                for branch_id, future in list(running.items()):
+                    if future in finished:
+                        _, report = future.result()
+                        instrumentation.get_report().merge(report)
+                        done[branch_id] = running.pop(branch_id)
+                        print(f"Finished branch '{branch_id}'...")
+
+        return self.checkpoints.read(self.checkpoints.path(target, self.keys[target]))
+
+    def _topological_order(self) -> List[str]:
+        order = []
+        visiting = set()
+
+        def visit(name):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle in pipeline DAG at stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _split_branches(self) -> Dict[str, str]:
+        """ maps every stage to the name of the first stage of its branch """
+        branches = {}
+        for name in self.order:
+            deps = self.stages[name].deps
+            branches[name] = branches[deps[0]] if len(deps) == 1 else name
+        return branches
+
+    def _branch_stages(self, branch_id: str) -> List[str]:
+        return [name for name in self.order if self.branches[name] == branch_id]
+
+    def _branch_deps(self, branch_id: str) -> List[str]:
+        return sorted({self.branches[dep] for name in self._branch_stages(branch_id)
+                       for dep in self.stages[name].deps if self.branches[dep] != branch_id})
+
+    def _needed_branches(self, target: str) -> List[str]:
+        needed = []
+
+        def visit(branch_id):
+            if branch_id in needed:
+                return
+            for dep in self._branch_deps(branch_id):
+                visit(dep)
+            needed.append(branch_id)
+
+        visit(self.branches[target])
+        return needed
+
+    def _branch_spec(self, branch_id: str, target: str) -> Dict:
+        """ everything a worker needs to run a branch (stages, keys and the stages it has to export) """
+        stage_names = self._branch_stages(branch_id)
+        exports = [name for name in stage_names
+                   if name == target or any(name in self.stages[other].deps and self.branches[other] != branch_id
+                                            for other in self.stages)]
+        external = {dep for name in stage_names for dep in self.stages[name].deps if self.branches[dep] != branch_id}
+        return {
+            'stages': [self.stages[name] for name in stage_names],
+            'keys': {name: self.keys[name] for name in stage_names + sorted(external)},
+            'exports': exports
+        }
+
+
+def _run_branch(spec: Dict, checkpoint_dir: str) -> (List[str], Dict):
+    """
+    Runs the stages of a branch in the current (worker) process. Only the stages needed for the exported outputs are
+    evaluated; stages with an existing checkpoint are loaded instead of recomputed.
+
+    :param spec: branch spec (see DAGExecutor._branch_spec)
+    :param checkpoint_dir: directory of the CheckpointStore
+    :return: paths of the exported checkpoints, run report of the branch
+    """
+    # worker processes are reused for several branches, every branch reports only its own measurements
+    report = instrumentation.reset_report()
+    checkpoints = CheckpointStore(checkpoint_dir)
+    stages = {stage.name: stage for stage in spec['stages']}
+    keys = spec['keys']
+    outputs = {}
+
+    def evaluate(name):
+        if name not in outputs:
+            path = checkpoints.path(name, keys[name])
+            if os.path.exists(path):
+                with report.stage(name) as record:
+                    record.cached = True
+                    outputs[name] = checkpoints.read(path)
+                    record.rows_out = len(outputs[name])
+                report.record_cache('checkpoints', True)
+            else:
+                stage = stages[name]
+                args = [evaluate(dep) for dep in stage.deps]
+                with report.stage(name, sum(len(arg) for arg in args) if args else None) as record:
+                    df = stage.func(*args, **stage.params)
+                    checkpoints.write(df, path)
+                    record.rows_out = len(df)
+                report.record_cache('checkpoints', False)
+                outputs[name] = df
+                print(f"Finished stage '{name}'...")
+        return outputs[name]
+
+    paths = []
+    for name in spec['exports']:
+        path = checkpoints.path(name, keys[name])
+        if os.path.exists(path):
+            report.record_cache('checkpoints', True)
+        else:
+            evaluate(name)
+        paths.append(path)
+    return paths, report.to_dict()
@@ -1,14 +1,49 @@
 import pandas as pd
-import json
+import argparse
 import os
-from typing import Dict
+from typing import Optional
 
+from arxiv_state import ArxivState, DEFAULT_STATE_DIR
 from reduce_arxiv_data import ArxivDataReduction
 from process_orkg_data import ORKGData
+from label_mapping import load_mapping, map_labels
+import instrumentation
+from checkpoint import CheckpointStore
+from storage import read_dataset, write_dataset
 
 FILE_PATH = os.path.dirname(__file__)
 
 
+def load_arxiv_snapshot(arxiv_data_path: str) -> pd.DataFrame:
+    """
+    Reads the arXiv snapshot (json lines).
+    :param arxiv_data_path: path of the snapshot
+    """
+    return pd.read_json(arxiv_data_path, lines=True)
+
+
+def find_orkg_duplicates(arxiv_df: pd.DataFrame, orkg_df: pd.DataFrame) -> pd.Series:
+    """
+    Marks the arXiv papers that already exist in the ORKG data (based on doi).
+    :return: boolean Series aligned with arxiv_df
+    """
+    orkg_dois = orkg_df['doi'][orkg_df['doi'].notna() & (orkg_df['doi'] != '')].astype(str)
+    return arxiv_df['doi'].isin(set(orkg_dois))
+
+
+def add_arxiv_abstracts(orkg_df: pd.DataFrame, arxiv_orkg_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fills the missing abstracts of ORKG papers with the abstracts of the same papers (same doi) in arXiv.
+    :param orkg_df: ORKG data
+    :param arxiv_orkg_data: arXiv papers (at least the columns 'doi' and 'abstract') that exist in the ORKG data
+    :return: ORKG data with added abstracts
+    """
+    arxiv_abstracts = arxiv_orkg_data.dropna(subset=['doi']).drop_duplicates('doi').set_index('doi')['abstract']
+    missing = orkg_df['abstract'].isna()
+    orkg_df.loc[missing, 'abstract'] = orkg_df.loc[missing, 'doi'].astype('string').map(arxiv_abstracts)
+    return orkg_df
+
+
 class ArxivData:
     """
     A class for processing arXiv data, taken from https://www.kaggle.com/datasets/Cornell-University/arxiv.
@@ -25,28 +60,54 @@ class ArxivData:
 
     This pipeline produces a processed DataFrame of single-label arXiv data (consisting of a  desired number of
     data points) with ORKG labels.
+
+    In incremental mode, the snapshot is not loaded. Instead, the ArxivState of the previous run is updated with the
+    records that are new or changed, and steps 2-4 read only the papers they need from the snapshot. The sample is
+    drawn with bottom-k hash sampling (see ArxivState.sample), so it differs from the random sample of the full mode,
+    but stays stable between weekly snapshots.
     """
 
     def __init__(self,
                  arxiv_data_path="~/Documents/test.nosync/arxiv-metadata-oai-snapshot.json",
                  orkg_data_df_path="",
-                 threshold_instances=50000):
+                 threshold_instances=50000,
+                 checkpoints: Optional[CheckpointStore] = None,
+                 incremental: bool = False,
+                 state_dir: str = DEFAULT_STATE_DIR,
+                 snapshot: Optional[str] = None):
+        """
+        :param incremental: update the ArxivState in state_dir instead of loading the whole snapshot
+        :param state_dir: directory of the ArxivState
+        :param snapshot: identifier of the ORKG state (see ORKGData), required unless orkg_data_df_path is given
+        """
         self.arxiv_data_path = arxiv_data_path
-        self.arxiv_df = pd.read_json(self.arxiv_data_path, lines=True)
+        self.incremental = incremental
         self.threshold_instances = threshold_instances
-        self.mapping_arxiv_orkg = self._load_mapping('data/mappings/arxiv_to_orkg_fields.json')
+        self.mapping_arxiv_orkg = load_mapping('arxiv_to_orkg_fields.json')
         self.arxiv_labels = list(self.mapping_arxiv_orkg.keys())
         self.arxiv_distribution = {}
         self.arxiv_distribution_reduced = {}
-        self.reduced_data = ArxivDataReduction(self.arxiv_df, self.arxiv_labels,
-                                               self.arxiv_distribution, self.arxiv_distribution_reduced)
-        print("Got arXiv data...")
+        if incremental:
+            self.arxiv_state = ArxivState(state_dir)
+            with instrumentation.stage('arxiv_update') as record:
+                stats = self.arxiv_state.update(self.arxiv_data_path)
+                record.rows_out = len(self.arxiv_state.records)
+                record.cached = stats['new'] + stats['changed'] + stats['removed'] == 0
+            self.arxiv_df = self.arxiv_state.records
+            self.arxiv_distribution = self.arxiv_state.single_label_distribution
+            print(f"Updated arXiv state: {stats['new']} new, {stats['changed']} changed, {stats['removed']} removed, "
+                  f"{stats['unchanged']} unchanged papers...")
+        else:
+            with instrumentation.stage('arxiv_load') as record:
+                self.arxiv_df = load_arxiv_snapshot(self.arxiv_data_path)
+                record.rows_out = len(self.arxiv_df)
+            print("Got arXiv data...")
 
-        # read orkg data from csv if path is given, if not, run ORKGData class
+        # read orkg data from a parquet (or legacy csv) file if path is given, if not, run ORKGData class
         if orkg_data_df_path != "":
-            self.orkg_df = pd.read_csv(orkg_data_df_path)
+            self.orkg_df = read_dataset(orkg_data_df_path)
         else:
-            orkg_data = ORKGData()
+            orkg_data = ORKGData(snapshot, checkpoints=checkpoints)
             self.orkg_df = orkg_data.run()
 
     def run(self) -> (pd.DataFrame, pd.DataFrame):
@@ -54,14 +115,47 @@ class ArxivData:
         A function that runs the whole pipeline of the ArxivData Class.
         It returns the ORKG data with added abstracts and the single-label arXiv data
         (consisting of a desired number of data points)
+        Every step is measured in the run report (see instrumentation).
         """
-        self.orkg_df, self.arxiv_df = self._drop_orkg_dups()
+        if self.incremental:
+            return self._run_incremental()
+
+        with instrumentation.stage('arxiv_drop_duplicates', len(self.arxiv_df)) as record:
+            self.orkg_df, self.arxiv_df = self._drop_orkg_dups()
+            record.rows_out = len(self.arxiv_df)
         print("Dropped duplicates from arXiv data...")
-        self.orkg_df = self._add_abstracts_orkg(self.arxiv_df)
+        with instrumentation.stage('arxiv_add_abstracts', len(self.orkg_df)) as record:
+            self.orkg_df = self._add_abstracts_orkg(self.arxiv_df)
+            record.rows_out = len(self.orkg_df)
+        print("Added missing abstracts...")
+        with instrumentation.stage('arxiv_sample', len(self.arxiv_df)) as record:
+            reduced_arxiv_data = self._get_reduced_data(self.threshold_instances)
+            record.rows_out = len(reduced_arxiv_data)
+        print(f"Sampled arXiv data to {self.threshold_instances} instances...")
+        with instrumentation.stage('arxiv_map', len(reduced_arxiv_data)) as record:
+            reduced_arxiv_data = self._map_arxiv_to_orkg(reduced_arxiv_data)
+            record.rows_out = len(reduced_arxiv_data)
+        print("Changed arXiv labels to ORKG taxonomy...")
+        print("Processed arXiv dataset...")
+
+        return self.orkg_df, reduced_arxiv_data
+
+    def _run_incremental(self) -> (pd.DataFrame, pd.DataFrame):
+        """
+        run() on the ArxivState: only the arXiv papers that exist in ORKG and the sampled papers are read.
+        """
+        orkg_dois = self.orkg_df['doi'][self.orkg_df['doi'].notna() & (self.orkg_df['doi'] != '')].astype(str)
+        with instrumentation.stage('arxiv_add_abstracts', len(self.orkg_df)) as record:
+            self.orkg_df = self._add_abstracts_orkg(self.arxiv_state.get_many(orkg_dois))
+            record.rows_out = len(self.orkg_df)
         print("Added missing abstracts...")
-        reduced_arxiv_data = self._get_reduced_data(self.threshold_instances)
-        print(f"Sampled arXiv data to {len(self.threshold_instances)} instances...")
-        reduced_arxiv_data = self._map_arxiv_to_orkg(reduced_arxiv_data)
+        with instrumentation.stage('arxiv_sample', len(self.arxiv_state.records)) as record:
+            reduced_arxiv_data = self.arxiv_state.sample(self.threshold_instances, exclude_dois=orkg_dois)
+            record.rows_out = len(reduced_arxiv_data)
+        print(f"Sampled arXiv data to {self.threshold_instances} instances (without papers that exist in ORKG)...")
+        with instrumentation.stage('arxiv_map', len(reduced_arxiv_data)) as record:
+            reduced_arxiv_data = self._map_arxiv_to_orkg(reduced_arxiv_data)
+            record.rows_out = len(reduced_arxiv_data)
         print("Changed arXiv labels to ORKG taxonomy...")
         print("Processed arXiv dataset...")
 
@@ -73,11 +167,10 @@ class ArxivData:
         + updates the ORKG data with additional abstracts from Arxiv
         :return: 1. ORKG data with added abstracts, 2. Arxiv data with removed duplicates
         """
-        self.arxiv_df['in_orkg_data'] = [row['doi'] in self.orkg_df['doi'].values
-                                         for index, row in self.arxiv_df.iterrows()]
+        self.arxiv_df['in_orkg_data'] = find_orkg_duplicates(self.arxiv_df, self.orkg_df)
         # Dataframe with papers that exist in both ORKG and Arxiv
         arxiv_orkg_data = self.arxiv_df.query('in_orkg_data==True')
-        self.orkg_df = self.add_abstracts_orkg(arxiv_orkg_data)
+        self.orkg_df = self._add_abstracts_orkg(arxiv_orkg_data)
         self.arxiv_df = self.arxiv_df.query('in_orkg_data==False')
 
         return self.orkg_df, self.arxiv_df
@@ -88,43 +181,39 @@ class ArxivData:
         Crossref/Semantic Scholar
         :return: ORKG data with added abstracts
         """
-        for index, row in arxiv_orkg_data.iterrows():
-            if pd.isna(self.orkg_df[self.orkg_df['doi'] == row['doi']]['abstract'].values[0]):
-                idx = self.orkg_df[self.orkg_df['doi'] == row['doi']]['abstract'].index
-                self.orkg_df.at[idx[0], 'abstract'] = row['abstract']
-
+        self.orkg_df = add_arxiv_abstracts(self.orkg_df, arxiv_orkg_data)
         return self.orkg_df
 
     def _get_reduced_data(self, threshold_instances: int) -> pd.DataFrame:
         """
         A function that returns a DataFrame of single-label arXiv data (consisting of a desired number of data points)
-        Using the ArxivDataReduction class.
+        Using the ArxivDataReduction class. The sample is drawn from self.arxiv_df, i.e. without the papers that exist
+        in ORKG once _drop_orkg_dups has run.
         :param threshold_instances: the desired number of data points
         """
+        self.reduced_data = ArxivDataReduction(self.arxiv_df, self.arxiv_labels,
+                                               self.arxiv_distribution, self.arxiv_distribution_reduced)
         return self.reduced_data.get_reduced_data(threshold_instances)
 
-    @staticmethod
-    def _load_mapping(filename: str) -> Dict[str, str]:
-        """ load mapping dict with label mapping between arxiv and orkg labels """
-        json_path = os.path.join(FILE_PATH, filename)
-        with open(json_path, 'r') as jsonfile:
-            mapping = json.load(jsonfile)
-        return mapping
-
     def _map_arxiv_to_orkg(self, single_label_arxiv_reduced: pd.DataFrame) -> pd.DataFrame:
         """
         A function that maps the arXiv categories taxonomy to the ORKG research field taxonomy labels
         and saves the newly created dataset (with ORKG labels) as
-        'data_processing/data/arxiv_data/arxiv_reduced_orkg_labels.csv'
+        'data_processing/data/arxiv_data/arxiv_reduced_orkg_labels.parquet'
         :param single_label_arxiv_reduced: the arXiv single-label dataset after reducing its instances
         """
-        for index, row in single_label_arxiv_reduced.iterrows():
-            single_label_arxiv_reduced.at[index, 'categories'] = self.mapping_arxiv_orkg[row['categories']]
+        single_label_arxiv_reduced['categories'] = map_labels(single_label_arxiv_reduced['categories'],
+                                                             self.mapping_arxiv_orkg)
 
         return single_label_arxiv_reduced
 
 
 if __name__ == '__main__':
-    arxiv = ArxivData()
+    parser = argparse.ArgumentParser(description='Processes the arXiv data (and the ORKG data it is deduplicated with).')
+    parser.add_argument('--snapshot', required=True, help='identifier of the ORKG state, e.g. the date of the crawl')
+    args = parser.parse_args()
+
+    arxiv = ArxivData(snapshot=args.snapshot)
     orkg_df, arxiv_df = arxiv.run()
-    arxiv_df.to_csv('data_processing/data/arxiv_data/arxiv_reduced_orkg_labels.csv')
+    write_dataset(arxiv_df, 'data_processing/data/arxiv_data/arxiv_reduced_orkg_labels.parquet')
+    instrumentation.finish_run('arxiv')
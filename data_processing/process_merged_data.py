@@ -1,22 +1,56 @@
 import pandas as pd
+import argparse
 import matplotlib.pyplot as plt
+import instrumentation
 from data_cleaning_utils import process_abstract, remove_non_english
+from checkpoint import CheckpointStore, DEFAULT_CHECKPOINT_DIR, frame_key
+from storage import write_dataset
 
 from process_arxiv_data import ArxivData
 from process_orkg_data import ORKGData
 
 
+def merge_datasets(orkg_df: pd.DataFrame, arxiv_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Merges the arxiv and orkg datasets.
+    """
+    arxiv_df = arxiv_df.rename(columns=
+                               {"authors": "author",
+                                "categories": "label",
+                                "id": "arxiv_id",
+                                "submitter": "arxiv_submitter",
+                                "journal-ref": "publisher",
+                                "report-no": "arxiv_report-no",
+                                "license": "arxiv_license",
+                                "versions": "arxiv_versions",
+                                "update_date": "arxiv_update_date"})
+    arxiv_df = arxiv_df.drop(columns=["Unnamed: 0", "in_orkg_data", "multi_label"], errors='ignore')
+
+    arxiv_df['source'] = "arxiv"
+    orkg_df['source'] = "orkg"
+
+    merged_df = pd.concat([orkg_df, arxiv_df])
+    return merged_df
+
+
 class MergedData:
     """
     This class merges the arxiv and orkg datasets and processes the abstracts. It can also visualize the number of NaN
     elements per column in the merged dataset.
 
-    It saves the merged dataset to data_processing/data/merged_data.csv.
+    It saves the merged dataset to data_processing/data/merged_data.parquet and exports it as
+    data_processing/data/merged_data.csv.
     """
 
-    def __init__(self):
-        self.arxiv_data = ArxivData()
-        self.orkg_df, self.arxiv_df = arxiv_data.run()
+    def __init__(self, snapshot: str, checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR, incremental_arxiv: bool = False):
+        """
+        :param snapshot: identifier of the ORKG state (see ORKGData)
+        :param checkpoint_dir: directory of the checkpoints
+        :param incremental_arxiv: process the arXiv snapshot incrementally (see ArxivData)
+        """
+        self.checkpoints = CheckpointStore(checkpoint_dir)
+        self.arxiv_data = ArxivData(checkpoints=self.checkpoints, incremental=incremental_arxiv, snapshot=snapshot)
+        self.orkg_df, self.arxiv_df = self.arxiv_data.run()
 
     def run(self) -> None:
         """
@@ -25,40 +59,37 @@ class MergedData:
         - process_abstracts
         - remove_non_english
         - visualize_nan_columns
-        Saves the merged dataset to data_processing/data/merged_data.csv.
+        Every step is checkpointed and keyed by a fingerprint of the input datasets (see CheckpointStore).
+        At the end, the run report of all stages (ORKG, arXiv and merge) is saved and summarized (see instrumentation).
+        Saves the merged dataset to data_processing/data/merged_data.parquet and exports it as
+        data_processing/data/merged_data.csv.
         """
-        merged_df = self._merge_datasets()
+        inputs = [frame_key(self.orkg_df), frame_key(self.arxiv_df)]
+        key, merged_df = self.checkpoints.run_stage('merged_merge', self._merge_datasets, inputs,
+                                                    code=[MergedData._merge_datasets],
+                                                    rows_in=len(self.orkg_df) + len(self.arxiv_df))
         print("Merged dataset created...")
-        merged_df = self._process_abstracts(merged_df)
+        key, merged_df = self.checkpoints.run_stage('merged_abstracts', lambda: self._process_abstracts(merged_df),
+                                                    [key], code=[MergedData._process_abstracts],
+                                                    rows_in=len(merged_df))
         print("Preprocessed abstracts...")
-        merged_df = remove_non_english(merged_df)
+        key, merged_df = self.checkpoints.run_stage('merged_language', lambda: remove_non_english(merged_df), [key],
+                                                    code=[remove_non_english],
+                                                    rows_in=len(merged_df))
         print("Removed non-English papers...")
+        write_dataset(merged_df, 'data_processing/data/merged_data.parquet')
         merged_df.to_csv('data_processing/data/merged_data.csv')
-        print("Merged dataset saved to data_processing/data/merged_data.csv")
+        print("Merged dataset saved to data_processing/data/merged_data.parquet and merged_data.csv")
+        instrumentation.finish_run('merged')
 
     def _merge_datasets(self) -> pd.DataFrame:
         """
         Merges the arxiv and orkg datasets.
         """
-        self.arxiv_df = self.arxiv_df.rename(columns=
-                                             {"authors": "author",
-                                              "categories": "label",
-                                              "id": "arxiv_id",
-                                              "submitter": "arxiv_submitter",
-                                              "journal-ref": "publisher",
-                                              "report-no": "arxiv_report-no",
-                                              "license": "arxiv_license",
-                                              "versions": "arxiv_versions",
-                                              "update_date": "arxiv_update_date"})
-        self.arxiv_df = self.arxiv_df.drop(columns=["Unnamed: 0", "in_orkg_data", "multi_label"])
-
-        self.arxiv_df['source'] = "arxiv"
-        self.orkg_df['source'] = "orkg"
-
-        merged_df = pd.concat([self.orkg_df, self.arxiv_df])
-        return merged_df
+        return merge_datasets(self.orkg_df, self.arxiv_df)
 
-    def _process_abstracts(self, merged_df: pd.DataFrame) -> pd.DataFrame:
+    @staticmethod
+    def _process_abstracts(merged_df: pd.DataFrame) -> pd.DataFrame:
         """
         processes the abstract texts by removing code elements
         :param merged_df
@@ -69,8 +100,12 @@ class MergedData:
 
 
 if __name__ == '__main__':
-    #merged_data = MergedData()
+    parser = argparse.ArgumentParser(description='Builds the merged ORKG and arXiv dataset.')
+    parser.add_argument('--snapshot', required=True, help='identifier of the ORKG state, e.g. the date of the crawl')
+    args = parser.parse_args()
+
+    #merged_data = MergedData(args.snapshot)
     #merged_data.run()
 
-    orkg_data = ORKGData()
+    orkg_data = ORKGData(args.snapshot)
     orkg_data.run()
@@ -1,17 +1,30 @@
 import ast
 import csv
-import json
+import os
 import numpy as np
 import pandas as pd
-from typing import Dict
+from typing import Callable, Dict, List, Optional
 from orkg_data.Strategy import Strategy
 from orkg_data.orkgPyModule import ORKGPyModule
+from orkg_data.research_field_index import ResearchFieldIndex
 from data_cleaning_utils import process_abstract_string, get_orkg_abstract_doi, get_orkg_abstract_title
+from label_mapping import load_mapping, map_labels, MAPPINGS_DIR
+from checkpoint import CheckpointStore
 
 from orkg_data.clean_data import ORKGDataCleaner
 from orkg_data.convert_science_label import ScienceLabelConverter
 from orkg_data.get_abstracts import DataAbstracts
+from additional_api_data.enrichment_journal import EnrichmentJournal, journal_path
 
+ARTS_HUMANITIES_CSV_PATH = os.path.join(MAPPINGS_DIR, 'arts_humanities_field.csv')
+
+
+def load_arts_humanities_fields(path: str = ARTS_HUMANITIES_CSV_PATH) -> List[str]:
+    """
+    :return: the Arts and Humanities sub-fields listed in arts_humanities_field.csv
+    """
+    with open(path, newline='') as f:
+        return [item for row in csv.reader(f) for item in row]
 
 
 class ORKGData:
@@ -25,11 +38,20 @@ class ORKGData:
         - Merge research fields to reduce their number.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, snapshot: str, incremental: bool = False, checkpoints: Optional[CheckpointStore] = None) -> None:
         """
         Load data from ORKG API or rdfDump
+        :param snapshot: identifier of the ORKG state to load (e.g. the date of the crawl); a new snapshot re-fetches
+        the ORKG data, an existing one reuses the checkpoints of all unchanged stages
+        :param incremental: only fetch ORKG statements that changed since the last run (see ORKGPyModule)
+        :param checkpoints: store for the stage checkpoints of run()
         """
-        self._strategy = ORKGPyModule()
+        if not snapshot:
+            raise ValueError("An ORKG snapshot identifier is required")
+        self._strategy = ORKGPyModule(incremental=incremental)
+        self.checkpoints = checkpoints or CheckpointStore()
+        self.snapshot = snapshot
+        self.key = None
 
         # The id of the predicate 'research field' in ORKG.
         self.predicate_id = 'P30'
@@ -55,21 +77,56 @@ class ORKGData:
             - Query additional abstracts from APIs using the DataAbstracts class.
             - Convert 'Science' labels to correct labels using the ScienceLabelConverter class.
             - Merge research fields to reduce their number.
+        Every stage is checkpointed (see CheckpointStore), so a rerun only recomputes the stages whose inputs, code or
+        mapping files changed. The key of the last stage is kept in self.key.
         The output is the processed ORKG dataset in the format of a pd.DataFrame.
         """
-        self._load_label_data()
+        key = self._run_stage('orkg_load', self._load_stage, [self.snapshot],
+                              code=ORKG_STAGE_CODE['orkg_load'] + [type(self._strategy)])
         print("Got ORKG data...")
-        self.orkg_df = ORKGDataCleaner(self.orkg_df).run()
+        key = self._run_stage('orkg_clean', lambda: ORKGDataCleaner(self.orkg_df).run(), [key],
+                              code=ORKG_STAGE_CODE['orkg_clean'])
         print("Cleaned ORKG data...")
-        self.orkg_df = DataAbstracts(self.orkg_df).run()
+        journal = journal_path(self.snapshot)
+        key = self._run_stage('orkg_abstracts', lambda: DataAbstracts(self.orkg_df, journal).run(), [key],
+                              code=ORKG_STAGE_CODE['orkg_abstracts'])
+        # the lookups are in the checkpoint now
+        EnrichmentJournal.discard(journal)
         print("Add abstracts...")
-        self.orkg_df = ScienceLabelConverter(self.orkg_df).run()
+        converter = ScienceLabelConverter(self.orkg_df)
+        key = self._run_stage('orkg_science_labels', converter._convert_science_labels, [key],
+                              code=ORKG_STAGE_CODE['orkg_science_labels'],
+                              files=[os.path.join(MAPPINGS_DIR, 'research_field_mapping_crossref_field.json'),
+                                     os.path.join(MAPPINGS_DIR, 'research_field_mapping_semantic_field.json')])
+        # the export for the manual re-labeling is not checkpointed, it is written on every run (also on cache hits)
+        converter.orkg_df = self.orkg_df
+        converter._export_science_labels()
+        key = self._run_stage('orkg_science_relabel',
+                              lambda: converter._relabel_science_manual(self.orkg_df, converter.relabel_csv_path),
+                              [key], code=ORKG_STAGE_CODE['orkg_science_relabel'], files=[converter.relabel_csv_path])
         print("Converted 'Science' labels...")
-        self.orkg_df = self._reduce_rf()
+        # the research field hierarchy is part of the ORKG snapshot
+        self.key = self._run_stage('orkg_reduce_rf', self._reduce_rf, [key, self.snapshot],
+                                   code=ORKG_STAGE_CODE['orkg_reduce_rf'],
+                                   files=[os.path.join(MAPPINGS_DIR, 'rf_reduction.json'), ARTS_HUMANITIES_CSV_PATH])
         print("Reduced number of labels...")
 
         return self.orkg_df
 
+    def _run_stage(self, name: str, func: Callable[[], pd.DataFrame], inputs: List[str], code: List = (),
+                   files: List[str] = ()) -> str:
+        """
+        Runs a stage of the pipeline through the checkpoint store and sets its output as self.orkg_df.
+        :return: key of the stage
+        """
+        key, self.orkg_df = self.checkpoints.run_stage(name, func, inputs, code=code, files=files,
+                                                       rows_in=len(self.orkg_df))
+        return key
+
+    def _load_stage(self) -> pd.DataFrame:
+        self._load_label_data()
+        return self.orkg_df
+
     def _load_label_data(self) -> None:
         """
         Initializes dataframe with orkg data.
@@ -94,26 +151,18 @@ class ORKGData:
         """
         Re-label Arts and Humanities sub-fields to the higher level class +
         Reduces labels from about 300 to about 50.
+        Both steps are combined into a single mapping built from the research field hierarchy
+        (see ResearchFieldIndex), which is applied to the whole label column at once. If the hierarchy has no
+        'Arts and Humanities' node, its sub-fields are taken from arts_humanities_field.csv.
 
         :return: dataframe reduced to 51 labels
         """
         # re-label arts&humanities fields (keeping only the higher level class: Arts and Humanities)
-        with open('data_processing/data/mappings/arts_humanities_field.csv', newline='') as f:
-            reader = csv.reader(f)
-            arts_humanities = list(reader)
-
-        arts_humanities = [item for sublist in arts_humanities for item in sublist]
-
-        self.orkg_df['label'] = ['Arts and Humanities' for item in self.orkg_df['label'] if item.isin(arts_humanities)]
-
-        # reduce remaining research fields
-        path = 'data_processing/data/mappings/rf_reduction.json'
-        with open(path, 'r') as infile:
-            mappings_reduction = json.load(infile)
-
-        for index, row in self.orkg_df.iterrows():
-            if row['label'] in mappings_reduction.keys():
-                self.orkg_df.at[index, 'label'] = mappings_reduction[row['label']]
+        # and reduce the remaining research fields
+        rf_index = ResearchFieldIndex(self._strategy, snapshot=self.snapshot)
+        mapping = rf_index.reduction_mapping(['Arts and Humanities'], load_mapping('rf_reduction.json'),
+                                             fallback_members={'Arts and Humanities': load_arts_humanities_fields()})
+        self.orkg_df['label'] = map_labels(self.orkg_df['label'], mapping)
 
         return self.orkg_df
 
@@ -125,3 +174,17 @@ class ORKGData:
     @strategy.setter
     def strategy(self, strategy: Strategy) -> None:
         self._strategy = strategy
+
+
+# Code versions of the stages of ORKGData.run (see CheckpointStore.stage_key): the code each stage runs. The helpers
+# they call are found through the call graph (see code_closure), so a change elsewhere in their modules keeps the
+# checkpoints valid. __init__ holds the predicate ids of orkg_load, which also depends on the class of the strategy in
+# use.
+ORKG_STAGE_CODE = {
+    'orkg_load': [ORKGData.__init__, ORKGData._load_stage],
+    'orkg_clean': [ORKGDataCleaner],
+    'orkg_abstracts': [DataAbstracts],
+    'orkg_science_labels': [ScienceLabelConverter._convert_science_labels],
+    'orkg_science_relabel': [ScienceLabelConverter._relabel_science_manual],
+    'orkg_reduce_rf': [ORKGData._reduce_rf],
+}
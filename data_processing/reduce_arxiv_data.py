@@ -58,8 +58,8 @@ class ArxivDataReduction:
         :return: The Arxive data with only single-label instances
         """
 
-        self.arxiv_df['multi_label'] = [' ' in row['categories'] for index, row in arxiv_df.iterrows()]
-        single_label_arxiv = arxiv_df.query('multi_label == False')
+        self.arxiv_df['multi_label'] = self.arxiv_df['categories'].str.contains(' ', regex=False)
+        single_label_arxiv = self.arxiv_df.query('multi_label == False')
 
         return single_label_arxiv
 
@@ -0,0 +1,106 @@
+from typing import List, Optional
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# key of the parquet schema metadata that lists the columns stored as json strings
+JSON_COLUMNS_KEY = b'json_columns'
+
+
+def write_dataset(df: pd.DataFrame, path: str, compression: str = 'zstd', row_group_size: int = 100000) -> None:
+    """
+    Writes a dataframe as compressed parquet file.
+    Object columns that arrow cannot type (e.g. cells that are strings in some rows and lists in others) are stored
+    as json strings and decoded again by read_dataset, so the round trip is lossless.
+    Row groups keep min/max statistics per column, which read_dataset uses to skip row groups for filters.
+
+    :param df: dataframe
+    :param path: path of the .parquet file
+    :param compression: parquet compression codec
+    :param row_group_size: number of rows per row group
+    """
+    df, json_columns = _encode_untyped_columns(df)
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    metadata = dict(table.schema.metadata or {})
+    metadata[JSON_COLUMNS_KEY] = json.dumps(json_columns).encode('utf-8')
+    table = table.replace_schema_metadata(metadata)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # write to a temporary file first so readers never see a partially written file
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path, compression=compression, row_group_size=row_group_size)
+    os.replace(tmp_path, path)
+
+
+def read_dataset(path: str, columns: Optional[List[str]] = None, filters: Optional[List] = None) -> pd.DataFrame:
+    """
+    Reads a dataset written by write_dataset. Only the requested columns are read from disk and filters are pushed
+    down to the row groups. Legacy .csv files are read with pandas (filters are applied after reading).
+
+    :param path: path of a .parquet or .csv file
+    :param columns: columns to read (default: all)
+    :param filters: filters in pyarrow DNF format, e.g. [('source', '==', 'orkg')]
+    :return: dataframe
+    """
+    if path.endswith('.csv'):
+        df = pd.read_csv(path, usecols=columns)
+        if filters:
+            df = df[_csv_filter_mask(df, filters)]
+        return df
+
+    table = pq.read_table(path, columns=columns, filters=filters, use_pandas_metadata=True)
+    df = table.to_pandas()
+
+    # arrow converts list cells to numpy arrays, the pipeline works with python lists
+    for field in table.schema:
+        if field.name in df and (pa.types.is_list(field.type) or pa.types.is_large_list(field.type)):
+            df[field.name] = pd.Series(table.column(field.name).to_pylist(), index=df.index, dtype=object)
+
+    metadata = table.schema.metadata or {}
+    for column in json.loads(metadata.get(JSON_COLUMNS_KEY, b'[]')):
+        if column in df:
+            df[column] = [json.loads(value) if isinstance(value, str) else None for value in df[column]]
+
+    return df
+
+
+def _encode_untyped_columns(df: pd.DataFrame) -> (pd.DataFrame, List[str]):
+    json_columns = []
+    for column in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            json_columns.append(column)
+
+    if json_columns:
+        df = df.copy()
+        for column in json_columns:
+            df[column] = [None if _is_null(value) else json.dumps(value, default=str) for value in df[column]]
+
+    return df, json_columns
+
+
+def _is_null(value) -> bool:
+    return not isinstance(value, (list, tuple, dict)) and pd.isna(value)
+
+
+def _csv_filter_mask(df: pd.DataFrame, filters: List) -> pd.Series:
+    operators = {
+        '==': lambda column, value: column == value,
+        '!=': lambda column, value: column != value,
+        '<': lambda column, value: column < value,
+        '<=': lambda column, value: column <= value,
+        '>': lambda column, value: column > value,
+        '>=': lambda column, value: column >= value,
+        'in': lambda column, value: column.isin(value),
+        'not in': lambda column, value: ~column.isin(value),
+    }
+    mask = pd.Series(True, index=df.index)
+    for column, operator, value in filters:
+        mask &= operators[operator](df[column], value)
+    return mask
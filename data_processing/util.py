@@ -1,5 +1,4 @@
 from typing import Any
-import json
 import pandas as pd
 import os
 
@@ -41,9 +40,7 @@ def create_json(df: pd.DataFrame, path: str) -> None:
     Returns
     -------
     """
-    json_data = df.to_json(orient="index")
-    with open(path, 'w') as outfile:
-        json.dump(json_data, outfile)
+    df.to_json(path, orient="index")
 
 
 def create_csv(df: pd.DataFrame, path: str) -> None:
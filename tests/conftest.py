@@ -0,0 +1,10 @@
+import os
+import sys
+
+FILE_PATH = os.path.dirname(os.path.abspath(__file__))
+# the baseline model scripts import their helpers from their own directory
+sys.path.insert(0, os.path.join(FILE_PATH, '../baseline/models'))
+# the pipeline modules import each other relative to data_processing (as when run from the repository root)
+sys.path.insert(0, os.path.join(FILE_PATH, '..'))
+sys.path.insert(0, os.path.join(FILE_PATH, '../data_processing'))
+sys.path.insert(0, os.path.join(FILE_PATH, '../benchmarks'))
@@ -0,0 +1,46 @@
+import pandas as pd
+
+from additional_api_data.api_fields import to_api_frame
+from orkg_data.clean_data import ORKGDataCleaner
+from orkg_data.convert_science_label import ScienceLabelConverter
+from process_merged_data import merge_datasets
+from storage import read_dataset, write_dataset
+
+
+def test_api_frame_keeps_all_research_fields():
+    frame = to_api_frame([{'field': ['Management', 'Computer Science'], 'abstract': 'text'}, {}, {'field': []}],
+                         'crossref', pd.Index([3, 4, 5]))
+
+    assert frame['crossref_field'].dtype == 'string'
+    assert frame['crossref_field'].tolist() == ['Management|Computer Science', pd.NA, pd.NA]
+    assert frame['crossref_abstract'].tolist() == ['text', pd.NA, pd.NA]
+
+
+def test_science_labels_use_primary_fields_first_then_further_fields():
+    orkg_df = pd.DataFrame({
+        'label': ['Science', 'Science', 'Science', 'Physics'],
+        'crossref_field': pd.array(['Management|Unmapped subject', 'Unmapped subject|Management',
+                                    'Unmapped subject|Management', 'Management'], dtype='string'),
+        'semantic_field': pd.array([pd.NA, 'Computer Science', pd.NA, pd.NA], dtype='string'),
+    }, index=[7, 7, 8, 9])
+
+    labels = ScienceLabelConverter(orkg_df)._convert_science_labels()['label'].astype(object).tolist()
+
+    # crossref primary field; semantic primary field before crossref secondary field; crossref secondary field;
+    # non-Science label unchanged
+    assert labels == ['Economics', 'Computer Sciences', 'Economics', 'Physics']
+
+
+def test_parsed_authors_round_trip_as_nested_lists(tmp_path):
+    orkg_df = pd.DataFrame({'author': [str(['Jane Q. Doe', 'Richard Roe Jr.']), None]})
+    orkg_df = ORKGDataCleaner(orkg_df)._parse_authors_orkg(orkg_df)
+    # name parts with the characters a delimiter encoding would have to escape
+    arxiv_df = pd.DataFrame({'categories': ['cs.AI'],
+                             'authors_parsed': [[['Smith, Jr.', 'A; B', ''], ['Lee', 'Kim', '', 'Jr']]]})
+    merged = merge_datasets(orkg_df, arxiv_df)
+
+    write_dataset(merged, str(tmp_path / 'merged.parquet'))
+    authors = read_dataset(str(tmp_path / 'merged.parquet'))['authors_parsed'].tolist()
+
+    assert authors == [[['Doe', 'Jane Q.', '', ''], ['Roe', 'Richard ', '', 'Jr.']], None,
+                       [['Smith, Jr.', 'A; B', ''], ['Lee', 'Kim', '', 'Jr']]]
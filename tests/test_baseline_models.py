@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ann_index import IVFIndex
+from data import FeatureCache, TFIDF_PARAMS, data_provider
+from embedding_cache import EmbeddingCache
+from embedding_store import EmbeddingStore
+from softmax_sgd import SoftmaxSGDClassifier
+
+
+def clustered_vectors(n, dim=16, clusters=4, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(clusters, size=n)
+    return (centers[labels] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32), labels
+
+
+def test_ivf_search_probing_all_lists_is_exact(tmp_path):
+    embeddings, _ = clustered_vectors(500)
+    rows = np.arange(0, 500, 2)
+    index = IVFIndex.build(str(tmp_path / 'index'), embeddings, rows=rows, n_lists=8, data_hash='v1')
+    queries = embeddings[1:40:2]
+
+    scores, found = index.search(queries, k=5, n_probe=8)
+
+    normalized = embeddings[rows] / np.linalg.norm(embeddings[rows], axis=1, keepdims=True)
+    similarities = queries / np.linalg.norm(queries, axis=1, keepdims=True) @ normalized.T
+    np.testing.assert_array_equal(found, rows[np.argsort(-similarities, axis=1)[:, :5]])
+    np.testing.assert_allclose(scores, -np.sort(-similarities, axis=1)[:, :5], rtol=1e-5)
+    # an indexed vector finds itself first
+    assert (index.search(embeddings[rows[:10]], k=1, n_probe=1)[1][:, 0] == rows[:10]).all()
+    # the index is tied to the indexed rows and the data of the embeddings
+    reopened = IVFIndex.open(str(tmp_path / 'index'))
+    assert reopened.matches(rows[::-1], 'v1')
+    assert not reopened.matches(rows[1:], 'v1') and not reopened.matches(rows, 'v2')
+
+
+def test_softmax_sgd_learns_from_chunks():
+    X, y = clustered_vectors(3000, clusters=3)
+    classifier = SoftmaxSGDClassifier(learning_rate=1e-2)
+    with pytest.raises(ValueError):
+        classifier.partial_fit(X[:10], y[:10])
+
+    for _ in range(3):
+        for start in range(0, 2000, 500):
+            classifier.partial_fit(X[start:start + 500], y[start:start + 500], classes=np.arange(3))
+
+    np.testing.assert_allclose(classifier.predict_proba(X[2000:]).sum(axis=1), 1, rtol=1e-5)
+    assert (classifier.predict(X[2000:]) == y[2000:]).mean() > 0.95
+    with pytest.raises(ValueError):
+        classifier.partial_fit(X[:10], np.full(10, 7))
+
+
+def test_embedding_cache_encodes_only_missing_texts(tmp_path):
+    encoded = []
+
+    def encoder(texts):
+        encoded.extend(texts)
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+    cache = EmbeddingCache(str(tmp_path / 'cache'), 'model', 2)
+    first = cache.encode(['a [SEP] b', 'c [SEP] d', 'a [SEP] b'], encoder)
+    assert encoded == ['a [SEP] b', 'c [SEP] d']
+
+    # reopened after a crash that left a partial row: the cached rows survive, whitespace changes are hits
+    with open(tmp_path / 'cache' / 'vectors.bin', 'ab') as outfile:
+        outfile.write(b'\0\0\0')
+    cache = EmbeddingCache(str(tmp_path / 'cache'), 'model', 2)
+    second = cache.encode(['c  [SEP]\nd', 'e [SEP] f'], encoder)
+    assert encoded == ['a [SEP] b', 'c [SEP] d', 'e [SEP] f']
+    np.testing.assert_array_equal(second[0], first[1])
+    assert len(cache) == 3 and len(cache.vectors()) == 3
+
+    with pytest.raises(ValueError):
+        EmbeddingCache(str(tmp_path / 'cache'), 'other model', 2)
+
+
+def test_embedding_store_resumes_only_the_same_data(tmp_path):
+    path = str(tmp_path / 'store')
+    store = EmbeddingStore.create(path, ['a', 'b', 'c', 'd'], 3, model='model', data_hash='v1')
+    store.write(0, np.ones((2, 3)))
+    store.flush()
+
+    resumed = EmbeddingStore.create(path, ['a', 'b', 'c', 'd'], 3, model='model', data_hash='v1')
+    assert resumed.rows_written == 2 and not resumed.complete
+    resumed.write(2, np.full((2, 3), 2.0))
+    resumed.flush()
+    store = EmbeddingStore.open(path)
+    assert store.complete
+    np.testing.assert_array_equal(store.get(['d', 'a']), [[2, 2, 2], [1, 1, 1]])
+
+    assert EmbeddingStore.create(path, ['a', 'b', 'c', 'd'], 3, model='model', data_hash='v2').rows_written == 0
+
+
+def write_papers(path, n, start=0):
+    words = ['graph', 'neural', 'protein', 'folding', 'quantum', 'circuit', 'market', 'price']
+    pd.DataFrame({
+        'title': [f'{words[i % 8]} {words[(i + 1) % 8]}' for i in range(start, start + n)],
+        'abstract': [f'{words[(i + 2) % 8]} {words[(i + 3) % 8]} study' for i in range(start, start + n)],
+        'label': [f'field {i % 2}' for i in range(start, start + n)],
+    }).to_csv(path, index=False)
+
+
+def test_feature_cache_transforms_only_appended_rows(tmp_path):
+    cache_dir = str(tmp_path / 'features')
+    write_papers(tmp_path / 'papers.csv', 40)
+    X = data_provider(str(tmp_path / 'papers.csv')).get_features(cache_dir=cache_dir)
+
+    write_papers(tmp_path / 'more.csv', 50)
+    documents = pd.read_csv(tmp_path / 'more.csv')
+    documents = (documents.title.str.lower() + documents.abstract.str.lower()).reset_index(drop=True)
+    assert FeatureCache(TFIDF_PARAMS, cache_dir).lookup(documents) == 'append'
+    X_appended = data_provider(str(tmp_path / 'more.csv')).get_features(cache_dir=cache_dir)
+
+    cache = FeatureCache(TFIDF_PARAMS, cache_dir)
+    assert X_appended.shape == (50, X.shape[1])
+    assert (X_appended[:40] != X).nnz == 0
+    assert cache.meta['rows'] == 50 and cache.meta['fitted_rows'] == 40
+    assert cache.lookup(documents) == 'hit'
+    assert cache.lookup(documents.iloc[::-1].reset_index(drop=True)) == 'miss'
+
+
+def test_plan_batches_respects_the_token_budget():
+    embedding_engine = pytest.importorskip('embedding_engine')
+    lengths = np.random.default_rng(0).integers(1, 512, size=1000)
+
+    batches = embedding_engine.plan_batches(lengths, max_tokens=4096, max_batch_size=64)
+
+    np.testing.assert_array_equal(np.sort(np.concatenate(batches)), np.arange(1000))
+    assert all(len(batch) <= 64 and len(batch) * lengths[batch].max() <= 4096 for batch in batches)
+    # batches follow the length order, so short texts share larger batches
+    assert all(lengths[a].max() <= lengths[b].min() for a, b in zip(batches, batches[1:]))
+    assert len(batches[0]) > len(batches[-1])
@@ -0,0 +1,49 @@
+import importlib
+import sys
+
+from checkpoint import CheckpointStore
+
+STAGE_SOURCE = '''
+def stage(df):
+    return Cleaner().run(df)
+
+
+class Cleaner:
+    def run(self, df):
+        return self._clean(df)
+
+    def _clean(self, df):
+        return helper(df)
+
+
+def helper(df):
+    return df
+
+
+def unrelated(df):
+    return {unrelated}
+'''
+
+
+def load_module(tmp_path, name, unrelated, helper_body='df'):
+    path = tmp_path / f'{name}.py'
+    path.write_text(STAGE_SOURCE.format(unrelated=unrelated).replace('return df\n\n\ndef unrelated',
+                                                                     f'return {helper_body}\n\n\ndef unrelated'))
+    sys.path.insert(0, str(tmp_path))
+    try:
+        return importlib.import_module(name)
+    finally:
+        sys.path.remove(str(tmp_path))
+
+
+def test_stage_key_follows_the_call_graph_of_the_stage(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'checkpoints'))
+
+    def key(module):
+        return store.stage_key('stage', ['input'], code=[module.Cleaner.run])
+
+    original = load_module(tmp_path, 'stage_v1', unrelated='None')
+    # an edit elsewhere in the module keeps the checkpoint
+    assert key(load_module(tmp_path, 'stage_v2', unrelated='df')) == key(original)
+    # an edit of a helper of the stage (reached through a method called on self) invalidates it
+    assert key(load_module(tmp_path, 'stage_v3', unrelated='None', helper_body='df.copy()')) != key(original)
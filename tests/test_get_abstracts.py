@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import additional_api_data.api_data as api_data
+import instrumentation
+import orkg_data.get_abstracts as get_abstracts
+from additional_api_data.enrichment_journal import EnrichmentJournal
+from orkg_data.get_abstracts import DataAbstracts
+
+
+class FakeAPIData:
+    """ APIData stand-in that answers from canned results per doi and counts the lookups """
+    results = {}
+    calls = []
+
+    def __init__(self, orkg_df):
+        pass
+
+    def get_crossref_data(self, doi, index):
+        FakeAPIData.calls.append(('crossref', doi))
+        return FakeAPIData.results.get(('crossref', doi), {})
+
+    def get_s2ag_data(self, doi, index):
+        FakeAPIData.calls.append(('semantic', doi))
+        return FakeAPIData.results.get(('semantic', doi), {})
+
+    def get_openalex_data(self, url):
+        FakeAPIData.calls.append(('openalex', url))
+        return FakeAPIData.results.get(('openalex', url[len('https://doi.org/'):]), {})
+
+
+@pytest.fixture
+def fake_apis(monkeypatch):
+    FakeAPIData.results = {}
+    FakeAPIData.calls = []
+    monkeypatch.setattr(get_abstracts, 'APIData', FakeAPIData)
+    return FakeAPIData
+
+
+def orkg_frame():
+    return pd.DataFrame({'title': ['paper one', 'paper two', 'paper three', 'paper four'],
+                         'author': ['Jane Doe'] * 4,
+                         'doi': ['10.1/a', '10.1/b', '10.1/c', '10.1/d'],
+                         'abstract': ['existing abstract', np.nan, np.nan, np.nan]})
+
+
+def test_abstract_precedence(fake_apis, tmp_path):
+    fake_apis.results = {
+        ('crossref', '10.1/a'): {'abstract': 'crossref a'},
+        ('crossref', '10.1/b'): {'abstract': 'crossref b'}, ('semantic', '10.1/b'): {'abstract': 'semantic b'},
+        ('semantic', '10.1/c'): {'abstract': 'semantic c'}, ('openalex', '10.1/c'): {'abstract': 'openalex c'},
+        ('openalex', '10.1/d'): {'abstract': 'openalex d'},
+    }
+    df = DataAbstracts(orkg_frame(), journal_path=str(tmp_path / 'journal.jsonl'),
+                       push_down=False)._get_abstracts_from_apis()
+
+    # existing abstract first, then crossref, semantic scholar, openalex
+    assert df['abstract'].tolist() == ['existing abstract', 'crossref b', 'semantic c', 'openalex d']
+    assert df['crossref_abstract'].tolist()[0] == 'crossref a'
+
+
+def test_journal_keeps_only_successful_lookups(fake_apis, tmp_path):
+    fake_apis.results = {('crossref', '10.1/b'): {'abstract': 'crossref b'}}
+    journal = str(tmp_path / 'journal.jsonl')
+    DataAbstracts(orkg_frame(), journal_path=journal, push_down=False)._get_abstracts_from_apis()
+    first_calls = len(fake_apis.calls)
+
+    # the rerun only repeats the lookups that found nothing
+    fake_apis.calls = []
+    DataAbstracts(orkg_frame(), journal_path=journal, push_down=False)._get_abstracts_from_apis()
+    assert len(fake_apis.calls) == first_calls - 1
+    assert ('crossref', '10.1/b') not in fake_apis.calls
+
+
+def test_push_down_keeps_field_lookups_of_science_papers(fake_apis, tmp_path, monkeypatch):
+    orkg_df = pd.DataFrame({'title': ['papier science', 'papier physique', 'english paper'],
+                            'author': ['Jane Doe'] * 3,
+                            'doi': ['10.1/a', '10.1/b', '10.1/c'],
+                            'abstract': ['un résumé', 'un résumé', np.nan],
+                            'label': ['Science', 'Physics', 'Science']})
+    fake_apis.results = {('crossref', '10.1/a'): {'field': ['Physics', 'Chemistry']},
+                         ('semantic', '10.1/a'): {'field': ['Physics']}}
+    # the first two papers are not in English
+    monkeypatch.setattr(get_abstracts, 'english_mask',
+                        lambda titles, abstracts: ~titles.str.startswith('papier'))
+    monkeypatch.setattr(get_abstracts, 'non_english_mask',
+                        lambda titles, min_probability: titles.str.startswith('papier'))
+
+    df = DataAbstracts(orkg_df, journal_path=str(tmp_path / 'journal.jsonl'))._get_abstracts_from_apis()
+
+    # the non-English 'Science' paper still gets its research fields, but no abstract lookup of openalex
+    assert sorted(fake_apis.calls) == [('crossref', '10.1/a'), ('crossref', '10.1/c'),
+                                       ('openalex', 'https://doi.org/10.1/c'),
+                                       ('semantic', '10.1/a'), ('semantic', '10.1/c')]
+    assert df['crossref_field'].tolist()[0] == 'Physics|Chemistry'
+    assert pd.isna(df['crossref_field'].tolist()[1])
+
+
+def test_push_down_skips_papers_with_non_english_titles(fake_apis, tmp_path, monkeypatch):
+    # as loaded from ORKG: no abstracts
+    orkg_df = pd.DataFrame({'title': ['ein deutscher titel', 'an english title', 'un titre français'],
+                            'author': ['Jane Doe'] * 3,
+                            'doi': ['10.1/a', '10.1/b', None],
+                            'abstract': [np.nan] * 3,
+                            'label': ['Physics'] * 3})
+    monkeypatch.setattr(get_abstracts, 'non_english_mask',
+                        lambda titles, min_probability: ~titles.str.contains('english'))
+    report = instrumentation.reset_report()
+
+    DataAbstracts(orkg_df, journal_path=str(tmp_path / 'journal.jsonl'))._get_abstracts_from_apis()
+
+    assert sorted(doi for _, doi in fake_apis.calls) == ['10.1/b', '10.1/b', 'https://doi.org/10.1/b']
+    # 2 papers: 2 crossref, 2 semantic scholar and 1 openalex request
+    assert report.pushdowns['language_title'] == {'rows': 2, 'calls_avoided': 5}
+    assert report.pushdowns['language'] == {'rows': 0, 'calls_avoided': 0}
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b'{}'):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.content = content
+
+
+def test_failed_openalex_lookup_is_not_journaled(monkeypatch, tmp_path):
+    responses = [FakeResponse(429),
+                 FakeResponse(200, b'{"abstract_inverted_index": {"an": [0], "abstract": [1]}}')]
+    monkeypatch.setattr(api_data.requests, 'get', lambda url: responses.pop(0))
+    openalex = api_data.APIData(pd.DataFrame(columns=['title', 'author', 'publisher', 'url']))
+    journal_path = str(tmp_path / 'journal.jsonl')
+
+    def lookup():
+        return openalex.get_openalex_data('https://doi.org/10.1/a')
+
+    with EnrichmentJournal(journal_path) as journal:
+        assert DataAbstracts._journaled(journal, 'a', 'openalex', lookup) == {}
+    # the rate-limited lookup is sent again on the next run
+    with EnrichmentJournal(journal_path) as journal:
+        assert journal.get('a', 'openalex') is None
+        assert DataAbstracts._journaled(journal, 'a', 'openalex', lookup)['abstract'] == 'an abstract'
+    with EnrichmentJournal(journal_path) as journal:
+        assert journal.get('a', 'openalex')['abstract'] == 'an abstract'
+    assert not responses
@@ -0,0 +1,53 @@
+from orkg_data.orkgPyModule import ORKGPyModule
+from orkg_data.statement_store import StatementStore
+
+
+def statement(statement_id, paper_id, predicate_id, label, created_at):
+    return {'id': statement_id, 'subject': {'id': paper_id, 'label': 'title of ' + paper_id},
+            'predicate': {'id': predicate_id}, 'object': {'label': label}, 'created_at': created_at}
+
+
+def sync(store, pages, subject_statements):
+    """ runs ORKGPyModule._sync_changes against canned API pages """
+    module = ORKGPyModule.__new__(ORKGPyModule)
+    module.statements_url = ''
+    module.store = store
+    fetched = []
+    module._get_page = lambda url: pages[int(url.split('page=')[-1])] if int(url.split('page=')[-1]) < len(pages) \
+        else []
+    module._fetch_subject_statements = lambda paper_id: fetched.append(paper_id) or subject_statements[paper_id]
+    module._sync_changes('P30')
+    return fetched
+
+
+def test_sync_includes_statements_created_at_the_watermark(tmp_path):
+    store = StatementStore(str(tmp_path / 'statements.json'))
+    store.set_predicate_statements('P30', [statement('S1', 'R1', 'P30', 'Physics', '2023-05-01T10:00:00Z')])
+    store.advance_watermark('2023-05-01T10:00:00Z')
+
+    # R2 got its research field in the same second as the watermark, after the last sync had read the feed
+    r2 = statement('S2', 'R2', 'P30', 'Chemistry', '2023-05-01T10:00:00Z')
+    pages = [[r2, statement('S1', 'R1', 'P30', 'Physics', '2023-05-01T10:00:00Z'),
+              statement('S0', 'R0', 'P30', 'Biology', '2023-04-30T09:00:00Z')]]
+    fetched = sync(store, pages, {'R1': [statement('S1', 'R1', 'P30', 'Physics', '2023-05-01T10:00:00Z')],
+                                  'R2': [r2]})
+
+    assert sorted(fetched) == ['R1', 'R2']
+    assert sorted(store.get_predicate_statements('P30')['paper']) == ['R1', 'R2']
+    assert store.watermark == '2023-05-01T10:00:00Z'
+
+
+def test_sync_deduplicates_statements_repeated_across_pages(tmp_path):
+    store = StatementStore(str(tmp_path / 'statements.json'))
+    store.set_predicate_statements('P30', [])
+    store.advance_watermark('2023-05-01T10:00:00Z')
+
+    # an insert while paging shifts S3 from the end of page 0 to the start of page 1
+    r3 = statement('S3', 'R3', 'P30', 'Physics', '2023-05-02T10:00:00Z')
+    title = statement('S4', 'R3', 'P26', '10.1000/x', '2023-05-02T10:00:00Z')
+    pages = [[r3], [r3, statement('S0', 'R0', 'P30', 'Biology', '2023-04-30T09:00:00Z')]]
+    fetched = sync(store, pages, {'R3': [r3, title, r3]})
+
+    assert fetched == ['R3']
+    assert [entry['id'] for entry in store.subjects['R3']] == ['S3', 'S4']
+    assert store.get_predicate_statements('P30') == {'paper': ['R3'], 'label': ['Physics']}
@@ -0,0 +1,72 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+from arxiv_index import ArxivIndex
+from generators import generate_arxiv_snapshot
+from pipeline_dag import DAGExecutor, Stage
+from process_arxiv_data import ArxivData
+from process_merged_data import MergedData, merge_datasets
+from storage import read_dataset, write_dataset
+
+THRESHOLD_INSTANCES = 200
+
+
+def processed_orkg(orkg_path: str) -> pd.DataFrame:
+    """ stands in for the ORKG branch (orkg_fetch ... orkg_labels) """
+    return read_dataset(orkg_path)
+
+
+def write_fixtures(tmp_path):
+    arxiv_path = str(tmp_path / 'arxiv-snapshot.json')
+    arxiv_dois = [doi for doi in generate_arxiv_snapshot(arxiv_path, 400, seed=7) if doi]
+
+    # ORKG papers: many of them in arXiv (with and without abstract, enough to change the sample if they were dropped
+    # after sampling), some not
+    dois = arxiv_dois[:60] + ['10.1/x', '10.1/y', None, '']
+    orkg_df = pd.DataFrame({
+        'title': [f'orkg paper {i}' for i in range(len(dois))],
+        'doi': dois,
+        'abstract': [np.nan, 'own abstract'] * (len(dois) // 2),
+        'author': ['Jane Doe'] * len(dois),
+        'label': ['Physics'] * len(dois),
+    })
+    orkg_path = str(tmp_path / 'orkg.parquet')
+    write_dataset(orkg_df, orkg_path)
+    return arxiv_path, orkg_path
+
+
+def test_dag_matches_merged_data(tmp_path, monkeypatch):
+    arxiv_path, orkg_path = write_fixtures(tmp_path)
+    # MergedData: ArxivData.run, merge and abstract processing (language filter left out, it needs the fasttext model)
+    orkg_df, arxiv_df = ArxivData(arxiv_path, orkg_path, THRESHOLD_INSTANCES).run()
+    expected = MergedData._process_abstracts(merge_datasets(orkg_df, arxiv_df))
+
+    stages = [stage for stage in pipeline.build_stages(arxiv_path, 'fixture', THRESHOLD_INSTANCES)
+              if not stage.name.startswith('orkg_')]
+    stages.append(Stage('orkg_labels', processed_orkg, params={'orkg_path': orkg_path}))
+    # keep the arXiv index of the fixture out of the data directory
+    monkeypatch.setattr(pipeline, 'ArxivIndex', functools.partial(ArxivIndex, index_dir=str(tmp_path / 'index')))
+    result = DAGExecutor(stages, str(tmp_path / 'checkpoints'), max_workers=2).run('merged_abstracts')
+
+    # the sample does not contain arXiv papers that exist in ORKG
+    assert not result[result['source'] == 'arxiv']['doi'].isin(orkg_df['doi'].dropna()).any()
+    assert sorted(result.columns) == sorted(expected.columns)
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected[result.columns].reset_index(drop=True),
+                                  check_dtype=False)
+
+
+def test_incremental_sample_matches_full_sample(tmp_path):
+    arxiv_path, orkg_path = write_fixtures(tmp_path)
+    orkg_df, full = ArxivData(arxiv_path, orkg_path, THRESHOLD_INSTANCES).run()
+    _, incremental = ArxivData(arxiv_path, orkg_path, THRESHOLD_INSTANCES, incremental=True,
+                               state_dir=str(tmp_path / 'state')).run()
+
+    # bottom-k instead of random sampling: other papers, but the same size and label distribution, drawn from the
+    # papers that are not in ORKG
+    assert not incremental['doi'].isin(orkg_df['doi'].dropna()).any()
+    assert len(incremental) == len(full)
+    pd.testing.assert_series_equal(incremental['categories'].value_counts().sort_index(),
+                                   full['categories'].value_counts().sort_index())
@@ -0,0 +1,47 @@
+import pytest
+
+from orkg_data.research_field_index import ResearchFieldIndex
+
+
+class HierarchyStrategy:
+    """ Strategy stand-in that serves a fixed research field hierarchy and counts the reads """
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.reads = 0
+
+    def get_subfield_statements(self, predicate_id):
+        self.reads += 1
+        return {'parent': [parent for parent, _ in self.edges], 'child': [child for _, child in self.edges]}
+
+
+EDGES = [('Research Field', 'Arts and Humanities'), ('Arts and Humanities', 'History'),
+         ('History', 'Ancient History'), ('Research Field', 'Physical Sciences'), ('Physical Sciences', 'Physics')]
+
+
+def test_hierarchy_is_read_once_per_snapshot(tmp_path):
+    cache_path = str(tmp_path / 'rf_index.json')
+    strategy = HierarchyStrategy(EDGES)
+
+    ResearchFieldIndex(strategy, cache_path=cache_path, snapshot='2023-05-01')
+    index = ResearchFieldIndex(strategy, cache_path=cache_path, snapshot='2023-05-01')
+    assert strategy.reads == 1
+    assert index.ancestors['Ancient History'] == ['History', 'Arts and Humanities', 'Research Field']
+
+    ResearchFieldIndex(strategy, cache_path=cache_path, snapshot='2023-05-08')
+    assert strategy.reads == 2
+
+
+def test_collapse_field_missing_in_hierarchy(tmp_path):
+    edges = [edge for edge in EDGES if edge != ('Research Field', 'Arts and Humanities')
+             and edge != ('Arts and Humanities', 'History')]
+    index = ResearchFieldIndex(HierarchyStrategy(edges), cache_path=str(tmp_path / 'rf_index.json'))
+
+    with pytest.raises(ValueError):
+        index.reduction_mapping(['Arts and Humanities'], {})
+
+    mapping = index.reduction_mapping(['Arts and Humanities'], {'Physics': 'Physical Sciences'},
+                                      fallback_members={'Arts and Humanities': ['History', 'Ancient History']})
+    assert mapping['History'] == 'Arts and Humanities'
+    assert mapping['Ancient History'] == 'Arts and Humanities'
+    assert mapping['Physics'] == 'Physical Sciences'